@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import CV, JobDescription, MatchResult
+from django.db import transaction
+from . import statistics
+from .models import CV, CVProfile, JobDescription, MatchResult
+from .persistence import delete_match_results, lock_jobs_matches
 
 class CVAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'processed_at')
@@ -13,12 +16,35 @@ class JobDescriptionAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
     list_filter = ('industry', 'created_at')
 
+class CVProfileAdmin(admin.ModelAdmin):
+    list_display = ('id', 'cv', 'seniority', 'years_experience', 'extracted_at')
+    search_fields = ('cv__name',)
+    readonly_fields = ('extracted_at',)
+    list_filter = ('seniority',)
+
 class MatchResultAdmin(admin.ModelAdmin):
     list_display = ('id', 'get_cv_name', 'get_job_title', 'total_score', 'matched_at')
     list_filter = ('matched_at',)
     search_fields = ('cv__name', 'job__title')
     readonly_fields = ('matched_at',)
     
+    # Match results have no signal receivers (they would slow cascading deletes),
+    # so admin writes keep the dashboard statistics current here
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            saved = MatchResult.objects.filter(pk=obj.pk) if change else MatchResult.objects.none()
+            lock_jobs_matches([obj.job_id, *saved.values_list('job_id', flat=True)])
+            # The stored row comes out of the counters as it is, whichever pair it belonged to
+            statistics.matches_deleted(saved)
+            super().save_model(request, obj, form, change)
+            statistics.matches_saved([obj], {})
+    
+    def delete_model(self, request, obj):
+        delete_match_results(MatchResult.objects.filter(pk=obj.pk))
+    
+    def delete_queryset(self, request, queryset):
+        delete_match_results(queryset)
+    
     def get_cv_name(self, obj):
         return obj.cv.name
     get_cv_name.short_description = 'CV'
@@ -31,4 +57,5 @@ class MatchResultAdmin(admin.ModelAdmin):
 
 admin.site.register(CV, CVAdmin)
 admin.site.register(JobDescription, JobDescriptionAdmin)
+admin.site.register(CVProfile, CVProfileAdmin)
 admin.site.register(MatchResult, MatchResultAdmin)
\ No newline at end of file
@@ -0,0 +1,354 @@
+import os
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import statistics
+from .dedup import file_hash, find_duplicates, text_hash
+from .docx_text import extract_docx_text
+from .embeddings import add_jobs as add_job_embeddings
+from .models import CV, JobDescription, UploadBatch, UploadBatchItem
+from .persistence import upsert_job_descriptions
+from .search_index import index_cvs
+from .skills import job_skill_weights, tag_skills
+
+# Documents extracted and written per transaction
+CHUNK_SIZE = 100
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.UPLOAD_BATCH_WORKERS,
+                                           thread_name_prefix='upload-batch')
+        return _executor
+
+
+def batch_dir(batch_id):
+    return os.path.join(settings.UPLOAD_STAGING_ROOT, str(batch_id))
+
+
+def _stage_file(uploaded_file, path):
+    """Put an uploaded file on disk, chunk by chunk, without reading it into memory."""
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        # Large uploads are already spooled to a temp file by Django; just move it
+        try:
+            shutil.move(uploaded_file.temporary_file_path(), path)
+            return
+        except OSError:
+            pass
+    uploaded_file.seek(0)
+    with open(path, 'wb') as fh:
+        for chunk in uploaded_file.chunks():
+            fh.write(chunk)
+
+
+def create_batch(kind, files):
+    """Stage uploaded .docx files and .zip archives and record one item per document.
+
+    Raises ValueError if the batch holds more than UPLOAD_BATCH_MAX_FILES documents.
+    """
+    with transaction.atomic():
+        batch = UploadBatch.objects.create(kind=kind)
+        directory = batch_dir(batch.id)
+        try:
+            _stage_batch(batch, directory, files)
+        except Exception:
+            # The batch row rolls back with the transaction; its staged files have to go too
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+    return batch
+
+
+def _item_filename(name):
+    """Fit a file name into UploadBatchItem.filename, keeping its extension."""
+    max_length = UploadBatchItem._meta.get_field('filename').max_length
+    if len(name) <= max_length:
+        return name
+    root, extension = os.path.splitext(os.path.basename(name))
+    return root[:max_length - len(extension)] + extension
+
+
+def _stage_batch(batch, directory, files):
+    os.makedirs(directory, exist_ok=True)
+    items = []
+    for index, uploaded_file in enumerate(files):
+        # Staged under the index alone: it keeps files with the same name apart, and long names off the disk
+        is_zip = uploaded_file.name.lower().endswith('.zip')
+        staged = os.path.join(directory, f'{index}.zip' if is_zip else f'{index}.docx')
+        _stage_file(uploaded_file, staged)
+
+        filename = _item_filename(uploaded_file.name)
+        if not is_zip:
+            items.append(UploadBatchItem(batch=batch, filename=filename, path=staged))
+            continue
+        try:
+            # Only the central directory is read here; members are extracted later
+            with zipfile.ZipFile(staged) as archive:
+                members = [
+                    member for member in archive.infolist()
+                    if not member.is_dir() and not member.filename.startswith('__MACOSX/')
+                ]
+        except zipfile.BadZipFile:
+            items.append(UploadBatchItem(batch=batch, filename=filename, status='failed',
+                                         error='Not a valid zip archive.'))
+            continue
+        for member in members:
+            # The member is opened by its full path, so one that doesn't fit can't be processed
+            item = UploadBatchItem(batch=batch, filename=_item_filename(member.filename), archive_path=staged)
+            if item.filename != member.filename:
+                _fail(item, 'File path inside the archive is too long.')
+            elif member.file_size > settings.UPLOAD_BATCH_MAX_MEMBER_BYTES:
+                _fail(item, _too_large_message())
+            items.append(item)
+
+    if len(items) > settings.UPLOAD_BATCH_MAX_FILES:
+        raise ValueError(f'Too many files in one batch ({len(items)}, the limit is {settings.UPLOAD_BATCH_MAX_FILES}).')
+
+    for item in items:
+        if item.status == 'pending' and not item.filename.lower().endswith('.docx'):
+            item.status = 'failed'
+            item.error = 'Invalid file type. Only .docx allowed.'
+    UploadBatchItem.objects.bulk_create(items)
+
+
+def submit_batch(batch_id):
+    """Queue a staged batch for background extraction."""
+    return _get_executor().submit(process_batch, batch_id)
+
+
+def unfinished_batches():
+    """Batches still pending or processing, as a server restart leaves the ones its executor held."""
+    return UploadBatch.objects.filter(status__in=['pending', 'processing']).order_by('created_at')
+
+
+def fail_batch(batch, message):
+    """Give up on an unfinished batch: its pending items fail and its staged files are removed."""
+    batch.items.filter(status='pending').update(status='failed', error=message[:255])
+    batch.status = 'failed'
+    batch.error = message
+    batch.finished_at = timezone.now()
+    batch.save(update_fields=['status', 'error', 'finished_at'])
+    shutil.rmtree(batch_dir(batch.id), ignore_errors=True)
+
+
+def process_batch(batch_id, resume=False):
+    """Extract and insert every pending document of a batch, recording per-file outcomes.
+
+    `resume` also takes a batch left 'processing' by an interrupted worker; its
+    items still pending are the ones that were not written.
+    """
+    close_old_connections()
+    # Claiming the batch with a conditional update keeps two workers from processing it
+    statuses = ['pending', 'processing'] if resume else ['pending']
+    if not UploadBatch.objects.filter(id=batch_id, status__in=statuses).update(status='processing'):
+        close_old_connections()
+        return
+    batch = UploadBatch.objects.get(id=batch_id)
+
+    print(f"Processing upload batch {batch_id}...")
+    try:
+        items = list(batch.items.filter(status='pending'))
+        archives = {}
+        try:
+            for i in range(0, len(items), CHUNK_SIZE):
+                _process_chunk(batch, items[i:i + CHUNK_SIZE], archives)
+        finally:
+            for archive in archives.values():
+                archive.close()
+        batch.status = 'completed'
+    except Exception as e:
+        print(f"!!! Upload batch {batch_id} failed: {e}")
+        batch.status = 'failed'
+        batch.error = str(e)
+    finally:
+        batch.finished_at = timezone.now()
+        batch.save(update_fields=['status', 'error', 'finished_at'])
+        shutil.rmtree(batch_dir(batch_id), ignore_errors=True)
+        close_old_connections()
+    print(f"Upload batch {batch_id} {batch.status}.")
+
+
+def _too_large_message():
+    return f'File is larger than {settings.UPLOAD_BATCH_MAX_MEMBER_BYTES} bytes when unpacked.'
+
+
+class MemberTooLarge(Exception):
+    pass
+
+
+def _stage_member(item, archives):
+    """Copy a zip member next to its archive so it can be read and stored like an upload.
+
+    Raises MemberTooLarge once more than UPLOAD_BATCH_MAX_MEMBER_BYTES come out:
+    the size in the zip header was checked already, but the header can lie.
+    """
+    archive = archives.get(item.archive_path)
+    if archive is None:
+        archive = archives[item.archive_path] = zipfile.ZipFile(item.archive_path)
+    path = os.path.join(os.path.dirname(item.archive_path), f'member_{item.id}.docx')
+    remaining = settings.UPLOAD_BATCH_MAX_MEMBER_BYTES
+    try:
+        with archive.open(item.filename) as source, open(path, 'wb') as target:
+            while chunk := source.read(min(1024 * 1024, remaining + 1)):
+                remaining -= len(chunk)
+                if remaining < 0:
+                    raise MemberTooLarge(_too_large_message())
+                target.write(chunk)
+    except MemberTooLarge:
+        os.remove(path)
+        raise
+    return path
+
+
+def _fail(item, message):
+    item.status = 'failed'
+    item.error = message[:255]
+
+
+def _resolve_duplicate(item, row, kind):
+    if kind == 'cv':
+        item.cv = row
+    else:
+        item.job = row
+    item.status = 'succeeded'
+    item.duplicate = True
+
+
+def _process_chunk(batch, items, archives):
+    model = CV if batch.kind == 'cv' else JobDescription
+    staged = []
+    for item in items:
+        try:
+            path = _stage_member(item, archives) if item.archive_path else item.path
+            staged.append((item, path, file_hash(path)))
+        except MemberTooLarge as e:
+            _fail(item, str(e))
+        except Exception as e:
+            _fail(item, f'Failed to read docx file content: {e}')
+
+    # Byte-identical re-uploads are resolved before any extraction
+    known_files, _ = find_duplicates(model, file_hashes=[raw_hash for _, _, raw_hash in staged])
+    documents = []
+    for item, path, raw_hash in staged:
+        if raw_hash in known_files:
+            _resolve_duplicate(item, known_files[raw_hash], batch.kind)
+            continue
+        try:
+            content = extract_docx_text(path)
+        except Exception as e:
+            _fail(item, f'Failed to read docx file content: {e}')
+            continue
+        if not content:
+            _fail(item, 'Could not extract text content from the file.')
+            continue
+        documents.append({'item': item, 'path': path, 'content': content,
+                          'file_hash': raw_hash, 'text_hash': text_hash(content)})
+
+    _, known_texts = find_duplicates(model, text_hashes=[document['text_hash'] for document in documents])
+    to_write, repeats = [], []
+    first_seen = {}
+    for document in documents:
+        if document['text_hash'] in known_texts:
+            _resolve_duplicate(document['item'], known_texts[document['text_hash']], batch.kind)
+            continue
+        # The same document twice in one batch is only stored once
+        original = first_seen.get(document['file_hash']) or first_seen.get(document['text_hash'])
+        if original:
+            repeats.append((document['item'], original['item']))
+            continue
+        first_seen[document['file_hash']] = first_seen[document['text_hash']] = document
+        to_write.append(document)
+
+    try:
+        with transaction.atomic():
+            if batch.kind == 'cv':
+                _write_cvs(to_write)
+            else:
+                _write_jobs(to_write)
+    except Exception as e:
+        for document in to_write:
+            # The rows rolled back, but the files stored for them did not
+            cv = document.pop('cv', None)
+            if cv is not None and cv.file:
+                cv.file.delete(save=False)
+            document['item'].cv = document['item'].job = None
+            _fail(document['item'], f'Error saving document: {e}')
+    for item, original in repeats:
+        item.status, item.error = original.status, original.error
+        item.cv, item.job = original.cv, original.job
+        item.duplicate = original.status == 'succeeded'
+    UploadBatchItem.objects.bulk_update(items, ['status', 'error', 'duplicate', 'cv', 'job'])
+
+
+def _write_cvs(documents):
+    cvs = []
+    for document in documents:
+        name = os.path.basename(document['item'].filename)
+        cv = CV(name=name, content=document['content'], file_hash=document['file_hash'],
+                text_hash=document['text_hash'], skill_tags=tag_skills(document['content']))
+        document['cv'] = cv
+        with open(document['path'], 'rb') as fh:
+            cv.file.save(name, File(fh), save=False)
+        cvs.append(cv)
+    CV.objects.bulk_create(cvs)
+    statistics.documents_added('cvs', cvs)
+    for document, cv in zip(documents, cvs):
+        document['item'].cv = cv
+        document['item'].status = 'succeeded'
+
+    # Keep the retrieval index in sync so the new CVs are immediately matchable, once they are committed
+    transaction.on_commit(lambda: _index_cvs(cvs))
+
+
+def _index_cvs(cvs):
+    try:
+        index_cvs(cvs)
+    except Exception as e:
+        print(f"!!! Could not add batch CVs to search index: {e}")
+
+
+def _write_jobs(documents):
+    # Imported lazily: the views import this module to start batches
+    from .views import JobDescriptionViewSet
+
+    parser = JobDescriptionViewSet()
+    parsed = []
+    for document in documents:
+        data = parser._parse_job_description_text(document['content'])
+        if not data.get('title'):
+            _fail(document['item'], 'Could not parse job title from the document.')
+            continue
+        parsed.append((document['item'], JobDescription(
+            title=data['title'],
+            content=document['content'],
+            industry=data['industry'],
+            technical_skills=data['technical_skills'],
+            file_hash=document['file_hash'],
+            text_hash=document['text_hash'],
+            skill_tags=job_skill_weights(data['technical_skills'], document['content']),
+        )))
+
+    saved, _ = upsert_job_descriptions([job for _, job in parsed])
+    for item, job in parsed:
+        item.job = saved[job.title]
+        item.status = 'succeeded'
+
+    transaction.on_commit(lambda: _add_job_embeddings(list(saved.values())))
+
+
+def _add_job_embeddings(jobs):
+    try:
+        add_job_embeddings(jobs)
+    except Exception as e:
+        print(f"!!! Could not add batch jobs to embedding index: {e}")
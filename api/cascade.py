@@ -0,0 +1,95 @@
+from django.conf import settings
+
+from .scoring import calculate_total_score
+
+# Scores are compared after the same weighted sum, so only float noise needs absorbing
+_EPSILON = 1e-9
+
+
+class MatchCascade:
+    """Decide which CV-job pairs of one matching request are worth a Gemini call.
+
+    Every candidate gets an upper bound on its total score from what is known
+    locally. The skill-matrix score is exact, the industry and description
+    scores are bounded by 1.0. The description bound can be tightened with the
+    CV's BM25 score relative to the best shortlisted CV plus MATCH_LEXICAL_MARGIN,
+    which is an estimate rather than a guarantee.
+
+    Candidates are escalated best bound first, in waves. Before every wave the
+    ones that can no longer reach min_score or beat the current k-th best score
+    are dropped, and no more than `budget` pairs are escalated in total.
+    """
+
+    def __init__(self, min_score=0, top_k=5, budget=None, wave_size=None, lexical_margin=None):
+        self.min_score = min_score
+        self.top_k = top_k
+        self.budget = settings.MATCH_LLM_BUDGET if budget is None else budget
+        self.wave_size = wave_size or settings.MATCH_CASCADE_WAVE_SIZE
+        self.lexical_margin = settings.MATCH_LEXICAL_MARGIN if lexical_margin is None else lexical_margin
+        self.scores = []
+        self.candidates = 0
+        self.escalated = 0
+        # LLM calls avoided, by the tier that avoided them
+        self.avoided = {'retrieval': 0, 'stored': 0, 'min_score': 0, 'top_k': 0, 'lexical_estimate': 0, 'budget': 0}
+
+    def upper_bounds(self, tech_skills_score=None, lexical=None):
+        """Return (exact bound, estimated bound) on the total score of a pair."""
+        tech = 1.0 if tech_skills_score is None else tech_skills_score
+        exact = calculate_total_score(1.0, tech, 1.0)
+        if lexical is None or self.lexical_margin >= 1:
+            return exact, exact
+        return exact, calculate_total_score(1.0, tech, min(1.0, lexical + self.lexical_margin))
+
+    def record(self, total_score, stored=False):
+        """Account for a known score; stored results also count as an avoided call."""
+        self.scores.append(total_score)
+        if stored:
+            self.avoided['stored'] += 1
+
+    def cutoff(self):
+        """Score a candidate must be able to reach to change the response."""
+        cutoff = self.min_score
+        if len(self.scores) >= self.top_k:
+            cutoff = max(cutoff, sorted(self.scores, reverse=True)[self.top_k - 1])
+        return cutoff
+
+    def waves(self, candidates):
+        """Yield the items worth escalating, a wave at a time.
+
+        `candidates` is a list of (item, exact bound, estimated bound). Scores
+        of escalated items should be recorded before the next wave is taken.
+        """
+        remaining = sorted(candidates, key=lambda candidate: candidate[2], reverse=True)
+        while remaining:
+            remaining = self._prune(remaining)
+            room = self.budget - self.escalated
+            if room <= 0:
+                self.avoided['budget'] += len(remaining)
+                return
+            size = min(self.wave_size, room)
+            wave, remaining = remaining[:size], remaining[size:]
+            if wave:
+                self.escalated += len(wave)
+                yield [item for item, _, _ in wave]
+
+    def _prune(self, candidates):
+        cutoff = self.cutoff()
+        kept = []
+        for candidate in candidates:
+            _, exact, estimate = candidate
+            if exact + _EPSILON < cutoff:
+                self.avoided['min_score' if exact + _EPSILON < self.min_score else 'top_k'] += 1
+            elif estimate + _EPSILON < cutoff:
+                self.avoided['lexical_estimate'] += 1
+            else:
+                kept.append(candidate)
+        return kept
+
+    @property
+    def report(self):
+        return {
+            'candidates': self.candidates,
+            'escalated': self.escalated,
+            'avoided': dict(self.avoided),
+            'llm_calls_avoided': sum(self.avoided.values()),
+        }
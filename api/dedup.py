@@ -0,0 +1,71 @@
+import hashlib
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+
+from .utils import content_hash
+
+
+def normalize_text(text):
+    """Fold case, Unicode forms and whitespace so re-saved copies of a document compare equal."""
+    return ' '.join(unicodedata.normalize('NFKC', text or '').casefold().split())
+
+
+def text_hash(text):
+    return content_hash(normalize_text(text))
+
+
+def file_hash(source):
+    """sha256 of an uploaded file or a path, read in chunks."""
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(64 * 1024), b''):
+                digest.update(chunk)
+    else:
+        source.seek(0)
+        for chunk in source.chunks():
+            digest.update(chunk)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def find_duplicate(model, file_hash='', text_hash=''):
+    """Return the oldest CV or job with the same upload bytes or normalized text, if any."""
+    query = Q()
+    if file_hash:
+        query |= Q(file_hash=file_hash)
+    if text_hash:
+        query |= Q(text_hash=text_hash)
+    if not query:
+        return None
+    return model.objects.filter(query).order_by('id').first()
+
+
+def lock_text_hash(model, text_hash):
+    """Hold a transaction-level lock on one normalized text of a model's rows.
+
+    Uploads take it before their last duplicate check, so two copies of a
+    document uploaded at the same moment can't both be stored.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [f'{model._meta.db_table}:{text_hash}'])
+
+
+def find_duplicates(model, file_hashes=(), text_hashes=()):
+    """Bulk version of find_duplicate: returns ({file_hash: row}, {text_hash: row})."""
+    file_hashes = {h for h in file_hashes if h}
+    text_hashes = {h for h in text_hashes if h}
+    by_file, by_text = {}, {}
+    if not file_hashes and not text_hashes:
+        return by_file, by_text
+    rows = model.objects.filter(
+        Q(file_hash__in=file_hashes) | Q(text_hash__in=text_hashes)
+    ).only('id', 'file_hash', 'text_hash').order_by('id')
+    for row in rows:
+        if row.file_hash in file_hashes:
+            by_file.setdefault(row.file_hash, row)
+        if row.text_hash in text_hashes:
+            by_text.setdefault(row.text_hash, row)
+    return by_file, by_text
@@ -0,0 +1,98 @@
+import posixpath
+import zipfile
+from xml.etree import ElementTree
+
+from . import metrics
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+PACKAGE_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+CELL_SEPARATOR = ' | '
+
+
+def _main_part_name(archive):
+    """Find the main document part through the package relationships."""
+    try:
+        rels = ElementTree.fromstring(archive.read('_rels/.rels'))
+    except KeyError:
+        return 'word/document.xml'
+    for rel in rels.iter(PACKAGE_RELS):
+        if rel.get('Type') == OFFICE_DOCUMENT:
+            return posixpath.normpath(rel.get('Target').lstrip('/'))
+    return 'word/document.xml'
+
+
+def iter_docx_lines(source):
+    """Yield the non-empty text lines of a .docx file, in document order.
+
+    `source` is a path or a seekable binary file. word/document.xml is read
+    as a stream and every element is discarded once its text is consumed,
+    so memory stays flat however large the document is. Body paragraphs
+    become one line each, table rows become one line with their cells
+    joined by ' | ', and text boxes are emitted as their own lines.
+    """
+    with zipfile.ZipFile(source) as archive:
+        with archive.open(_main_part_name(archive)) as stream:
+            # Each open paragraph collects runs; nested ones come from text boxes
+            paragraphs = []
+            # Each open table row collects finished cell texts
+            rows = []
+            cells = []
+            skip_depth = 0
+
+            for event, elem in ElementTree.iterparse(stream, events=('start', 'end')):
+                tag = elem.tag
+                if event == 'start':
+                    # Text boxes are stored twice; the legacy VML fallback copy is ignored
+                    if tag == MC_FALLBACK or skip_depth:
+                        skip_depth += 1
+                    elif tag == W + 'p':
+                        paragraphs.append([])
+                    elif tag == W + 'tr':
+                        rows.append([])
+                    elif tag == W + 'tc':
+                        cells.append([])
+                    continue
+
+                if skip_depth:
+                    skip_depth -= 1
+                    elem.clear()
+                    continue
+
+                if tag == W + 't':
+                    if paragraphs and elem.text:
+                        paragraphs[-1].append(elem.text)
+                elif tag == W + 'tab':
+                    if paragraphs:
+                        paragraphs[-1].append('\t')
+                elif tag in (W + 'br', W + 'cr'):
+                    if paragraphs:
+                        paragraphs[-1].append('\n')
+                elif tag == W + 'p':
+                    text = ''.join(paragraphs.pop()).strip()
+                    if text:
+                        if cells and len(paragraphs) == 0:
+                            cells[-1].append(text)
+                        else:
+                            yield text
+                elif tag == W + 'tc':
+                    text = ' '.join(cells.pop())
+                    if rows:
+                        rows[-1].append(text)
+                elif tag == W + 'tr':
+                    line = CELL_SEPARATOR.join(cell for cell in rows.pop() if cell)
+                    if line:
+                        if cells:
+                            # A nested table's row belongs to the enclosing cell
+                            cells[-1].append(line)
+                        else:
+                            yield line
+                elem.clear()
+
+
+def extract_docx_text(source):
+    """Return the text of a .docx file as newline-separated lines."""
+    with metrics.timer('extract', metrics.EXTRACTION_DURATION):
+        return '\n'.join(iter_docx_lines(source))
@@ -0,0 +1,366 @@
+import math
+import os
+import pickle
+import threading
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import search_index
+from .dedup import text_hash
+from .models import CV, JobDescription
+from .pickled_index import file_lock
+
+# Rows converted to float32 at a time while scoring, so a query never copies the whole matrix
+_SCORE_CHUNK = 65536
+
+
+class HashingEmbedder:
+    """Local embeddings from signed feature hashing of word unigrams and bigrams.
+
+    Needs no network and no fitting, so a document's vector never changes as
+    the corpus grows and new documents can simply be appended.
+    """
+
+    def __init__(self, dim=None):
+        self.dim = dim or settings.EMBEDDING_DIM
+        self.name = f'hashing-{self.dim}'
+
+    def _features(self, text):
+        tokens = search_index.tokenize(text or '')
+        return Counter(tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])])
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                hashed = zlib.crc32(feature.encode('utf-8'))
+                sign = 1.0 if hashed & 0x80000000 else -1.0
+                vectors[row, hashed % self.dim] += sign * (1 + math.log(count))
+        return _normalize(vectors)
+
+
+class GeminiEmbedder:
+    """Embeddings from the Gemini embedding API."""
+
+    def __init__(self):
+        self.model = settings.GEMINI_EMBEDDING_MODEL
+        self.dim = settings.EMBEDDING_DIM
+        self.name = f'gemini-{self.model}-{self.dim}'
+
+    def embed(self, texts):
+        import google.generativeai as genai
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        vectors = []
+        # The API takes up to 100 texts per call
+        for i in range(0, len(texts), 100):
+            response = genai.embed_content(
+                model=self.model,
+                content=[text[:8000] for text in texts[i:i + 100]],
+                task_type='semantic_similarity',
+                output_dimensionality=self.dim,
+            )
+            vectors.extend(response['embedding'])
+        return _normalize(np.array(vectors, dtype=np.float32).reshape(len(texts), self.dim))
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+_backend = None
+
+
+def get_backend():
+    """Return the embedding backend named by EMBEDDING_BACKEND."""
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.EMBEDDING_BACKEND)()
+    return _backend
+
+
+class EmbeddingStore:
+    """Append-only float16 matrix of embeddings, memory-mapped from disk.
+
+    Rows are keyed by content hash, so documents with the same text share a
+    vector and re-indexing unchanged content costs nothing. Vectors are written
+    before the metadata, which only ever refers to rows already on disk.
+    """
+
+    def __init__(self, directory, backend_name, dim):
+        self.directory = directory
+        self.backend_name = backend_name
+        self.dim = dim
+        self.count = 0
+        self.rows = {}  # content hash -> row
+        self.doc_rows = {}  # doc id -> row
+        self._matrix = None
+        self._doc_arrays = None
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.directory, 'vectors.f16')
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.directory, 'meta.pkl')
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_rows
+
+    def add(self, documents, backend):
+        """Add or refresh (doc_id, content_hash, text) documents, embedding only unseen content."""
+        new = {}
+        for _, content_hash, text in documents:
+            if content_hash not in self.rows and content_hash not in new:
+                new[content_hash] = text
+        if new:
+            vectors = backend.embed(list(new.values())).astype(np.float16)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.vectors_path, 'r+b' if os.path.exists(self.vectors_path) else 'wb') as fh:
+                # Anything past the last recorded row is a leftover from an interrupted write
+                fh.seek(self.count * self.dim * 2)
+                fh.write(vectors.tobytes())
+                fh.truncate()
+            for content_hash in new:
+                self.rows[content_hash] = self.count
+                self.count += 1
+            self._matrix = None
+        for doc_id, content_hash, _ in documents:
+            self.doc_rows[doc_id] = self.rows[content_hash]
+        self._doc_arrays = None
+
+    def remove(self, doc_id):
+        # The row stays on disk until the store is rebuilt
+        if self.doc_rows.pop(doc_id, None) is not None:
+            self._doc_arrays = None
+
+    def matrix(self):
+        if self._matrix is None:
+            if not self.count:
+                return np.zeros((0, self.dim), dtype=np.float16)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float16, mode='r', shape=(self.count, self.dim))
+        return self._matrix
+
+    def vector(self, doc_id):
+        return np.asarray(self.matrix()[self.doc_rows[doc_id]], dtype=np.float32)
+
+    def nearest(self, vector, k, candidate_ids=None):
+        """Return [(doc_id, cosine similarity)] of the k documents closest to the vector."""
+        if self._doc_arrays is None:
+            self._doc_arrays = (np.fromiter(self.doc_rows.keys(), dtype=np.int64, count=len(self.doc_rows)),
+                                np.fromiter(self.doc_rows.values(), dtype=np.int64, count=len(self.doc_rows)))
+        doc_ids, doc_rows = self._doc_arrays
+        if not len(doc_ids):
+            return []
+
+        matrix = self.matrix()
+        vector = np.asarray(vector, dtype=np.float32)
+        row_scores = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, _SCORE_CHUNK):
+            row_scores[start:start + _SCORE_CHUNK] = matrix[start:start + _SCORE_CHUNK].astype(np.float32) @ vector
+        scores = row_scores[doc_rows]
+
+        mask = np.ones(len(doc_ids), dtype=bool)
+        if candidate_ids is not None:
+            mask &= np.isin(doc_ids, np.fromiter(candidate_ids, dtype=np.int64, count=len(candidate_ids)))
+        positions = np.flatnonzero(mask)
+        if len(positions) > k:
+            positions = positions[np.argpartition(-scores[positions], k - 1)[:k]]
+        positions = positions[np.argsort(-scores[positions], kind='stable')]
+        return [(int(doc_ids[p]), float(scores[p])) for p in positions]
+
+    def save(self):
+        """Atomically persist the row mapping so other workers can load it."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            pickle.dump({
+                'backend': self.backend_name,
+                'dim': self.dim,
+                'count': self.count,
+                'rows': self.rows,
+                'doc_rows': self.doc_rows,
+            }, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.meta_path)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, 'meta.pkl'), 'rb') as fh:
+            meta = pickle.load(fh)
+        store = cls(directory, meta['backend'], meta['dim'])
+        store.count = meta['count']
+        store.rows = meta['rows']
+        store.doc_rows = meta['doc_rows']
+        return store
+
+
+def cv_document(cv):
+    # Hashed here rather than read from text_hash, which an edit through the API leaves stale
+    return cv.id, text_hash(cv.content), cv.content
+
+
+def job_document(job):
+    # The title, industry and skills are parsed from the content, so its hash still keys the vector
+    return job.id, text_hash(job.content), search_index.job_query_text(job)
+
+
+KINDS = {
+    'cv': (CV, cv_document),
+    'job': (JobDescription, job_document),
+}
+
+_lock = threading.RLock()
+_stores = {}
+_store_mtimes = {}
+
+
+def _store_dir(kind):
+    return os.path.join(settings.EMBEDDING_ROOT, kind)
+
+
+def _store_lock(kind):
+    """Hold the store of a kind against writers in this and every other process.
+
+    Without it, workers would append at the same row or save metadata that drops
+    each other's rows.
+    """
+    return file_lock(os.path.join(_store_dir(kind), 'lock'), _lock)
+
+
+def build_store(kind):
+    """Build a fresh store over every CV or job with content, replacing the one on disk."""
+    model, document = KINDS[kind]
+    backend = get_backend()
+    directory = _store_dir(kind)
+    # Write the new store beside the old one so readers keep a consistent view until the swap
+    tmp_directory = f'{directory}.{os.getpid()}.tmp'
+    store = EmbeddingStore(tmp_directory, backend.name, backend.dim)
+    objects = list(model.objects.exclude(content=''))
+    for i in range(0, len(objects), 500):
+        store.add([document(obj) for obj in objects[i:i + 500]], backend)
+    store.save()
+
+    os.makedirs(directory, exist_ok=True)
+    with _store_lock(kind):
+        for name in ('vectors.f16', 'meta.pkl'):
+            if os.path.exists(os.path.join(tmp_directory, name)):
+                os.replace(os.path.join(tmp_directory, name), os.path.join(directory, name))
+        os.rmdir(tmp_directory)
+        store.directory = directory
+        store._matrix = None
+        _remember(kind, store)
+    return store
+
+
+def get_store(kind, reload=False):
+    """Return the process-wide store of a kind, reloading it if another worker saved a newer copy.
+
+    Writers pass `reload` while holding the store lock, so they append after the
+    last row on disk even when a save landed within the same mtime tick.
+    """
+    backend = get_backend()
+    with _lock:
+        meta_path = os.path.join(_store_dir(kind), 'meta.pkl')
+        try:
+            mtime = os.path.getmtime(meta_path)
+        except OSError:
+            mtime = None
+
+        if mtime is None:
+            print(f"Building {kind} embedding index from database...")
+            return build_store(kind)
+        if reload or mtime != _store_mtimes.get(kind):
+            try:
+                store = EmbeddingStore.load(_store_dir(kind))
+            except Exception as e:
+                print(f"Could not load {kind} embedding index ({e}), rebuilding...")
+                return build_store(kind)
+            if store.backend_name != backend.name or store.dim != backend.dim:
+                print(f"Embedding backend changed to {backend.name}, rebuilding the {kind} index...")
+                return build_store(kind)
+            _stores[kind] = store
+            _store_mtimes[kind] = mtime
+        return _stores[kind]
+
+
+def _remember(kind, store):
+    _stores[kind] = store
+    _store_mtimes[kind] = os.path.getmtime(store.meta_path)
+
+
+def _add(kind, objects):
+    _, document = KINDS[kind]
+    documents = [document(obj) for obj in objects if obj.content]
+    if not documents:
+        return
+    with _store_lock(kind):
+        store = get_store(kind, reload=True)
+        store.add(documents, get_backend())
+        store.save()
+        _remember(kind, store)
+
+
+def _remove(kind, doc_id):
+    with _store_lock(kind):
+        store = get_store(kind, reload=True)
+        if doc_id in store:
+            store.remove(doc_id)
+            store.save()
+            _remember(kind, store)
+
+
+def add_cvs(cvs):
+    """Embed new or changed CVs and append them to the index with a single write."""
+    _add('cv', cvs)
+
+
+def add_jobs(jobs):
+    """Embed new or changed jobs and append them to the index with a single write."""
+    _add('job', jobs)
+
+
+def remove_cv(cv_id):
+    _remove('cv', cv_id)
+
+
+def remove_job(job_id):
+    _remove('job', job_id)
+
+
+def _nearest(source_kind, source, target_kind, queryset, k):
+    target_model, _ = KINDS[target_kind]
+    candidate_ids = set((queryset if queryset is not None else target_model.objects)
+                        .exclude(content='').values_list('id', flat=True))
+    with _lock:
+        source_store = get_store(source_kind)
+        if source.id not in source_store:
+            _add(source_kind, [source])
+            source_store = get_store(source_kind)
+        target_store = get_store(target_kind)
+        # Pick up documents another worker added but whose index write we lost
+        missing_ids = [doc_id for doc_id in candidate_ids if doc_id not in target_store]
+        if missing_ids:
+            _add(target_kind, target_model.objects.filter(id__in=missing_ids))
+            target_store = get_store(target_kind)
+        return target_store.nearest(source_store.vector(source.id), k, candidate_ids=candidate_ids)
+
+
+def nearest_jobs(cv, k=10, queryset=None):
+    """Return [(job_id, similarity)] of the k jobs closest to the CV, optionally within a queryset."""
+    if not cv.content:
+        return []
+    return _nearest('cv', cv, 'job', queryset, k)
+
+
+def nearest_cvs(job, k=10, queryset=None):
+    """Return [(cv_id, similarity)] of the k CVs closest to the job, optionally within a queryset."""
+    if not job.content:
+        return []
+    return _nearest('job', job, 'cv', queryset, k)
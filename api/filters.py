@@ -0,0 +1,60 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+WORD_RE = re.compile(r'\w+')
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """`?search=` over the model's `search_vector` column, ranked by ts_rank.
+
+    Every word has to match, the last one as a prefix so results keep up while
+    a word is being typed. The view's `search_fields` are matched by substring
+    as well (trigram indexed on their upper case form, which is what
+    `icontains` compares), which keeps partial names and titles searchable.
+    The newest SEARCH_MAX_RESULTS matches are returned, ordered by rank unless
+    the request asks for an explicit `?ordering=`; when more documents match,
+    `request.search_truncated` is set and the paginated response says so.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = [term.strip('"') for term in filters.search_smart_split(self.get_search_terms(request))]
+        terms = [term for term in terms if term]
+        if not terms:
+            return queryset
+
+        condition = Q()
+        for field in getattr(view, 'search_fields', []):
+            substring = Q()
+            for term in terms:
+                substring &= Q(**{f'{field}__icontains': term})
+            condition |= substring
+
+        words = WORD_RE.findall(' '.join(terms).lower())
+        if not words:
+            # Nothing the text index can look up, such as punctuation only
+            return queryset.filter(condition) if condition else queryset.none()
+
+        # Too short a prefix would match most of the vocabulary
+        last = f'{words[-1]}:*' if len(words[-1]) >= 3 else words[-1]
+        query = SearchQuery(' & '.join(words[:-1] + [last]), search_type='raw', config='english')
+        condition |= Q(search_vector=query)
+        # A broad query matches a large share of the table and ranking every match means
+        # reading every one of their vectors; only the most recent matches are ranked
+        limit = settings.SEARCH_MAX_RESULTS
+        recent = list(queryset.filter(condition).order_by('-pk').values_list('pk', flat=True)[:limit + 1])
+        if len(recent) > limit:
+            request.search_truncated = True
+            recent = recent[:limit]
+        # ts_rank is a real; as double precision its value survives a round trip through a
+        # keyset cursor and compares equal to itself
+        rank = Cast(SearchRank(F('search_vector'), query), FloatField())
+        queryset = queryset.filter(pk__in=recent).annotate(search_rank=rank)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by('-search_rank', '-pk')
+        return queryset
@@ -1,42 +1,158 @@
-import google.generativeai as genai
 from django.conf import settings
 import json
 import re
-from django.core.cache import cache
-import hashlib
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, as_completed, wait
+from asgiref.sync import sync_to_async
+from .llm_client import estimate_tokens, get_llm_client
+from .match_cache import match_cache, match_cache_key, job_content_hash
+from .near_duplicates import reusable_results
+from .prompt_compression import compress_cv, compress_job, job_terms
+from .scoring import score_industry, score_tech_skills
+from .skills import VOCABULARY_VERSION
+from .utils import content_hash
+
+# Bump whenever a match prompt or its parsing changes so cached results are not reused
+PROMPT_VERSION = 'match-v4'
 
 class GeminiAI:
     def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-1.5-flash-latest')
-        self.max_workers = 3  # Limit concurrent API calls to avoid rate limits
-    
-    def _get_cache_key(self, cv_id, job_id):
-        """Generate a unique cache key for a CV-job match pair."""
-        return f"match_result_{cv_id}_{job_id}"
-
-    def process_cv_job_match(self, cv_id, job_id, cv_text, job_description, job_industry, technical_skills):
-        """Process a CV and job description match using Gemini, with caching."""
-        # Check if we have a cached result
-        cache_key = self._get_cache_key(cv_id, job_id)
-        cached_result = cache.get(cache_key)
-        
-        if cached_result:
-            print(f"Using cached match result for CV {cv_id} and Job {job_id}")
-            return cached_result
-        
-        # Calculate a hash of the CV and job texts to detect changes
-        cv_hash = hashlib.md5(cv_text.encode()).hexdigest()[:10]
-        job_hash = hashlib.md5(job_description.encode()).hexdigest()[:10]
-        
-        # Generate a more efficient prompt with content summarization for large texts
-        cv_summary = self._summarize_text(cv_text, 3000)  # Limit to 3000 chars
-        job_summary = self._summarize_text(job_description, 2000)  # Limit to 2000 chars
-        
+        # All calls go through the process-wide client, which owns the model,
+        # the rate limiter and the adaptive concurrency limit
+        self.client = get_llm_client()
+        self.model = self.client.model
+
+    def _get_cache_key(self, cv_hash, job_hash, prompt_version):
+        """Generate a content-addressed cache key for a CV-job match pair."""
+        return match_cache_key(cv_hash, job_hash, prompt_version, self.client.model_name)
+
+    def _build_profile_prompt(self, cv_text):
+        cv_summary = compress_cv(cv_text, settings.PROMPT_PROFILE_TOKEN_BUDGET)
+        return f"""
+        Extract a structured profile from this CV.
+
+        CV: {cv_summary}
+
+        Return JSON only:
+        {{
+            "skills": ["technical skills, tools, languages and frameworks the candidate has used"],
+            "industries": ["industries the candidate has worked in"],
+            "years_experience": [total years of professional experience as a number],
+            "seniority": "one of: intern, junior, mid, senior, lead, principal"
+        }}
+        """
+
+    def _parse_profile_response(self, response_text):
+        json_match = re.search(r'\{.*\}', response_text.strip(), re.DOTALL)
+        if not json_match:
+            raise ValueError('No JSON object in profile response')
+
+        result = json.loads(json_match.group(0))
+        try:
+            years = float(result.get('years_experience') or 0)
+        except (TypeError, ValueError):
+            years = 0.0
+        return {
+            'skills': [str(s).strip() for s in result.get('skills') or [] if str(s).strip()],
+            'industries': [str(i).strip() for i in result.get('industries') or [] if str(i).strip()],
+            'years_experience': max(years, 0.0),
+            'seniority': str(result.get('seniority') or '')[:50],
+        }
+
+    def extract_cv_profile(self, cv_text):
+        """Extract a structured profile (skills, industries, experience) from a CV once."""
+        response = self.client.generate(self._build_profile_prompt(cv_text))
+        return self._parse_profile_response(response.text)
+
+    def extract_cv_profiles(self, cv_texts):
+        """Extract profiles for {cv_id: text} concurrently; failed extractions map to None."""
+        prompts = {cv_id: self._build_profile_prompt(text) for cv_id, text in cv_texts.items()}
+        futures = {self.client.submit(prompt): cv_id for cv_id, prompt in prompts.items()}
+        if prompts:
+            tokens = sum(estimate_tokens(prompt) for prompt in prompts.values())
+            print(f"Submitted {len(prompts)} profile prompts, {tokens} input tokens "
+                  f"({tokens // len(prompts)} per CV)")
+        profiles = {}
+        for future in as_completed(futures):
+            cv_id = futures[future]
+            try:
+                profiles[cv_id] = self._parse_profile_response(future.result().text)
+            except Exception as e:
+                print(f"Profile extraction failed for CV {cv_id}: {e}")
+                profiles[cv_id] = None
+        return profiles
+
+    def _prepare_match(self, cv_id, job_id, cv_text, job_description, job_industry, technical_skills, cv_profile=None,
+                       tech_skills_score=None):
+        """Build the cache key and prompt for a CV-job pair.
+
+        Returns a dict with the 'prompt' to send to Gemini together with
+        everything needed to cache and finish the match. A precomputed
+        `tech_skills_score` (from the skill vocabulary) replaces any other
+        skills score.
+        """
+        # The cache is keyed on content, so edited CVs miss and re-uploaded or
+        # duplicated documents hit regardless of their database ids
+        cv_hash = content_hash(cv_text)
+        job_hash = job_content_hash(job_description, job_industry, technical_skills)
+        mode = 'profile' if cv_profile is not None else 'full'
+        prompt_version = f"{PROMPT_VERSION}-{mode}"
+        if tech_skills_score is not None:
+            prompt_version += f"-skills{VOCABULARY_VERSION}"
+        cache_key = self._get_cache_key(cv_hash, job_hash, prompt_version)
+
+        # Keep the CV sections most relevant to the job's skills, and the job's own
+        # requirements over its company blurb and benefits, within fixed token budgets
+        cv_summary = compress_cv(cv_text, settings.PROMPT_CV_TOKEN_BUDGET,
+                                 job_terms(job_description, technical_skills))
+        job_summary = compress_job(job_description, settings.PROMPT_JOB_TOKEN_BUDGET)
+
+        request = {
+            'cv_id': cv_id,
+            'job_id': job_id,
+            'cache_key': cache_key,
+            'prompt_version': prompt_version,
+            'cv_hash': cv_hash,
+            'job_hash': job_hash,
+            'mode': mode,
+            'local_scores': None,
+            # Kept so several pairs for the same job can be packed into one batch prompt
+            'cv_summary': cv_summary,
+            'job_summary': job_summary,
+            'job_industry': job_industry,
+            'technical_skills': technical_skills,
+        }
+
+        if cv_profile is not None:
+            # Industry and skills come from the CV profile, only the description needs the LLM
+            request['local_scores'] = {
+                'industry_score': score_industry(cv_profile, job_industry),
+                'tech_skills_score': score_tech_skills(cv_profile, technical_skills),
+            }
+        if tech_skills_score is not None:
+            request['local_scores'] = dict(request['local_scores'] or {}, tech_skills_score=tech_skills_score)
+
+        if mode == 'profile':
+            request['prompt'] = f"""
+        As a CV-Job matching expert, rate the overall compatibility of this CV with the job description
+        from 0-100, considering qualifications, experience and relevant domains.
+
+        CV: {cv_summary}
+
+        Job: {job_summary}
+
+        Provide a very brief explanation of why this candidate is a good or bad match in 10-15 words.
+
+        Return JSON only:
+        {{
+            "description_match_score": [0-100],
+            "explanation": "Very brief explanation (10-15 words)"
+        }}
+        """
+            return request
+
         # Simplified prompt to reduce token usage
         skills_json = json.dumps(technical_skills)
-        prompt = f"""
+        request['prompt'] = f"""
         As a CV-Job matching expert, analyze this CV and job description to score match quality:
 
         Industry Match (10%): Rate how well the candidate's experience matches the {job_industry} industry.
@@ -46,11 +162,11 @@ class GeminiAI:
         For each criterion, provide a score from 0-100.
 
         CV: {cv_summary}
-        
+
         Job: {job_summary}
-        
+
         Provide a very brief explanation of why this candidate is a good or bad match in 10-15 words.
-        
+
         Return JSON only:
         {{
             "industry_score": [0-100],
@@ -59,102 +175,306 @@ class GeminiAI:
             "explanation": "Very brief explanation (10-15 words)"
         }}
         """
-        
-        response = self.model.generate_content(prompt)
-        result_text = response.text.strip()
-        
+        return request
+
+    def _complete_match(self, request, result_text, cache_records=None):
+        """Parse Gemini's answer for a prepared match, cache it and return the normalized scores.
+
+        When `cache_records` is given, durable cache writes are appended to it
+        so the caller can persist a whole batch at once.
+        """
+        local_scores = request['local_scores'] or {}
+
         # Extract JSON from the response
-        json_match = re.search(r'\{.*\}', result_text, re.DOTALL)
+        json_match = re.search(r'\{.*\}', (result_text or '').strip(), re.DOTALL)
         if json_match:
             try:
                 result = json.loads(json_match.group(0))
-                # Normalize scores to 0-1 range
+                # Normalize scores to 0-1 range; locally computed scores take precedence
                 normalized_result = {
-                    'industry_score': result['industry_score'] / 100,
-                    'tech_skills_score': result['tech_skills_score'] / 100,
+                    key: result[key] / 100
+                    for key in ('industry_score', 'tech_skills_score') if key not in local_scores
+                }
+                normalized_result.update(local_scores)
+                normalized_result.update({
                     'description_match_score': result['description_match_score'] / 100,
                     'explanation': result.get('explanation', ''),
-                    'cv_hash': cv_hash,
-                    'job_hash': job_hash
-                }
-                
-                # Cache the result for future use (expire after 24 hours)
-                cache.set(cache_key, normalized_result, 86400)
+                    'cv_hash': request['cv_hash'],
+                    'job_hash': request['job_hash']
+                })
+
+                self._cache_result(request, normalized_result, cache_records=cache_records)
                 return normalized_result
-            except json.JSONDecodeError:
+            except (json.JSONDecodeError, KeyError, TypeError):
                 # Fallback if JSON parsing fails
                 pass
-        
-        # Default fallback
+
+        # Default fallback; locally computed scores are still valid
         fallback_result = {
             'industry_score': 0.5,
             'tech_skills_score': 0.5,
             'description_match_score': 0.5,
             'explanation': 'Could not process result',
-            'cv_hash': cv_hash,
-            'job_hash': job_hash
+            # No content hashes, so stored matches built from a fallback are rescored later
+            'cv_hash': '',
+            'job_hash': ''
         }
-        # Cache the fallback result too, but for a shorter time
-        cache.set(cache_key, fallback_result, 3600)
+        fallback_result.update(local_scores)
+        # Keep the fallback in memory for a short time only so it gets retried later
+        self._cache_result(request, fallback_result, durable=False)
         return fallback_result
-    
-    def _summarize_text(self, text, max_length=3000):
-        """Smartly truncate text to max_length, preserving important content."""
-        if len(text) <= max_length:
-            return text
-        
-        # For simplicity, we'll take the first 60% and last 40% of the allowed length
-        # This helps preserve both the intro and conclusion of documents
-        first_part = int(max_length * 0.6)
-        last_part = max_length - first_part
-        
-        return text[:first_part] + "\n...[content truncated]...\n" + text[-last_part:]
-        
-    def process_matches_parallel(self, matches_data):
-        """Process multiple matches in parallel with controlled concurrency."""
-        results = []
-        
-        def process_single_match(match_data):
-            cv_id = match_data.get('cv_id')
-            job_id = match_data.get('job_id')
-            cv_text = match_data.get('cv_text')
-            job_description = match_data.get('job_description')
-            job_industry = match_data.get('job_industry')
-            technical_skills = match_data.get('technical_skills', {})
-            
-            result = self.process_cv_job_match(
-                cv_id, job_id, cv_text, job_description, job_industry, technical_skills
-            )
-            return {
-                'cv_id': cv_id,
-                'job_id': job_id,
-                'result': result
+
+    def _cache_result(self, request, result, durable=True, cache_records=None):
+        if not durable:
+            match_cache.set_local(request['cache_key'], result, ttl=3600)
+            return
+        record = match_cache.make_record(
+            request['cache_key'], result,
+            cv_hash=request['cv_hash'],
+            job_hash=request['job_hash'],
+            prompt_version=request['prompt_version'],
+            model_name=self.client.model_name,
+        )
+        match_cache.set_local(request['cache_key'], result)
+        if cache_records is not None:
+            cache_records.append(record)
+        else:
+            match_cache.persist([record])
+
+    def _lookup_cached(self, request):
+        cached_result = match_cache.get(request['cache_key'])
+        if cached_result is not None:
+            print(f"Using cached match result for CV {request['cv_id']} and Job {request['job_id']}")
+        return cached_result
+
+    def process_cv_job_match(self, cv_id, job_id, cv_text, job_description, job_industry, technical_skills, cv_profile=None):
+        """Process a CV and job description match using Gemini, with caching.
+
+        When a CVProfile is given, the industry and technical skills scores are
+        computed locally and only the description match is asked from Gemini.
+        """
+        request = self._prepare_match(
+            cv_id, job_id, cv_text, job_description, job_industry, technical_skills, cv_profile
+        )
+        cached_result = self._lookup_cached(request)
+        if cached_result is not None:
+            return cached_result
+
+        response = self.client.generate(request['prompt'])
+        return self._complete_match(request, response.text)
+
+    def _prepare_match_data(self, match_data):
+        return self._prepare_match(
+            match_data.get('cv_id'),
+            match_data.get('job_id'),
+            match_data.get('cv_text'),
+            match_data.get('job_description'),
+            match_data.get('job_industry'),
+            match_data.get('technical_skills', {}),
+            match_data.get('cv_profile'),
+            match_data.get('tech_skills_score'),
+        )
+
+    def _error_result(self, match_data):
+        return {
+            'cv_id': match_data.get('cv_id'),
+            'job_id': match_data.get('job_id'),
+            'result': {
+                'industry_score': 0,
+                'tech_skills_score': 0,
+                'description_match_score': 0,
+                'explanation': 'Error processing match',
             }
-        
-        # Use ThreadPoolExecutor to process matches in parallel with limited concurrency
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all tasks
-            future_to_match = {executor.submit(process_single_match, match_data): match_data 
-                              for match_data in matches_data}
-            
-            # Collect results as they complete
-            for future in future_to_match:
+        }
+
+    def _plan_batches(self, pending_requests):
+        """Group uncached pairs by job and scoring mode and pack them into token-bounded batches."""
+        groups = {}
+        for match_data, request in pending_requests:
+            groups.setdefault((request['job_id'], request['mode']), []).append((match_data, request))
+
+        budget = settings.GEMINI_BATCH_TOKEN_BUDGET
+        max_size = settings.GEMINI_BATCH_MAX_SIZE
+        batches = []
+        for entries in groups.values():
+            # Job description and instructions are paid once per batch
+            header_tokens = estimate_tokens(entries[0][1]['job_summary']) + 300
+            batch, batch_tokens = [], header_tokens
+            for entry in entries:
+                entry_tokens = estimate_tokens(entry[1]['cv_summary']) + 20
+                if batch and (len(batch) >= max_size or batch_tokens + entry_tokens > budget):
+                    batches.append(batch)
+                    batch, batch_tokens = [], header_tokens
+                batch.append(entry)
+                batch_tokens += entry_tokens
+            if batch:
+                batches.append(batch)
+        return batches
+
+    def _build_batch_prompt(self, batch):
+        """Build one prompt scoring several CVs against the same job."""
+        first = batch[0][1]
+        candidates = "\n\n".join(
+            f"### Candidate {request['cv_id']}\n{request['cv_summary']}" for _, request in batch
+        )
+
+        if first['mode'] == 'profile':
+            criteria = "Overall Description Match: Rate overall compatibility from 0-100, considering qualifications, experience and relevant domains."
+            fields = '"description_match_score": [0-100],'
+        else:
+            skills_json = json.dumps(first['technical_skills'])
+            criteria = f"""Industry Match (10%): Rate how well the candidate's experience matches the {first['job_industry']} industry.
+        Technical Skills (30%): Rate how well the candidate's skills match: {skills_json}
+        Overall Description Match (60%): Rate overall compatibility.
+
+        For each criterion, provide a score from 0-100."""
+            fields = '"industry_score": [0-100], "tech_skills_score": [0-100], "description_match_score": [0-100],'
+
+        return f"""
+        As a CV-Job matching expert, score each candidate CV below against this job independently:
+
+        {criteria}
+
+        Job: {first['job_summary']}
+
+        Candidates:
+
+        {candidates}
+
+        For each candidate, provide a very brief explanation of why they are a good or bad match in 10-15 words.
+
+        Return a JSON array only, with one object per candidate:
+        [
+            {{"cv_id": [candidate number], {fields} "explanation": "Very brief explanation (10-15 words)"}}
+        ]
+        """
+
+    def _parse_batch_response(self, result_text, batch):
+        """Map cv_id -> per-candidate JSON object for every well-formed entry of a batch answer."""
+        json_match = re.search(r'\[.*\]', (result_text or '').strip(), re.DOTALL)
+        if not json_match:
+            return {}
+        try:
+            items = json.loads(json_match.group(0))
+        except json.JSONDecodeError:
+            return {}
+
+        required = ['description_match_score']
+        if batch[0][1]['mode'] == 'full':
+            required += ['industry_score', 'tech_skills_score']
+
+        parsed = {}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            if all(isinstance(item.get(key), (int, float)) for key in required):
+                parsed[str(item.get('cv_id'))] = item
+        return parsed
+
+    def iter_matches(self, matches_data):
+        """Yield match results as they complete, batching uncached pairs that share a job.
+
+        Candidates missing or malformed in a batch answer are retried with
+        their own per-pair prompt.
+        """
+        requests = [(match_data, self._prepare_match_data(match_data)) for match_data in matches_data]
+        # One cache round trip for the whole batch
+        cached = match_cache.get_many([request['cache_key'] for _, request in requests])
+
+        uncached = []
+        for match_data, request in requests:
+            if request['cache_key'] in cached:
+                yield {
+                    'cv_id': match_data.get('cv_id'),
+                    'job_id': match_data.get('job_id'),
+                    'result': cached[request['cache_key']]
+                }
+            else:
+                uncached.append((match_data, request))
+
+        if settings.NEAR_DUPLICATE_SCORE_REUSE and uncached:
+            # A lightly edited copy of an already scored CV takes over that CV's scores
+            reused = reusable_results([request for _, request in uncached])
+            if reused:
+                print(f"Reusing near-duplicate scores for {len(reused)} of {len(uncached)} uncached pairs")
+            remaining = []
+            for match_data, request in uncached:
+                result = reused.get((request['cv_id'], request['job_id']))
+                if result is None:
+                    remaining.append((match_data, request))
+                    continue
+                yield {
+                    'cv_id': match_data.get('cv_id'),
+                    'job_id': match_data.get('job_id'),
+                    'result': result
+                }
+            uncached = remaining
+
+        # The client throttles and bounds concurrency, so everything can be submitted at once
+        pending = {}
+        cache_records = []
+        prompt_tokens = 0
+        for batch in self._plan_batches(uncached):
+            prompt = batch[0][1]['prompt'] if len(batch) == 1 else self._build_batch_prompt(batch)
+            prompt_tokens += estimate_tokens(prompt)
+            pending[self.client.submit(prompt)] = batch
+        if pending:
+            print(f"Submitted {len(pending)} match prompts for {len(uncached)} pairs, {prompt_tokens} input tokens "
+                  f"({prompt_tokens // len(uncached)} per pair)")
+
+        try:
+            yield from self._collect_matches(pending, cache_records)
+        finally:
+            # New results reach the shared cache tier in one write
+            match_cache.persist(cache_records)
+
+    def _collect_matches(self, pending, cache_records):
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = pending.pop(future)
                 try:
-                    result = future.result()
-                    results.append(result)
+                    response_text = future.result().text
                 except Exception as exc:
                     print(f'Match processing generated an exception: {exc}')
-                    # Still include the match but with an error result
-                    match_data = future_to_match[future]
-                    results.append({
+                    if len(batch) == 1:
+                        # Still include the match but with an error result
+                        yield self._error_result(batch[0][0])
+                    else:
+                        for match_data, request in batch:
+                            pending[self.client.submit(request['prompt'])] = [(match_data, request)]
+                    continue
+
+                if len(batch) == 1:
+                    match_data, request = batch[0]
+                    yield {
+                        'cv_id': match_data.get('cv_id'),
+                        'job_id': match_data.get('job_id'),
+                        'result': self._complete_match(request, response_text, cache_records)
+                    }
+                    continue
+
+                items = self._parse_batch_response(response_text, batch)
+                for match_data, request in batch:
+                    item = items.get(str(request['cv_id']))
+                    if item is None:
+                        print(f"Batch answer missing CV {request['cv_id']}, falling back to a single prompt")
+                        pending[self.client.submit(request['prompt'])] = [(match_data, request)]
+                        continue
+                    yield {
                         'cv_id': match_data.get('cv_id'),
                         'job_id': match_data.get('job_id'),
-                        'result': {
-                            'industry_score': 0,
-                            'tech_skills_score': 0,
-                            'description_match_score': 0,
-                            'explanation': 'Error processing match',
-                        }
-                    })
-        
-        return results
\ No newline at end of file
+                        'result': self._complete_match(request, json.dumps(item), cache_records)
+                    }
+
+    def process_matches_parallel(self, matches_data):
+        """Process multiple matches concurrently through the shared rate-limited client."""
+        return list(self.iter_matches(matches_data))
+
+    async def process_matches_async(self, matches_data):
+        """Async counterpart of process_matches_parallel for views served through ASGI.
+
+        A single worker thread drives the whole set; the Gemini calls themselves
+        run on the client's event loop.
+        """
+        return await sync_to_async(self.process_matches_parallel, thread_sensitive=False)(matches_data)
@@ -0,0 +1,202 @@
+"""Models behind the shared LLM client, selected with the LLM_BACKEND setting.
+
+Every backend exposes the subset of google.generativeai's GenerativeModel the
+client uses: `generate_content(prompt)`, `generate_content_async(prompt)` and
+responses with a `.text`, plus a `name` that keeps cached results of different
+backends apart.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from google.api_core import exceptions as api_exceptions
+
+
+class LLMResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+class GeminiModel:
+    """The Gemini API through google.generativeai."""
+
+    def __init__(self):
+        import google.generativeai as genai
+
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        self.name = settings.GEMINI_MODEL
+
+    def generate_content(self, prompt):
+        return self.model.generate_content(prompt)
+
+    async def generate_content_async(self, prompt):
+        return await self.model.generate_content_async(prompt)
+
+
+class SimulatedModel:
+    """Offline stand-in for Gemini that answers every prompt the matching code sends.
+
+    Scores are a deterministic function of the prompt: the square root of the
+    share of the job's terms found in the CV, plus a little hash-based jitter. Latency follows a
+    log-normal distribution around LLM_SIMULATOR_LATENCY_MS. A seeded share of
+    calls fails with a rate-limit error (LLM_SIMULATOR_RATE_LIMIT_RATE) or
+    returns malformed JSON (LLM_SIMULATOR_MALFORMED_RATE), so retries and
+    fallbacks get exercised too.
+    """
+
+    def __init__(self, seed=None, latency_ms=None, latency_sigma=None, rate_limit_rate=None, malformed_rate=None):
+        self.seed = settings.LLM_SIMULATOR_SEED if seed is None else seed
+        self.latency_ms = settings.LLM_SIMULATOR_LATENCY_MS if latency_ms is None else latency_ms
+        self.latency_sigma = settings.LLM_SIMULATOR_LATENCY_SIGMA if latency_sigma is None else latency_sigma
+        self.rate_limit_rate = settings.LLM_SIMULATOR_RATE_LIMIT_RATE if rate_limit_rate is None else rate_limit_rate
+        self.malformed_rate = settings.LLM_SIMULATOR_MALFORMED_RATE if malformed_rate is None else malformed_rate
+        self.name = f'simulator-{self.seed}'
+        # Failures and latencies come from one seeded stream, so a run replays the same
+        # sequence of events while a retried prompt can still succeed
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        with self._lock:
+            latency = self.latency_ms / 1000 * self._random.lognormvariate(0, self.latency_sigma)
+            return latency, self._random.random(), self._random.random()
+
+    def _outcome(self, prompt):
+        latency, throttle_draw, malformed_draw = self._draw()
+        if throttle_draw < self.rate_limit_rate:
+            # Throttled calls fail fast, like a 429 would
+            return latency / 10, None
+        if malformed_draw < self.malformed_rate:
+            return latency, LLMResponse('Sorry, here are the scores: {"description_match_score": ')
+        return latency, LLMResponse(self.answer(prompt))
+
+    def generate_content(self, prompt):
+        latency, response = self._outcome(prompt)
+        time.sleep(latency)
+        if response is None:
+            raise api_exceptions.TooManyRequests('Simulated rate limit')
+        return response
+
+    async def generate_content_async(self, prompt):
+        latency, response = self._outcome(prompt)
+        await asyncio.sleep(latency)
+        if response is None:
+            raise api_exceptions.TooManyRequests('Simulated rate limit')
+        return response
+
+    def _score(self, cv_text, job_text, salt):
+        from .search_index import tokenize
+
+        job_terms = set(tokenize(job_text))
+        coverage = len(job_terms & set(tokenize(cv_text))) / len(job_terms) if job_terms else 0.5
+        jitter = int(prompt_hash(f'{self.seed}|{salt}|{cv_text}|{job_text}')[:8], 16) % 11 - 5
+        return max(0, min(100, round(15 + 85 * coverage ** 0.5) + jitter))
+
+    def _scores(self, cv_text, job_text):
+        description = self._score(cv_text, job_text, 'description')
+        return {
+            'industry_score': self._score(cv_text, job_text, 'industry'),
+            'tech_skills_score': self._score(cv_text, job_text, 'skills'),
+            'description_match_score': description,
+            'explanation': f'Simulated match scoring {description}/100 on the job description.',
+        }
+
+    def _profile(self, cv_text):
+        from .skills import tag_skills
+
+        years = int(prompt_hash(f'{self.seed}|years|{cv_text}')[:8], 16) % 16
+        seniority = 'junior' if years < 3 else 'mid' if years < 6 else 'senior' if years < 10 else 'lead'
+        return {
+            'skills': tag_skills(cv_text),
+            'industries': ['IT'],
+            'years_experience': years,
+            'seniority': seniority,
+        }
+
+    def answer(self, prompt):
+        """The well-formed answer to a prompt."""
+        if 'Extract a structured profile' in prompt:
+            return json.dumps(self._profile(_between(prompt, 'CV:', 'Return JSON')))
+
+        candidates = re.split(r'### Candidate (\d+)\n', prompt)
+        if len(candidates) > 1:
+            job_text = _between(prompt, 'Job:', 'Candidates:')
+            answers = []
+            for cv_id, section in zip(candidates[1::2], candidates[2::2]):
+                cv_text = section.split('For each candidate,')[0]
+                answers.append(dict(self._scores(cv_text, job_text), cv_id=int(cv_id)))
+            return json.dumps(answers)
+
+        return json.dumps(self._scores(_between(prompt, 'CV:', 'Job:'), _between(prompt, 'Job:', 'Provide a very')))
+
+
+def _between(text, start, end):
+    head, _, tail = text.partition(start)
+    return tail.split(end)[0] if tail else head
+
+
+class ReplayModel:
+    """Answers prompts from a file recorded with LLM_RECORD_PATH, without any network.
+
+    Prompts missing from the recording fail like a non-retryable API error.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.LLM_REPLAY_PATH
+        self.responses = {}
+        with open(self.path, encoding='utf-8') as fh:
+            for line in fh:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.responses[entry['prompt_hash']] = entry['text']
+        self.name = f'replay-{os.path.basename(self.path)}'
+
+    def generate_content(self, prompt):
+        text = self.responses.get(prompt_hash(prompt))
+        if text is None:
+            raise api_exceptions.NotFound('Prompt not in the replay recording')
+        return LLMResponse(text)
+
+    async def generate_content_async(self, prompt):
+        return self.generate_content(prompt)
+
+
+class RecordingModel:
+    """Wraps another backend and appends every answer to a JSONL file for later replay."""
+
+    def __init__(self, model, path):
+        self.model = model
+        self.path = path
+        self.name = model.name
+        self._lock = threading.Lock()
+
+    def _record(self, prompt, response):
+        with self._lock, open(self.path, 'a', encoding='utf-8') as fh:
+            fh.write(json.dumps({'prompt_hash': prompt_hash(prompt), 'text': response.text}) + '\n')
+        return response
+
+    def generate_content(self, prompt):
+        return self._record(prompt, self.model.generate_content(prompt))
+
+    async def generate_content_async(self, prompt):
+        return self._record(prompt, await self.model.generate_content_async(prompt))
+
+
+def create_model():
+    """Instantiate the configured backend, wrapped for recording if LLM_RECORD_PATH is set."""
+    model = import_string(settings.LLM_BACKEND)()
+    if settings.LLM_RECORD_PATH:
+        model = RecordingModel(model, settings.LLM_RECORD_PATH)
+    return model
@@ -0,0 +1,190 @@
+import asyncio
+import random
+import threading
+import time
+
+from google.api_core import exceptions as api_exceptions
+from django.conf import settings
+
+from . import metrics
+from .llm_backends import create_model
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token) used for rate budgeting."""
+    return max(1, len(text or '') // 4)
+
+
+def is_rate_limit_error(exc):
+    return isinstance(exc, (api_exceptions.TooManyRequests, api_exceptions.ResourceExhausted))
+
+
+def is_retryable_error(exc):
+    return is_rate_limit_error(exc) or isinstance(
+        exc, (api_exceptions.ServerError, api_exceptions.DeadlineExceeded)
+    )
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`, holding at most one minute of budget."""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.fill_rate = rate_per_minute / 60.0
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.fill_rate)
+        self.updated_at = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if they are available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.fill_rate
+
+    def consume(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets shared by every caller in the process."""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, token_count):
+        while True:
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(token_count))
+            if wait <= 0:
+                self.requests.consume(1)
+                self.tokens.consume(token_count)
+                return
+            await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit: grows while latency is stable, shrinks on slowdowns and throttling."""
+
+    def __init__(self, initial, minimum, maximum, latency_tolerance=1.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.avg_latency = None
+        self._changed = None
+
+    async def acquire(self):
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency, throttled=False):
+        if throttled:
+            self.limit = max(self.minimum, self.limit / 2)
+        elif latency is not None:
+            if self.avg_latency is None:
+                self.avg_latency = latency
+            if latency > self.avg_latency * self.latency_tolerance:
+                self.limit = max(self.minimum, self.limit * 0.9)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.avg_latency = 0.8 * self.avg_latency + 0.2 * latency
+
+        async with self._changed:
+            self.in_flight -= 1
+            self._changed.notify_all()
+
+
+class AsyncGeminiClient:
+    """Process-wide LLM client running every call on one background event loop.
+
+    Sync code submits prompts with `submit()` and waits on the returned
+    concurrent future; coroutines running on another loop (ASGI views) can
+    `await generate_async()`. Either way no thread is held per in-flight call.
+    `model` is any backend from api.llm_backends.
+    """
+
+    def __init__(self, model, requests_per_minute, tokens_per_minute,
+                 initial_concurrency, min_concurrency, max_concurrency,
+                 max_retries, base_delay=1.0, max_delay=30.0):
+        self.model = model
+        self.model_name = model.name
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.concurrency = AdaptiveConcurrencyLimiter(initial_concurrency, min_concurrency, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='gemini-client', daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    async def _generate(self, prompt):
+        token_count = estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(token_count)
+            await self.concurrency.acquire()
+            started = time.monotonic()
+            try:
+                response = await self.model.generate_content_async(prompt)
+            except Exception as exc:
+                await self.concurrency.release(None, throttled=is_rate_limit_error(exc))
+                if not is_retryable_error(exc) or attempt == self.max_retries:
+                    raise
+                # Exponential backoff with full jitter
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                print(f"Gemini call failed ({exc.__class__.__name__}), retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            await self.concurrency.release(time.monotonic() - started)
+            return response
+
+    def submit(self, prompt):
+        """Schedule a prompt on the client loop and return a concurrent.futures.Future."""
+        future = asyncio.run_coroutine_threadsafe(self._generate(prompt), self._get_loop())
+        return metrics.track_llm_call(future, estimate_tokens(prompt))
+
+    def generate(self, prompt):
+        """Blocking call for sync code paths."""
+        return self.submit(prompt).result()
+
+    async def generate_async(self, prompt):
+        """Awaitable call usable from any event loop, e.g. async views served by cv_matcher.asgi."""
+        return await asyncio.wrap_future(self.submit(prompt))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Return the shared client for the configured LLM backend, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AsyncGeminiClient(
+                model=create_model(),
+                requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.GEMINI_TOKENS_PER_MINUTE,
+                initial_concurrency=settings.GEMINI_INITIAL_CONCURRENCY,
+                min_concurrency=settings.GEMINI_MIN_CONCURRENCY,
+                max_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+                max_retries=settings.GEMINI_MAX_RETRIES,
+            )
+        return _client
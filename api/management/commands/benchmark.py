@@ -0,0 +1,265 @@
+import contextlib
+import glob
+import json
+import os
+import platform
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.models import CV, JobDescription
+
+SCENARIOS = ['upload', 'find_matching_cvs', 'find_best_job', 'top_candidates', 'matches', 'statistics']
+
+# Metrics compared against a baseline, and whether a higher value is better
+COMPARED_METRICS = {
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+    'throughput_rps': True,
+    'queries_mean': False,
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark uploads, matching and listing endpoints against a scratch database seeded from '
+            'data/cvs and data/jobs, with a simulated LLM.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma separated subset of scenarios')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients')
+        parser.add_argument('--uploads', type=int, default=20,
+                            help='CVs held back from seeding and uploaded by the upload scenario')
+        parser.add_argument('--max-cvs', type=int, default=10, help='max_cvs passed to find_matching_cvs')
+        parser.add_argument('--llm-backend', default='api.llm_backends.SimulatedModel', help='LLM_BACKEND to use')
+        parser.add_argument('--llm-latency-ms', type=float, default=200, help='Median simulated LLM latency')
+        parser.add_argument('--seed', type=int, default=0, help='Simulator seed')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the scratch database between runs')
+        parser.add_argument('--output', help='Results file (default: benchmarks/<timestamp>.json)')
+        parser.add_argument('--compare', help='Earlier results file to compare this run against')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Percent change in a compared metric reported as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on regressions')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        cv_files = sorted(glob.glob(os.path.join(settings.BASE_DIR, 'data', 'cvs', '*.docx')))
+        job_dir = os.path.join(settings.BASE_DIR, 'data', 'jobs')
+        held_back = cv_files[-options['uploads']:] if options['uploads'] and 'upload' in scenarios else []
+        seed_files = cv_files[:len(cv_files) - len(held_back)]
+
+        # Indexes, uploaded files and LLM results all live in a scratch area and database
+        scratch = tempfile.mkdtemp(prefix='cv-matcher-benchmark-')
+        index_root = os.path.join(scratch, 'indexes')
+        overrides = override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            MEDIA_ROOT=os.path.join(scratch, 'media'),
+            UPLOAD_STAGING_ROOT=os.path.join(scratch, 'uploads'),
+            INDEX_ROOT=index_root,
+            CV_INDEX_PATH=os.path.join(index_root, 'cv_bm25.pkl'),
+            CV_MINHASH_PATH=os.path.join(index_root, 'cv_minhash.pkl'),
+            EMBEDDING_ROOT=os.path.join(index_root, 'embeddings'),
+            LLM_BACKEND=options['llm_backend'],
+            LLM_RECORD_PATH='',
+            LLM_SIMULATOR_SEED=options['seed'],
+            LLM_SIMULATOR_LATENCY_MS=options['llm_latency_ms'],
+        )
+
+        setup_test_environment()
+        overrides.enable()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            started = time.perf_counter()
+            if not CV.objects.exists():
+                call_command('ingest', cvs=seed_files, jobs=[job_dir], stdout=open(os.devnull, 'w'))
+            seed_seconds = time.perf_counter() - started
+            self.stdout.write(f"Seeded {CV.objects.count()} CVs and {JobDescription.objects.count()} jobs "
+                              f"in {seed_seconds:.1f}s; {len(held_back)} CVs held back for uploads")
+
+            results = {
+                'meta': {
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                    'commit': self._git_commit(),
+                    'python': platform.python_version(),
+                    'database': connection.vendor,
+                    'cvs': CV.objects.count(),
+                    'jobs': JobDescription.objects.count(),
+                    'seed_seconds': round(seed_seconds, 2),
+                    'options': {key: options[key] for key in (
+                        'requests', 'concurrency', 'uploads', 'max_cvs', 'llm_backend', 'llm_latency_ms', 'seed'
+                    )},
+                },
+                'scenarios': {},
+            }
+            for name in scenarios:
+                requests = self._requests(name, options, held_back)
+                if not requests:
+                    self.stderr.write(f"Skipping {name}: nothing to request")
+                    continue
+                # The views log every request; only show that with -v 2
+                with contextlib.redirect_stdout(open(os.devnull, 'w')) if options['verbosity'] < 2 \
+                        else contextlib.nullcontext():
+                    metrics = self._run(requests, options['concurrency'])
+                results['scenarios'][name] = metrics
+                self.stdout.write(
+                    f"{name:>18}: {metrics['requests']:4d} req | {metrics['throughput_rps']:7.1f} req/s | "
+                    f"p50 {metrics['p50_ms']:8.1f} ms | p95 {metrics['p95_ms']:8.1f} ms | "
+                    f"p99 {metrics['p99_ms']:8.1f} ms | {metrics['queries_mean']:6.1f} queries/req | "
+                    f"{metrics['errors']} errors"
+                )
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            overrides.disable()
+            teardown_test_environment()
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks', f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as fh:
+            json.dump(results, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+        if options['compare']:
+            regressions = self._compare(options['compare'], results, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"{regressions} metrics regressed by more than {options['threshold']}%")
+
+    def _requests(self, name, options, held_back):
+        """Build the (method, path, data) list for a scenario, cycling over the seeded rows."""
+        count = options['requests']
+        if name == 'upload':
+            return [('post', '/api/cvs/', {'file': path}) for path in held_back]
+        if name == 'find_matching_cvs':
+            job_ids = list(JobDescription.objects.order_by('id').values_list('id', flat=True))
+            return [('get', f"/api/jobs/{job_ids[i % len(job_ids)]}/find_matching_cvs/?max_cvs={options['max_cvs']}",
+                     None) for i in range(count)] if job_ids else []
+        if name == 'find_best_job':
+            cv_ids = list(CV.objects.order_by('id').values_list('id', flat=True))
+            return [('get', f"/api/cvs/{cv_ids[i % len(cv_ids)]}/find_best_job/", None)
+                    for i in range(count)] if cv_ids else []
+        if name == 'top_candidates':
+            job_ids = list(JobDescription.objects.order_by('id').values_list('id', flat=True))
+            return [('get', f"/api/jobs/{job_ids[i % len(job_ids)]}/top_candidates/", None)
+                    for i in range(count)] if job_ids else []
+        if name == 'matches':
+            return [('get', f"/api/matches/?page={i % 5 + 1}", None) for i in range(count)]
+        return [('get', '/api/statistics/', None) for _ in range(count)]
+
+    def _run(self, requests, concurrency):
+        """Send the requests from `concurrency` client threads and summarize latencies and queries."""
+        work = queue.Queue()
+        for request in requests:
+            work.put(request)
+        samples = []
+        samples_lock = threading.Lock()
+
+        def client_thread():
+            client = Client()
+            query_count = [0]
+
+            def count_queries(execute, sql, params, many, context):
+                query_count[0] += 1
+                return execute(sql, params, many, context)
+
+            try:
+                with connection.execute_wrapper(count_queries):
+                    while True:
+                        try:
+                            method, path, data = work.get_nowait()
+                        except queue.Empty:
+                            return
+                        query_count[0] = 0
+                        started = time.perf_counter()
+                        if data and 'file' in data:
+                            with open(data['file'], 'rb') as fh:
+                                response = client.post(path, {'file': fh})
+                        else:
+                            response = getattr(client, method)(path)
+                        elapsed = time.perf_counter() - started
+                        with samples_lock:
+                            samples.append((elapsed, query_count[0], response.status_code))
+            finally:
+                # Connections are per thread; close them so the scratch database can be dropped
+                connections.close_all()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client_thread) for _ in range(max(1, concurrency))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+        queries = [count for _, count, _ in samples]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, _, code in samples if code >= 400),
+            'wall_seconds': round(wall, 3),
+            'throughput_rps': round(len(samples) / wall, 2) if wall else 0.0,
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(latencies[-1], 2),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+        }
+
+    def _compare(self, baseline_path, results, threshold):
+        """Print per-metric changes against a baseline run and return how many regressed."""
+        with open(baseline_path) as fh:
+            baseline = json.load(fh)
+        self.stdout.write(f"\nCompared with {baseline_path} ({baseline['meta'].get('commit') or 'unknown commit'}):")
+        regressions = 0
+        for name, metrics in results['scenarios'].items():
+            before = baseline.get('scenarios', {}).get(name)
+            if not before:
+                continue
+            changes = []
+            for metric, higher_is_better in COMPARED_METRICS.items():
+                old, new = before.get(metric), metrics.get(metric)
+                if not old or new is None:
+                    continue
+                change = (new - old) / old * 100
+                worse = -change if higher_is_better else change
+                marker = ''
+                if worse > threshold:
+                    regressions += 1
+                    marker = ' REGRESSION'
+                changes.append(f"{metric} {old:g} -> {new:g} ({change:+.1f}%){marker}")
+            self.stdout.write(f"{name:>18}: " + ' | '.join(changes))
+        return regressions
+
+    def _git_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                                  capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ''
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.embeddings import build_store, get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the CV and job embedding indexes, dropping vectors of edited or deleted documents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['cv', 'job'], help='Only rebuild one index')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        for kind in [options['kind']] if options['kind'] else ['cv', 'job']:
+            started = time.perf_counter()
+            store = build_store(kind)
+            self.stdout.write(
+                f"Embedded {len(store.doc_rows)} {kind}s into {store.count} {backend.name} vectors "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
@@ -0,0 +1,180 @@
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from api import statistics
+from api.dedup import find_duplicates
+from api.embeddings import add_jobs as add_job_embeddings
+from api.models import CV, JobDescription
+from api.persistence import upsert_job_descriptions
+from api.search_index import index_cvs
+from api.workers import extract_document, init_worker
+
+
+class Command(BaseCommand):
+    help = 'Bulk load CV and job description .docx files, extracting text across a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cvs', nargs='*', help='CV files or directories (default: data/cvs)')
+        parser.add_argument('--jobs', nargs='*', help='Job description files or directories (default: data/jobs)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Extraction processes')
+        parser.add_argument('--batch-size', type=int, default=200, help='Rows written per transaction')
+
+    def handle(self, *args, **options):
+        if options['cvs'] is None and options['jobs'] is None:
+            options['cvs'] = [os.path.join(settings.BASE_DIR, 'data', 'cvs')]
+            options['jobs'] = [os.path.join(settings.BASE_DIR, 'data', 'jobs')]
+
+        timings = {'scan': 0.0, 'extract': 0.0, 'parse': 0.0, 'insert': 0.0, 'index': 0.0}
+        started = time.perf_counter()
+        work = [(path, 'cv') for path in self._collect(options['cvs'])]
+        work += [(path, 'job') for path in self._collect(options['jobs'])]
+        timings['scan'] = time.perf_counter() - started
+        if not work:
+            self.stderr.write('No .docx files found.')
+            return
+        self.stdout.write(f"Ingesting {len(work)} files with {options['workers']} workers...")
+
+        counts = {'cv_created': 0, 'cv_updated': 0, 'job_created': 0, 'job_updated': 0, 'duplicates': 0, 'failed': 0}
+        indexed_cvs, indexed_jobs = [], []
+        pending = {'cv': [], 'job': []}
+        connections.close_all()
+
+        wall_started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=max(1, options['workers']),
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_worker) as executor:
+            paths, kinds = zip(*work)
+            chunksize = max(1, len(work) // (max(1, options['workers']) * 4))
+            for (path, kind), document in zip(work, executor.map(extract_document, paths, kinds, chunksize=chunksize)):
+                timings['extract'] += document['extract_time']
+                timings['parse'] += document['parse_time']
+                if document.get('error') or not document.get('content'):
+                    counts['failed'] += 1
+                    self.stderr.write(f"Skipping {path}: {document.get('error', 'no text content')}")
+                    continue
+                if kind == 'job' and not document['parsed'].get('title'):
+                    counts['failed'] += 1
+                    self.stderr.write(f"Skipping {path}: could not parse a job title")
+                    continue
+
+                pending[kind].append(document)
+                if len(pending[kind]) >= options['batch_size']:
+                    timings['insert'] += self._flush(kind, pending, counts, indexed_cvs, indexed_jobs)
+            for kind in pending:
+                timings['insert'] += self._flush(kind, pending, counts, indexed_cvs, indexed_jobs)
+        wall = time.perf_counter() - wall_started
+
+        started = time.perf_counter()
+        if indexed_cvs:
+            index_cvs(indexed_cvs)
+        if indexed_jobs:
+            add_job_embeddings(indexed_jobs)
+        timings['index'] = time.perf_counter() - started
+
+        self.stdout.write(
+            f"CVs: {counts['cv_created']} created, {counts['cv_updated']} updated | "
+            f"jobs: {counts['job_created']} created, {counts['job_updated']} updated | "
+            f"{counts['duplicates']} duplicates | {counts['failed']} skipped"
+        )
+        # extract and parse are summed over workers; the pool runs them concurrently with inserts
+        self.stdout.write(
+            f"Timings: scan {timings['scan']:.2f}s | extract {timings['extract']:.2f}s (cpu) | "
+            f"parse {timings['parse']:.2f}s (cpu) | insert {timings['insert']:.2f}s | "
+            f"index {timings['index']:.2f}s | pool wall {wall:.2f}s"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {timings['scan'] + wall + timings['index']:.2f}s."
+        ))
+
+    def _collect(self, paths):
+        files = []
+        for path in paths or []:
+            if os.path.isdir(path):
+                files.extend(sorted(glob.glob(os.path.join(path, '*.docx'))))
+            elif path.lower().endswith('.docx'):
+                files.append(path)
+        return files
+
+    def _flush(self, kind, pending, counts, indexed_cvs, indexed_jobs):
+        documents, pending[kind] = pending[kind], []
+        if not documents:
+            return 0.0
+        started = time.perf_counter()
+        stored = []
+        try:
+            with transaction.atomic():
+                if kind == 'cv':
+                    self._write_cvs(documents, counts, indexed_cvs, stored)
+                else:
+                    self._write_jobs(documents, counts, indexed_jobs)
+        except Exception:
+            # The rows rolled back, but the files stored for them did not
+            for cv in stored:
+                cv.file.delete(save=False)
+            raise
+        return time.perf_counter() - started
+
+    def _write_cvs(self, documents, counts, indexed_cvs, stored):
+        # Re-ingesting a file refreshes the CV with the same name instead of duplicating it
+        existing = {cv.name: cv for cv in CV.objects.filter(name__in=[d['name'] for d in documents]).only('id', 'name')}
+        # A renamed copy of a stored CV is not stored again
+        known_files, known_texts = find_duplicates(
+            CV,
+            file_hashes=[d['file_hash'] for d in documents if d['name'] not in existing],
+            text_hashes=[d['text_hash'] for d in documents if d['name'] not in existing],
+        )
+        to_update, to_create = [], []
+        seen = set()
+        for document in documents:
+            cv = existing.get(document['name'])
+            if cv is not None:
+                cv.content = document['content']
+                cv.file_hash = document['file_hash']
+                cv.text_hash = document['text_hash']
+                cv.skill_tags = document['skill_tags']
+                to_update.append(cv)
+                continue
+            hashes = {document['file_hash'], document['text_hash']}
+            if document['file_hash'] in known_files or document['text_hash'] in known_texts or hashes & seen:
+                counts['duplicates'] += 1
+                continue
+            seen |= hashes
+            cv = CV(name=document['name'], content=document['content'], file_hash=document['file_hash'],
+                    text_hash=document['text_hash'], skill_tags=document['skill_tags'])
+            with open(document['path'], 'rb') as fh:
+                cv.file.save(document['name'], File(fh), save=False)
+            stored.append(cv)
+            to_create.append(cv)
+
+        CV.objects.bulk_update(to_update, ['content', 'file_hash', 'text_hash', 'skill_tags'])
+        CV.objects.bulk_create(to_create)
+        statistics.documents_added('cvs', to_create)
+        counts['cv_updated'] += len(to_update)
+        counts['cv_created'] += len(to_create)
+        indexed_cvs.extend(to_update + to_create)
+
+    def _write_jobs(self, documents, counts, indexed_jobs):
+        jobs = [
+            JobDescription(
+                title=document['parsed']['title'],
+                content=document['content'],
+                industry=document['parsed']['industry'],
+                technical_skills=document['parsed']['technical_skills'],
+                file_hash=document['file_hash'],
+                text_hash=document['text_hash'],
+                skill_tags=document['skill_tags'],
+            )
+            for document in documents
+        ]
+        saved, created = upsert_job_descriptions(jobs)
+        counts['job_updated'] += len(saved) - created
+        counts['job_created'] += created
+        indexed_jobs.extend(saved.values())
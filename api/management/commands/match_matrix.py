@@ -0,0 +1,158 @@
+import json
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from api.match_cache import job_content_hash
+from api.models import CV, JobDescription, MatchResult
+from api.utils import content_hash
+from api.workers import init_worker, score_job_chunk
+
+
+class Command(BaseCommand):
+    help = 'Score the full CV x job matrix (or a slice of it), skipping pairs that are already up to date.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cv-ids', help='Comma-separated CV ids to include')
+        parser.add_argument('--job-ids', help='Comma-separated job ids to include')
+        parser.add_argument('--industry', help='Only jobs whose industry contains this text')
+        parser.add_argument('--workers', type=int, default=2, help='Worker processes')
+        parser.add_argument('--chunk-size', type=int, default=50, help='CVs per job in one task')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.INDEX_ROOT, 'match_matrix_checkpoint.json'),
+                            help='Progress file used to resume an interrupted run')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+        parser.add_argument('--force', action='store_true', help='Rescore pairs even if they are up to date')
+
+    def handle(self, *args, **options):
+        cvs = CV.objects.exclude(content='')
+        jobs = JobDescription.objects.all()
+        if options['cv_ids']:
+            cvs = cvs.filter(id__in=[int(i) for i in options['cv_ids'].split(',')])
+        if options['job_ids']:
+            jobs = jobs.filter(id__in=[int(i) for i in options['job_ids'].split(',')])
+        if options['industry']:
+            jobs = jobs.filter(industry__icontains=options['industry'])
+
+        cv_hashes = {cv_id: content_hash(content) for cv_id, content in cvs.values_list('id', 'content')}
+        job_hashes = {
+            job_id: job_content_hash(content, industry, skills)
+            for job_id, content, industry, skills in jobs.values_list('id', 'content', 'industry', 'technical_skills')
+        }
+
+        checkpoint = self._load_checkpoint(options['checkpoint'], options['restart'])
+        # A forced run that is resumed skips the pairs it already rescored
+        resume_since = None
+        if options['force'] and checkpoint['started_at']:
+            # Compared as datetimes: isoformat strings in different UTC offsets don't sort by time
+            resume_since = datetime.fromisoformat(checkpoint['started_at'])
+            if timezone.is_naive(resume_since):
+                resume_since = timezone.make_aware(resume_since)
+
+        # A pair is up to date when it was scored from the current CV and job content
+        up_to_date = set()
+        existing = MatchResult.objects.filter(
+            cv_id__in=cv_hashes, job_id__in=job_hashes
+        ).values_list('cv_id', 'job_id', 'cv_hash', 'job_hash', 'matched_at')
+        for cv_id, job_id, cv_hash, job_hash, matched_at in existing.iterator():
+            if resume_since:
+                if matched_at >= resume_since:
+                    up_to_date.add((cv_id, job_id))
+            elif not options['force'] and cv_hash == cv_hashes[cv_id] and job_hash == job_hashes[job_id]:
+                up_to_date.add((cv_id, job_id))
+
+        tasks = []
+        cv_ids = sorted(cv_hashes)
+        for job_id in sorted(job_hashes):
+            pending = [cv_id for cv_id in cv_ids if (cv_id, job_id) not in up_to_date]
+            for i in range(0, len(pending), options['chunk_size']):
+                tasks.append((job_id, pending[i:i + options['chunk_size']]))
+
+        total_pairs = len(cv_hashes) * len(job_hashes)
+        todo_pairs = sum(len(chunk) for _, chunk in tasks)
+        self.stdout.write(
+            f"{total_pairs} pairs selected, {len(up_to_date)} up to date, "
+            f"{todo_pairs} to score in {len(tasks)} tasks "
+            f"({checkpoint['scored']} scored in earlier runs)"
+        )
+        if not tasks:
+            self._clear_checkpoint(options['checkpoint'])
+            return
+
+        if not checkpoint['started_at']:
+            checkpoint['started_at'] = timezone.now().isoformat()
+        prior_elapsed = checkpoint['elapsed']
+        failed_pairs = {tuple(pair) for pair in checkpoint['failed']}
+
+        workers = max(1, options['workers'])
+        # Every worker has its own client, so the process-wide budget is split between them
+        initargs = (
+            max(1, settings.GEMINI_REQUESTS_PER_MINUTE // workers),
+            max(1, settings.GEMINI_TOKENS_PER_MINUTE // workers),
+        )
+        connections.close_all()
+
+        started = time.monotonic()
+        done_pairs = 0
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_worker, initargs=initargs) as executor:
+            futures = {executor.submit(score_job_chunk, job_id, chunk): (job_id, chunk) for job_id, chunk in tasks}
+            try:
+                for future in as_completed(futures):
+                    job_id, chunk = futures[future]
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        self.stderr.write(f"Task for job {job_id} failed: {e}")
+                        outcome = {'job_id': job_id, 'pairs': len(chunk), 'scored': 0, 'failed': chunk}
+
+                    done_pairs += outcome['pairs']
+                    failed_pairs -= {(cv_id, job_id) for cv_id in chunk}
+                    failed_pairs |= {(cv_id, job_id) for cv_id in outcome['failed']}
+                    checkpoint['scored'] += outcome['scored']
+                    checkpoint['failed'] = sorted(failed_pairs)
+                    checkpoint['elapsed'] = prior_elapsed + time.monotonic() - started
+                    self._save_checkpoint(options['checkpoint'], checkpoint)
+
+                    elapsed = time.monotonic() - started
+                    rate = done_pairs / elapsed if elapsed else 0
+                    eta = (todo_pairs - done_pairs) / rate if rate else 0
+                    self.stdout.write(
+                        f"[{done_pairs}/{todo_pairs}] job {job_id}: {outcome['scored']} scored, "
+                        f"{len(outcome['failed'])} failed | {rate:.1f} pairs/s | ETA {int(eta // 60)}m{int(eta % 60):02d}s"
+                    )
+            except KeyboardInterrupt:
+                self.stderr.write("Interrupted, progress is saved; run the command again to resume.")
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {checkpoint['scored']} pairs in {checkpoint['elapsed']:.0f}s, "
+            f"{len(failed_pairs)} failed (they will be retried on the next run)."
+        ))
+        if not failed_pairs:
+            self._clear_checkpoint(options['checkpoint'])
+
+    def _load_checkpoint(self, path, restart):
+        checkpoint = {'started_at': None, 'scored': 0, 'failed': [], 'elapsed': 0.0}
+        if not restart and os.path.exists(path):
+            with open(path) as fh:
+                checkpoint.update(json.load(fh))
+        return checkpoint
+
+    def _clear_checkpoint(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _save_checkpoint(self, path, checkpoint):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump(checkpoint, fh)
+        os.replace(tmp_path, path)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import statistics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard statistics counters from the CV, job and match tables.'
+
+    def handle(self, *args, **options):
+        counters = statistics.rebuild()
+        self.stdout.write(f"Rebuilt {len(counters)} statistics counters")
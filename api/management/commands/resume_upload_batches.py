@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.batch_uploads import fail_batch, process_batch, unfinished_batches
+
+
+class Command(BaseCommand):
+    help = ('Finish upload batches that a server restart left pending or processing; '
+            'run while no server is processing batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail', action='store_true',
+                            help='Mark the unfinished batches failed instead of processing them')
+
+    def handle(self, *args, **options):
+        batches = list(unfinished_batches())
+        for batch in batches:
+            if options['fail']:
+                fail_batch(batch, 'Interrupted by a server restart.')
+                self.stdout.write(f"Marked upload batch {batch.id} failed")
+            else:
+                process_batch(batch.id, resume=True)
+                batch.refresh_from_db()
+                self.stdout.write(f"Upload batch {batch.id} {batch.status}")
+        self.stdout.write(f"{len(batches)} unfinished upload batches")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.models import CV, JobDescription
+from api.skills import tag_cv, tag_job
+
+
+class Command(BaseCommand):
+    help = 'Tag CVs and jobs with canonical skills; run after editing the skill vocabulary.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true', help='Only tag rows that have never been tagged')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per bulk update')
+
+    def handle(self, *args, **options):
+        for model, tag in ((CV, tag_cv), (JobDescription, tag_job)):
+            queryset = model.objects.all()
+            if options['missing']:
+                queryset = queryset.filter(skill_tags__isnull=True)
+
+            batch, tagged = [], 0
+            for obj in queryset.iterator(chunk_size=options['batch_size']):
+                batch.append(tag(obj))
+                if len(batch) >= options['batch_size']:
+                    model.objects.bulk_update(batch, ['skill_tags'])
+                    tagged += len(batch)
+                    batch = []
+            model.objects.bulk_update(batch, ['skill_tags'])
+            tagged += len(batch)
+            self.stdout.write(f"Tagged {tagged} {model._meta.verbose_name_plural}")
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import metrics
+from .models import CachedMatch
+from .utils import content_hash
+
+
+def job_content_hash(job_description, job_industry, technical_skills):
+    """Hash everything about a job that goes into a match prompt."""
+    payload = json.dumps([job_description, job_industry, technical_skills or {}], sort_keys=True)
+    return content_hash(payload)
+
+
+def match_cache_key(cv_hash, job_hash, prompt_version, model_name):
+    """Content-addressed cache key: identical texts, prompt and model always share a result."""
+    raw = '|'.join([cv_hash, job_hash, prompt_version, model_name])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class MatchCache:
+    """In-process LRU in front of the CachedMatch table.
+
+    Results flagged as non-durable (fallbacks after a bad LLM answer) only
+    live in the LRU for a short time so a later request can retry them.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at or None, result)
+        self._lock = threading.Lock()
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def _set_local(self, key, result, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Return {key: result} for every cached key, reading the DB once for LRU misses."""
+        started = time.perf_counter()
+        found = {}
+        missing = []
+        for key in keys:
+            result = self._get_local(key)
+            if result is not None:
+                found[key] = result
+            else:
+                missing.append(key)
+        local_hits = len(found)
+
+        if missing:
+            for key, result in CachedMatch.objects.filter(key__in=missing).values_list('key', 'result'):
+                self._set_local(key, result)
+                found[key] = result
+        metrics.record_cache_lookups(local_hits, len(found) - local_hits, len(keys) - len(found),
+                                     time.perf_counter() - started)
+        return found
+
+    def set_local(self, key, result, ttl=None):
+        self._set_local(key, result, ttl=ttl)
+
+    def make_record(self, key, result, cv_hash, job_hash, prompt_version, model_name):
+        return CachedMatch(
+            key=key,
+            cv_hash=cv_hash,
+            job_hash=job_hash,
+            prompt_version=prompt_version,
+            model_name=model_name,
+            result=result,
+        )
+
+    def persist(self, records):
+        """Write durable records to the shared tier with one upsert."""
+        if not records:
+            return
+        # Identical CV texts share a key; Postgres rejects an upsert touching a row twice
+        records = list({record.key: record for record in records}.values())
+        CachedMatch.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['result', 'cv_hash', 'job_hash', 'prompt_version', 'model_name'],
+        )
+
+
+match_cache = MatchCache(settings.MATCH_CACHE_LRU_SIZE)
@@ -0,0 +1,237 @@
+"""Per-request performance numbers for Server-Timing headers, plus process-wide Prometheus metrics.
+
+Code anywhere in a request calls `record()` or `timer()`; the numbers land on
+the request's RequestMetrics (set by PerformanceMetricsMiddleware) and, where
+a histogram or counter is given, in the process-wide registry rendered by
+/api/metrics/. Outside a request only the registry is updated.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(labelnames, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with _registry_lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with _registry_lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_label_text(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [per-bucket counts, sum, count]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with _registry_lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with _registry_lock:
+            for key, (bucket_counts, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    labels = _label_text(self.labelnames + ('le',), key + (f'{bound:g}',))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                labels = _label_text(self.labelnames + ('le',), key + ('+Inf',))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+                lines.append(f'{self.name}_sum{_label_text(self.labelnames, key)} {total}')
+                lines.append(f'{self.name}_count{_label_text(self.labelnames, key)} {count}')
+        return lines
+
+
+REQUESTS = Counter('cvmatcher_http_requests_total', 'Requests served.', ('endpoint', 'method', 'status'))
+REQUEST_DURATION = Histogram('cvmatcher_http_request_duration_seconds',
+                             'Time to produce a response (time to first byte for streams).', ('endpoint', 'method'))
+REQUEST_SQL_QUERIES = Histogram('cvmatcher_http_request_sql_queries', 'SQL queries per request.', ('endpoint',),
+                                buckets=COUNT_BUCKETS)
+REQUEST_SQL_DURATION = Histogram('cvmatcher_http_request_sql_duration_seconds', 'SQL time per request.',
+                                 ('endpoint',))
+LLM_CALL_DURATION = Histogram('cvmatcher_llm_call_duration_seconds',
+                              'LLM call latency, including rate limiting and retries.', ('outcome',))
+LLM_PROMPT_TOKENS = Counter('cvmatcher_llm_prompt_tokens_total', 'Estimated prompt tokens sent to the LLM.')
+CACHE_LOOKUPS = Counter('cvmatcher_match_cache_lookups_total', 'Match cache lookups by outcome.', ('result',))
+EXTRACTION_DURATION = Histogram('cvmatcher_docx_extraction_duration_seconds', 'Time to extract text from a .docx.')
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetrics:
+    """Counts and durations collected while one request is handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.values = {}  # name -> [count, seconds]
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds=0.0, count=1):
+        # LLM callbacks land here from the client's event loop thread
+        with self._lock:
+            entry = self.values.setdefault(name, [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+
+    def count(self, name):
+        return self.values.get(name, [0, 0.0])[0]
+
+    def seconds(self, name):
+        return self.values.get(name, [0, 0.0])[1]
+
+    def server_timing(self):
+        """Render the collected numbers as a Server-Timing header value."""
+        entries = []
+        if self.count('sql'):
+            entries.append(f'sql;dur={self.seconds("sql") * 1000:.1f};desc="{self.count("sql")} queries"')
+        if self.count('llm'):
+            entries.append(f'llm;dur={self.seconds("llm") * 1000:.1f};'
+                           f'desc="{self.count("llm")} calls, {self.count("llm_tokens")} tokens"')
+        if self.count('cache_hit') or self.count('cache_miss'):
+            entries.append(f'cache;dur={self.seconds("cache") * 1000:.1f};'
+                           f'desc="{self.count("cache_hit")} hits, {self.count("cache_miss")} misses"')
+        if self.count('extract'):
+            entries.append(f'extract;dur={self.seconds("extract") * 1000:.1f};desc="{self.count("extract")} files"')
+        entries.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.1f}')
+        return ', '.join(entries)
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add('sql', time.perf_counter() - started)
+
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+def current():
+    """The RequestMetrics of the request being handled, or None."""
+    return _current.get()
+
+
+def record(name, seconds=0.0, count=1):
+    metrics = current()
+    if metrics is not None:
+        metrics.add(name, seconds, count)
+
+
+@contextmanager
+def timer(name, histogram=None):
+    """Time a block into the current request and, optionally, a histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        record(name, elapsed)
+        if histogram is not None:
+            histogram.observe(elapsed)
+
+
+def track_llm_call(future, tokens):
+    """Record an LLM call submitted from this thread once its future completes."""
+    metrics = current()
+    started = time.perf_counter()
+    LLM_PROMPT_TOKENS.inc(tokens)
+
+    def done(future):
+        elapsed = time.perf_counter() - started
+        failed = future.cancelled() or future.exception() is not None
+        LLM_CALL_DURATION.observe(elapsed, outcome='error' if failed else 'ok')
+        if metrics is not None:
+            metrics.add('llm', elapsed)
+            metrics.add('llm_tokens', count=tokens)
+
+    future.add_done_callback(done)
+    return future
+
+
+def record_cache_lookups(local_hits, db_hits, misses, seconds):
+    CACHE_LOOKUPS.inc(local_hits, result='local_hit')
+    CACHE_LOOKUPS.inc(db_hits, result='db_hit')
+    CACHE_LOOKUPS.inc(misses, result='miss')
+    metrics = current()
+    if metrics is not None:
+        metrics.add('cache', seconds, count=0)
+        metrics.add('cache_hit', count=local_hits + db_hits)
+        metrics.add('cache_miss', count=misses)
+
+
+class PerformanceMetricsMiddleware:
+    """Collect SQL, LLM, cache and extraction numbers per request.
+
+    They are sent back in a Server-Timing header and feed the per-endpoint
+    histograms. Streaming responses are measured up to the first byte and get
+    no header, since most of their work happens after it is sent.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with connection.execute_wrapper(metrics.sql_wrapper):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        elapsed = time.perf_counter() - metrics.started
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match else 'unmatched'
+        REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        REQUEST_DURATION.observe(elapsed, endpoint=endpoint, method=request.method)
+        REQUEST_SQL_QUERIES.observe(metrics.count('sql'), endpoint=endpoint)
+        REQUEST_SQL_DURATION.observe(metrics.seconds('sql'), endpoint=endpoint)
+        if not response.streaming:
+            response['Server-Timing'] = metrics.server_timing()
+        return response
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-18 10:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_matchresult_explanation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CVProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('skills', models.JSONField(default=list)),
+                ('industries', models.JSONField(default=list)),
+                ('years_experience', models.FloatField(default=0)),
+                ('seniority', models.CharField(blank=True, max_length=50)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('extracted_at', models.DateTimeField(auto_now=True)),
+                ('cv', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to='api.cv')),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_cvprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('cv_hash', models.CharField(db_index=True, max_length=64)),
+                ('job_hash', models.CharField(db_index=True, max_length=64)),
+                ('prompt_version', models.CharField(max_length=50)),
+                ('model_name', models.CharField(max_length=100)),
+                ('result', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
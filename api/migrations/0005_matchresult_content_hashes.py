@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_cachedmatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchresult',
+            name='cv_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='matchresult',
+            name='job_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
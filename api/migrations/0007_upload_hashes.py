@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-18 11:13
+
+import hashlib
+import unicodedata
+
+from django.db import migrations, models
+
+
+def backfill_text_hashes(apps, schema_editor):
+    # Same normalization as api.dedup.text_hash, frozen here
+    def text_hash(text):
+        normalized = ' '.join(unicodedata.normalize('NFKC', text or '').casefold().split())
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    for model_name in ('CV', 'JobDescription'):
+        model = apps.get_model('api', model_name)
+        rows = []
+        for row in model.objects.only('id', 'content').iterator():
+            row.text_hash = text_hash(row.content)
+            rows.append(row)
+        model.objects.bulk_update(rows, ['text_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_uploadbatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cv',
+            name='file_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='cv',
+            name='text_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='jobdescription',
+            name='file_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='jobdescription',
+            name='text_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='uploadbatchitem',
+            name='duplicate',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(backfill_text_hashes, migrations.RunPython.noop),
+    ]
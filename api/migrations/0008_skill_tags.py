@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_upload_hashes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cv',
+            name='skill_tags',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobdescription',
+            name='skill_tags',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
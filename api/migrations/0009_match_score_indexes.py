@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 11:38
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without blocking match writes on a large table
+    atomic = False
+
+    dependencies = [
+        ('api', '0008_skill_tags'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='matchresult',
+            index=models.Index(fields=['job', '-total_score'], name='match_job_score_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='matchresult',
+            index=models.Index(fields=['cv', '-total_score'], name='match_cv_score_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='matchresult',
+            index=models.Index(fields=['-total_score'], name='match_score_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='matchresult',
+            index=models.Index(fields=['matched_at'], name='match_matched_at_idx'),
+        ),
+    ]
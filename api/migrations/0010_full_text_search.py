@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-18 11:39
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_match_score_indexes'),
+    ]
+
+    operations = [
+        # Name and title substring searches use trigram GIN indexes
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='cv',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('name', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('content', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='jobdescription',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('industry', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('content', config='english', weight='C'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='cv_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cv',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='cv_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='jobdescription',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='job_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobdescription',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='job_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 11:54
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The (order, id) indexes are built before the ones they replace are dropped,
+    # without blocking writes
+    atomic = False
+
+    dependencies = [
+        ('api', '0010_full_text_search'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='cv',
+            index=models.Index(fields=['processed_at', 'id'], name='cv_processed_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='jobdescription',
+            index=models.Index(fields=['created_at', 'id'], name='job_created_at_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='matchresult',
+            index=models.Index(fields=['-total_score', '-id'], name='match_score_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='matchresult',
+            index=models.Index(fields=['matched_at', 'id'], name='match_matched_at_id_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='matchresult',
+            name='match_score_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='matchresult',
+            name='match_matched_at_idx',
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-18 11:58
+
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, Sum
+from django.db.models.functions import Cast, Floor, Greatest, Least
+
+
+def count_existing_rows(apps, schema_editor):
+    """Start the counters from the rows already stored; later writes adjust them."""
+    StatisticsCounter = apps.get_model('api', 'StatisticsCounter')
+    counters = [
+        StatisticsCounter(kind='cvs', count=apps.get_model('api', 'CV').objects.count()),
+        StatisticsCounter(kind='jobs', count=apps.get_model('api', 'JobDescription').objects.count()),
+    ]
+    bucket = Least(Greatest(Cast(Floor(F('total_score') * 10), IntegerField()), 0), 9)
+    rows = (apps.get_model('api', 'MatchResult').objects.values(industry=F('job__industry'), bucket=bucket)
+            .annotate(count=Count('id'), score_total=Sum('total_score')))
+    counters += [StatisticsCounter(kind='matches', **row) for row in rows]
+    StatisticsCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('time', models.DateTimeField(auto_now_add=True)),
+                ('description', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StatisticsCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('cvs', 'CVs'), ('jobs', 'Job descriptions'), ('matches', 'Match results')], max_length=10)),
+                ('industry', models.CharField(blank=True, max_length=100)),
+                ('bucket', models.PositiveSmallIntegerField(default=0)),
+                ('count', models.BigIntegerField(default=0)),
+                ('score_total', models.FloatField(default=0)),
+            ],
+            options={
+                'unique_together': {('kind', 'industry', 'bucket')},
+            },
+        ),
+        migrations.RunPython(count_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 12:06
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # `icontains` filters on UPPER(column), which a trigram index on the raw column can't serve
+    atomic = False
+
+    dependencies = [
+        ('api', '0012_statistics_counters'),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='cv',
+            name='cv_name_trgm_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='jobdescription',
+            name='job_title_trgm_idx',
+        ),
+        AddIndexConcurrently(
+            model_name='cv',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='cv_name_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='jobdescription',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('title'), name='gin_trgm_ops'), name='job_title_trgm_idx'),
+        ),
+    ]
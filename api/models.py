@@ -1,10 +1,36 @@
+import uuid
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models.functions import Upper
 
 class CV(models.Model):
     name = models.CharField(max_length=255)
     file = models.FileField(upload_to='cvs/')
     content = models.TextField(blank=True)
     processed_at = models.DateTimeField(auto_now_add=True)
+    # Hashes of the uploaded bytes and of the normalized text, used to spot re-uploads
+    file_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    text_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # Canonical skills from api.skills; None until the CV has been tagged
+    skill_tags = models.JSONField(null=True, blank=True)
+    # Maintained by the database on every write, so bulk inserts and updates keep it current
+    search_vector = models.GeneratedField(
+        expression=SearchVector('name', weight='A', config='english')
+        + SearchVector('content', weight='B', config='english'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='cv_search_vector_idx'),
+            # Trigram index on UPPER(name): `name__icontains` compiles to UPPER(name) LIKE UPPER(...)
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='cv_name_trgm_idx'),
+            # Default list order; the id breaks ties for keyset pagination
+            models.Index(fields=['processed_at', 'id'], name='cv_processed_at_idx'),
+        ]
 
 class JobDescription(models.Model):
     title = models.CharField(max_length=255)
@@ -13,6 +39,24 @@ class JobDescription(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     technical_skills = models.JSONField(default=dict)
+    file_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    text_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # {canonical skill: weight} from api.skills; None until the job has been tagged
+    skill_tags = models.JSONField(null=True, blank=True)
+    search_vector = models.GeneratedField(
+        expression=SearchVector('title', weight='A', config='english')
+        + SearchVector('industry', weight='B', config='english')
+        + SearchVector('content', weight='C', config='english'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='job_search_vector_idx'),
+            GinIndex(OpClass(Upper('title'), name='gin_trgm_ops'), name='job_title_trgm_idx'),
+            models.Index(fields=['created_at', 'id'], name='job_created_at_idx'),
+        ]
 
 class MatchResult(models.Model):
     cv = models.ForeignKey(CV, on_delete=models.CASCADE)
@@ -23,6 +67,102 @@ class MatchResult(models.Model):
     description_match_score = models.FloatField()  # 60%
     matched_at = models.DateTimeField(auto_now_add=True)
     explanation = models.CharField(max_length=255, blank=True)
+    # Content hashes the scores were computed from; blank when the result should be retried
+    cv_hash = models.CharField(max_length=64, blank=True)
+    job_hash = models.CharField(max_length=64, blank=True)
     
     class Meta:
-        unique_together = ('cv', 'job')
\ No newline at end of file
+        unique_together = ('cv', 'job')
+        indexes = [
+            # Top matches of a job or CV are read straight off these, without a sort
+            models.Index(fields=['job', '-total_score'], name='match_job_score_idx'),
+            models.Index(fields=['cv', '-total_score'], name='match_cv_score_idx'),
+            # Match list orders; keyset pages start at an (order, id) position in them
+            models.Index(fields=['-total_score', '-id'], name='match_score_id_idx'),
+            models.Index(fields=['matched_at', 'id'], name='match_matched_at_id_idx'),
+        ]
+
+class CVProfile(models.Model):
+    """Structured facts extracted once per CV so per-job scoring can run locally."""
+    cv = models.OneToOneField(CV, on_delete=models.CASCADE, related_name='profile')
+    skills = models.JSONField(default=list)
+    industries = models.JSONField(default=list)
+    years_experience = models.FloatField(default=0)
+    seniority = models.CharField(max_length=50, blank=True)
+    content_hash = models.CharField(max_length=64)  # CV content the profile was extracted from
+    extracted_at = models.DateTimeField(auto_now=True)
+
+
+
+class CachedMatch(models.Model):
+    """Durable tier of the match cache, shared by every worker and kept across restarts."""
+    key = models.CharField(max_length=64, unique=True)
+    cv_hash = models.CharField(max_length=64, db_index=True)
+    job_hash = models.CharField(max_length=64, db_index=True)
+    prompt_version = models.CharField(max_length=50)
+    model_name = models.CharField(max_length=100)
+    result = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class UploadBatch(models.Model):
+    """A multi-file or zip upload whose documents are extracted in the background."""
+    KIND_CHOICES = [('cv', 'CV'), ('job', 'Job description')]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+
+class UploadBatchItem(models.Model):
+    """One document of an UploadBatch and the outcome of its extraction."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    batch = models.ForeignKey(UploadBatch, on_delete=models.CASCADE, related_name='items')
+    filename = models.CharField(max_length=255)
+    # Staged copy on disk; zip members are extracted from `archive_path` when processed
+    path = models.CharField(max_length=500, blank=True)
+    archive_path = models.CharField(max_length=500, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.CharField(max_length=255, blank=True)
+    # Set when the file resolved to an already stored CV or job instead of a new row
+    duplicate = models.BooleanField(default=False)
+    cv = models.ForeignKey(CV, null=True, blank=True, on_delete=models.SET_NULL)
+    job = models.ForeignKey(JobDescription, null=True, blank=True, on_delete=models.SET_NULL)
+
+    class Meta:
+        ordering = ['id']
+
+
+class StatisticsCounter(models.Model):
+    """A dashboard aggregate adjusted on every write, see api/statistics.py."""
+    KIND_CHOICES = [('cvs', 'CVs'), ('jobs', 'Job descriptions'), ('matches', 'Match results')]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Match counters are kept per job industry and score bucket (tenths of the total score)
+    industry = models.CharField(max_length=100, blank=True)
+    bucket = models.PositiveSmallIntegerField(default=0)
+    count = models.BigIntegerField(default=0)
+    score_total = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('kind', 'industry', 'bucket')
+
+
+class ActivityEvent(models.Model):
+    """Recent activity for the dashboard; only the newest ACTIVITY_LOG_SIZE events are kept."""
+    time = models.DateTimeField(auto_now_add=True)
+    description = models.CharField(max_length=255)
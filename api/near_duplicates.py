@@ -0,0 +1,213 @@
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+from .dedup import normalize_text
+from .models import CV, MatchResult
+from .pickled_index import PickledIndex
+
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 Jaccard almost always share a bucket
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+# Universal hashing (a*x + b) mod p; a fixed seed keeps signatures comparable across processes
+_PRIME = np.uint64(4294967311)
+_rng = np.random.RandomState(20240501)
+_PERM_A = _rng.randint(1, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+
+
+def shingles(text):
+    """Word 3-grams of the normalized text."""
+    words = normalize_text(text).split()
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text):
+    """MinHash signature of a document's shingle set, as NUM_PERM uint32 values."""
+    values = np.array([zlib.crc32(s.encode('utf-8')) for s in shingles(text)], dtype=np.uint64)
+    if not len(values):
+        return np.full(NUM_PERM, 0xFFFFFFFF, dtype=np.uint32)
+    hashed = (np.outer(values, _PERM_A) + _PERM_B) % _PRIME
+    return (hashed.min(axis=0) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+class MinHashLSH:
+    """Banded LSH over MinHash signatures for finding near-identical documents."""
+
+    def __init__(self):
+        self.signatures = {}
+        self.buckets = [{} for _ in range(BANDS)]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.signatures
+
+    def _band_keys(self, signature):
+        return [signature[band * ROWS:(band + 1) * ROWS].tobytes() for band in range(BANDS)]
+
+    def add_document(self, doc_id, text):
+        """Index a document, replacing any previous version with the same id."""
+        if doc_id in self.signatures:
+            self.remove_document(doc_id)
+        signature = minhash_signature(text)
+        self.signatures[doc_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self.buckets[band].setdefault(key, set()).add(doc_id)
+
+    def remove_document(self, doc_id):
+        signature = self.signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self.buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self.buckets[band][key]
+
+    def similarity(self, doc_a, doc_b):
+        """Estimated Jaccard similarity of two indexed documents."""
+        return float(np.mean(self.signatures[doc_a] == self.signatures[doc_b]))
+
+    def similar(self, doc_id, threshold):
+        """Return [(other_id, similarity)] at or above threshold, most similar first."""
+        if doc_id not in self.signatures:
+            return []
+        candidates = set()
+        for band, key in enumerate(self._band_keys(self.signatures[doc_id])):
+            candidates |= self.buckets[band].get(key, set())
+        candidates.discard(doc_id)
+        scored = [(other, self.similarity(doc_id, other)) for other in candidates]
+        return sorted([pair for pair in scored if pair[1] >= threshold], key=lambda pair: -pair[1])
+
+    def clusters(self, threshold):
+        """Group documents connected by pairs at or above threshold; singletons are left out."""
+        parent = {}
+
+        def find(doc_id):
+            while parent.get(doc_id, doc_id) != doc_id:
+                doc_id = parent[doc_id]
+            return doc_id
+
+        checked = set()
+        for bands in self.buckets:
+            for bucket in bands.values():
+                if len(bucket) < 2:
+                    continue
+                members = sorted(bucket)
+                for i, doc_a in enumerate(members):
+                    for doc_b in members[i + 1:]:
+                        if (doc_a, doc_b) in checked:
+                            continue
+                        checked.add((doc_a, doc_b))
+                        if self.similarity(doc_a, doc_b) >= threshold:
+                            root_a, root_b = find(doc_a), find(doc_b)
+                            if root_a != root_b:
+                                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        groups = {}
+        for doc_id in parent:
+            groups.setdefault(find(doc_id), set()).add(doc_id)
+        for root in groups:
+            groups[root].add(root)
+        return sorted((sorted(members) for members in groups.values()), key=lambda members: (-len(members), members[0]))
+
+
+def build_near_duplicate_index():
+    """Build a fresh index over every CV with extracted content."""
+    index = MinHashLSH()
+    for cv_id, content in CV.objects.exclude(content='').values_list('id', 'content').iterator():
+        index.add_document(cv_id, content)
+    return index
+
+
+_index = PickledIndex(lambda: settings.CV_MINHASH_PATH, build_near_duplicate_index, 'CV near-duplicate index')
+_lock = _index.lock
+
+
+def get_near_duplicate_index():
+    """Return the process-wide index, reloading it if another worker saved a newer copy."""
+    return _index.get()
+
+
+def add_cvs(cvs):
+    """Add or refresh CVs with a single index write."""
+    with _index.locked():
+        index = _index.get(reload=True)
+        for cv in cvs:
+            index.add_document(cv.id, cv.content)
+        _index.save()
+
+
+def remove_cv(cv_id):
+    with _index.locked():
+        index = _index.get(reload=True)
+        if cv_id in index:
+            index.remove_document(cv_id)
+            _index.save()
+
+
+def near_duplicates_of(cv_id, threshold=None):
+    """Return [(cv_id, similarity)] of CVs that are near-identical to the given one."""
+    threshold = settings.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    with _lock:
+        return get_near_duplicate_index().similar(cv_id, threshold)
+
+
+def duplicate_clusters(threshold=None):
+    """Return lists of CV ids whose members are near-identical to one another."""
+    threshold = settings.NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    with _lock:
+        return get_near_duplicate_index().clusters(threshold)
+
+
+def reusable_results(requests):
+    """Find up-to-date match results of near-identical CVs for prepared match requests.
+
+    Returns {(cv_id, job_id): result} for every request whose CV has a
+    neighbour above NEAR_DUPLICATE_REUSE_THRESHOLD that was already scored
+    against the same version of the job.
+    """
+    threshold = settings.NEAR_DUPLICATE_REUSE_THRESHOLD
+    neighbours = {}
+    with _lock:
+        index = get_near_duplicate_index()
+        for request in requests:
+            neighbours[request['cv_id']] = index.similar(request['cv_id'], threshold)
+
+    donor_ids = {cv_id for similar in neighbours.values() for cv_id, _ in similar}
+    if not donor_ids:
+        return {}
+    job_ids = {request['job_id'] for request in requests}
+    donors = {
+        (match.cv_id, match.job_id): match
+        for match in MatchResult.objects.filter(cv_id__in=donor_ids, job_id__in=job_ids).exclude(cv_hash='')
+    }
+
+    reused = {}
+    for request in requests:
+        for donor_id, similarity in neighbours[request['cv_id']]:
+            match = donors.get((donor_id, request['job_id']))
+            if match is None or match.job_hash != request['job_hash']:
+                continue
+            reused[(request['cv_id'], request['job_id'])] = {
+                'industry_score': match.industry_score,
+                'tech_skills_score': match.tech_skills_score,
+                'description_match_score': match.description_match_score,
+                'explanation': f"Reused from near-identical CV {donor_id} ({similarity:.0%} similar): {match.explanation}",
+                'cv_hash': request['cv_hash'],
+                'job_hash': request['job_hash'],
+            }
+            # Profile-based scores are cheap and specific to this CV, so they are kept
+            if request.get('local_scores'):
+                reused[(request['cv_id'], request['job_id'])].update(request['local_scores'])
+            break
+    return reused
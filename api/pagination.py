@@ -0,0 +1,134 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class StandardResultsSetPagination(pagination.PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        return self.with_search_notice(super().get_paginated_response(data))
+
+    def with_search_notice(self, response):
+        # FullTextSearchFilter only ranks the newest SEARCH_MAX_RESULTS matching documents
+        if getattr(self.request, 'search_truncated', False):
+            response.data['search_truncated'] = True
+        return response
+
+
+class KeysetPagination(StandardResultsSetPagination):
+    """Page numbers by default, keyset pages when the request has a `?cursor=` parameter.
+
+    Start with an empty `?cursor=` and follow the `next` / `previous` links. A
+    keyset page holds the rows after (or before) a position in the queryset's
+    (first ordering field, id) order. It is found with an index range condition
+    instead of an OFFSET, so every page costs what the first one does and rows
+    inserted meanwhile don't shift later pages. No count is taken.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, self.backwards = self.decode_cursor(request)
+
+        order = next(iter(queryset.query.order_by or queryset.model._meta.ordering), '-pk')
+        if not isinstance(order, str):
+            # Expression orderings have no field to keep a position on
+            order = '-pk'
+        self.field = order.lstrip('-')
+        descending = order.startswith('-')
+        if self.field in ('pk', 'id'):
+            self.field = None
+        # Ties are broken by id in the same direction, so every row has a distinct position
+        keys = ['pk'] if self.field is None else [self.field, 'pk']
+        if descending != self.backwards:
+            keys = [f'-{key}' for key in keys]
+        queryset = queryset.order_by(*keys)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, descending != self.backwards))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.backwards:
+            rows.reverse()
+        self.has_position = position is not None
+        self.rows = rows
+        return rows
+
+    def after(self, position, descending):
+        """Rows strictly past `position` in the page's scan direction."""
+        value, pk = position
+        op = 'lt' if descending else 'gt'
+        if self.field is None:
+            return Q(**{f'pk__{op}': pk})
+        # The redundant inclusive bound lets Postgres start the index scan at the position
+        return Q(**{f'{self.field}__{op}e': value}) & (
+            Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'pk__{op}': pk})
+        )
+
+    def position_of(self, row):
+        value = None
+        if self.field is not None:
+            value = row
+            for part in self.field.split('__'):
+                value = getattr(value, part)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+        return [value, row.pk]
+
+    def encode_cursor(self, row, backwards):
+        token = json.dumps({'p': self.position_of(row), 'b': backwards}, separators=(',', ':'))
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param,
+                                   base64.urlsafe_b64encode(token.encode()).decode())
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode()))
+            value, pk = data['p']
+            return (value, int(pk)), bool(data.get('b'))
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        # Going backwards the page we came from follows this one
+        if self.rows and (self.has_more if not self.backwards else self.has_position):
+            return self.encode_cursor(self.rows[-1], backwards=False)
+        return None
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if self.rows and (self.has_more if self.backwards else self.has_position):
+            return self.encode_cursor(self.rows[0], backwards=True)
+        return None
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return self.with_search_notice(Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }))
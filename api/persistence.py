@@ -0,0 +1,141 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import statistics
+from .models import JobDescription, MatchResult
+from .scoring import calculate_total_score
+
+# First key of the Postgres advisory locks taken per job while its match results change
+MATCH_LOCK_NAMESPACE = 0x4D524553
+
+MATCH_UPDATE_FIELDS = [
+    'industry_score', 'tech_skills_score', 'description_match_score',
+    'total_score', 'matched_at', 'explanation', 'cv_hash', 'job_hash',
+]
+
+
+def build_match_result(cv, job, match_result):
+    """Build an unsaved MatchResult from a normalized Gemini result."""
+    industry_score = match_result.get('industry_score', 0)
+    tech_skills_score = match_result.get('tech_skills_score', 0)
+    description_match_score = match_result.get('description_match_score', 0)
+    return MatchResult(
+        cv=cv,
+        job=job,
+        industry_score=industry_score,
+        tech_skills_score=tech_skills_score,
+        description_match_score=description_match_score,
+        total_score=calculate_total_score(industry_score, tech_skills_score, description_match_score),
+        matched_at=timezone.now(),
+        explanation=(match_result.get('explanation') or '')[:255],
+        cv_hash=match_result.get('cv_hash', ''),
+        job_hash=match_result.get('job_hash', ''),
+    )
+
+
+def lock_jobs_matches(job_ids):
+    """Serialize writers of the given jobs' MatchResults until the transaction ends.
+
+    Taken before reading the rows a write replaces, so two requests upserting or
+    deleting the same pairs don't both count them in the dashboard statistics.
+    Locks are taken in id order so writers spanning several jobs can't deadlock.
+    """
+    with connection.cursor() as cursor:
+        for job_id in sorted(set(job_ids)):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [MATCH_LOCK_NAMESPACE, job_id])
+
+
+def save_match_results(matches):
+    """Insert or update a batch of MatchResults with a single upsert on the (cv, job) constraint."""
+    if not matches:
+        return []
+    # The last result for a pair wins; Postgres rejects an upsert touching a row twice
+    by_pair = {(match.cv_id, match.job_id): match for match in matches}
+    matches = list(by_pair.values())
+    with transaction.atomic():
+        lock_jobs_matches(job_id for _, job_id in by_pair)
+        # Scores being replaced come out of the dashboard statistics
+        previous = {
+            (cv_id, job_id): score
+            for cv_id, job_id, score in MatchResult.objects.filter(
+                cv_id__in={cv_id for cv_id, _ in by_pair}, job_id__in={job_id for _, job_id in by_pair}
+            ).values_list('cv_id', 'job_id', 'total_score')
+            if (cv_id, job_id) in by_pair
+        }
+        saved = MatchResult.objects.bulk_create(
+            matches,
+            update_conflicts=True,
+            unique_fields=['cv', 'job'],
+            update_fields=MATCH_UPDATE_FIELDS,
+        )
+        statistics.matches_saved(matches, previous)
+    return saved
+
+
+def delete_match_results(queryset):
+    """Delete MatchResults and take them out of the dashboard statistics."""
+    with transaction.atomic():
+        rows = list(queryset.order_by().values_list('id', 'job_id'))
+        lock_jobs_matches(job_id for _, job_id in rows)
+        # Read again under the locks: rows another writer deleted meanwhile aren't subtracted twice
+        queryset = MatchResult.objects.filter(id__in=[row_id for row_id, _ in rows])
+        statistics.matches_deleted(queryset)
+        return queryset.delete()
+
+
+class MatchResultWriter:
+    """Buffers match results and writes them in bulk upserts of up to `batch_size` rows.
+
+    Use as a context manager so buffered rows are flushed even when a
+    streaming response is cut short.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.pending = []
+
+    def add(self, match):
+        self.pending.append(match)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return match
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        save_match_results(pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+
+def upsert_job_descriptions(jobs):
+    """Create or update unsaved JobDescriptions keyed by title, as the upload endpoint does.
+
+    Returns ({title: saved job}, number created). When several jobs share a
+    title the last one wins.
+    """
+    by_title = {job.title: job for job in jobs}
+    existing = {
+        title: (job_id, industry)
+        for title, job_id, industry in JobDescription.objects.filter(title__in=by_title).values_list('title', 'id', 'industry')
+    }
+    to_update = []
+    for title, (job_id, _) in existing.items():
+        job = by_title[title]
+        job.id = job_id
+        to_update.append(job)
+    to_create = [job for title, job in by_title.items() if title not in existing]
+
+    with transaction.atomic():
+        JobDescription.objects.bulk_update(
+            to_update, ['content', 'industry', 'technical_skills', 'file_hash', 'text_hash', 'skill_tags']
+        )
+        JobDescription.objects.bulk_create(to_create)
+        for title, (job_id, industry) in existing.items():
+            if by_title[title].industry != industry:
+                statistics.job_industry_changed(job_id, industry, by_title[title].industry)
+        statistics.documents_added('jobs', to_create)
+    return by_title, len(to_create)
@@ -0,0 +1,93 @@
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the threads of one process are serialized
+    fcntl = None
+
+_held_paths = set()
+
+
+@contextmanager
+def file_lock(path, thread_lock):
+    """Hold `thread_lock` and an exclusive flock on the file at `path`.
+
+    The thread lock keeps out threads of this process, the flock other worker
+    processes. Re-entrant within a thread as long as `thread_lock` is.
+    """
+    with thread_lock:
+        if path in _held_paths or fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            _held_paths.add(path)
+            try:
+                yield
+            finally:
+                _held_paths.discard(path)
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+class PickledIndex:
+    """An in-memory index shared by every worker through one pickle file.
+
+    `get()` reloads the file when another worker saved a newer copy. Writers
+    hold `locked()` and call `get(reload=True)` before changing the index, so
+    they start from the last copy on disk even when it was saved within the
+    same mtime tick, and `save()` never drops another worker's changes.
+    """
+
+    def __init__(self, path, build, description):
+        self.path = path  # callable, so the setting is read at use time
+        self.build = build
+        self.description = description
+        self.lock = threading.RLock()
+        self.index = None
+        self.mtime = None
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.path())
+        except OSError:
+            return None
+
+    def locked(self):
+        return file_lock(f'{self.path()}.lock', self.lock)
+
+    def get(self, reload=False):
+        """Return the index, loading or building it as needed."""
+        with self.lock:
+            if not reload and self.index is not None and self._mtime() == self.mtime:
+                return self.index
+            with self.locked():
+                mtime = self._mtime()
+                if mtime is None:
+                    if self.index is None:
+                        print(f"Building {self.description} from database...")
+                        self.index = self.build()
+                    self.save()
+                elif reload or mtime != self.mtime:
+                    try:
+                        with open(self.path(), 'rb') as fh:
+                            self.index = pickle.load(fh)
+                        self.mtime = mtime
+                    except Exception as e:
+                        print(f"Could not load {self.description} ({e}), rebuilding...")
+                        self.index = self.build()
+                        self.save()
+            return self.index
+
+    def save(self):
+        """Atomically persist the index so other workers can load it."""
+        path = self.path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            pickle.dump(self.index, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.mtime = os.path.getmtime(path)
@@ -0,0 +1,51 @@
+from .models import CVProfile
+from .utils import content_hash
+
+
+def ensure_cv_profiles(cvs, gemini):
+    """Return {cv_id: CVProfile}, extracting profiles only for CVs without an up-to-date one."""
+    cvs = [cv for cv in cvs if cv.content]
+    hashes = {cv.id: content_hash(cv.content) for cv in cvs}
+    profiles = {
+        profile.cv_id: profile
+        for profile in CVProfile.objects.filter(cv__in=cvs)
+    }
+
+    stale = [
+        cv for cv in cvs
+        if cv.id not in profiles or profiles[cv.id].content_hash != hashes[cv.id]
+    ]
+    if not stale:
+        return profiles
+
+    print(f"Extracting profiles for {len(stale)} CVs...")
+
+    extracted = gemini.extract_cv_profiles({cv.id: cv.content for cv in stale})
+
+    updated = []
+    for cv in stale:
+        data = extracted.get(cv.id)
+        if data is None:
+            # Leave any old profile out so the pair is scored fully by the LLM
+            profiles.pop(cv.id, None)
+            continue
+        updated.append(CVProfile(
+            cv=cv,
+            skills=data['skills'],
+            industries=data['industries'],
+            years_experience=data['years_experience'],
+            seniority=data['seniority'],
+            content_hash=hashes[cv.id],
+        ))
+
+    # One upsert for every extracted profile
+    CVProfile.objects.bulk_create(
+        updated,
+        update_conflicts=True,
+        unique_fields=['cv'],
+        update_fields=['skills', 'industries', 'years_experience', 'seniority', 'content_hash', 'extracted_at'],
+    )
+    for profile in updated:
+        profiles[profile.cv_id] = profile
+
+    return profiles
@@ -0,0 +1,165 @@
+import re
+from functools import lru_cache
+
+from .llm_client import estimate_tokens
+from .search_index import tokenize
+
+# Heading keywords -> section kind, checked in order against short heading lines
+SECTION_KEYWORDS = [
+    ('title', ['job title', 'position', 'role']),
+    ('benefits', ['benefit', 'perks', 'we offer', 'compensation', 'salary']),
+    ('company', ['company', 'about us', 'who we are', 'overview']),
+    ('responsibilities', ['responsibilit', 'duties', 'what you will do', "what you'll do"]),
+    ('requirements', ['qualification', 'requirement', 'must have', 'nice to have', 'preferred', 'what we are looking for']),
+    ('skills', ['skill', 'technolog', 'tools', 'tech stack', 'competenc', 'expertise']),
+    ('experience', ['experience', 'employment', 'work history', 'career', 'project']),
+    ('education', ['education', 'academic', 'degree', 'studies']),
+    ('certifications', ['certification', 'certificate', 'licens', 'courses', 'training']),
+    ('summary', ['summary', 'profile', 'about me', 'objective']),
+    ('languages', ['language']),
+]
+
+# How much a section is worth before its overlap with the job is considered
+CV_SECTION_PRIORITY = {
+    'skills': 1.0, 'experience': 0.9, 'summary': 0.7, 'certifications': 0.5, 'requirements': 0.5,
+    'education': 0.4, 'header': 0.3, 'other': 0.3, 'responsibilities': 0.3, 'languages': 0.2,
+    'title': 0.3, 'company': 0.1, 'benefits': 0.0,
+}
+JOB_SECTION_PRIORITY = {
+    'title': 1.0, 'header': 1.0, 'requirements': 1.0, 'skills': 1.0, 'responsibilities': 0.9,
+    'experience': 0.6, 'education': 0.4, 'certifications': 0.4, 'summary': 0.4, 'other': 0.4,
+    'languages': 0.3, 'company': 0.1, 'benefits': 0.0,
+}
+
+_BULLET_RE = re.compile(r'^[-•*\d.)\s]+')
+
+# Fewest tokens worth keeping of a line that has to be cut to fit the budget
+MIN_CUT_TOKENS = 8
+
+
+def _heading_kind(line):
+    """Return the section kind if the line looks like a heading, else None."""
+    text = line.strip().rstrip(':').strip()
+    if not text or len(text) > 40 or ':' in text or _BULLET_RE.match(line.strip()[:1] or ' '):
+        return None
+    if len(text.split()) > 4 or text.endswith('.'):
+        return None
+    lower = text.lower()
+    for kind, keywords in SECTION_KEYWORDS:
+        if any(keyword in lower for keyword in keywords):
+            return kind
+    return None
+
+
+@lru_cache(maxsize=4096)
+def split_sections(text):
+    """Split a CV or job description into (kind, heading, lines) sections, in document order.
+
+    Lines before the first recognized heading form a 'header' section (a
+    CV's name and contact details, or a job's opening line).
+    """
+    sections = []
+    kind, heading, lines = 'header', '', []
+    for line in (text or '').splitlines():
+        if not line.strip():
+            continue
+        line_kind = _heading_kind(line)
+        if line_kind is not None:
+            if heading or lines:
+                sections.append((kind, heading, tuple(lines)))
+            kind, heading, lines = line_kind, line.strip(), []
+        else:
+            lines.append(line.rstrip())
+    if heading or lines:
+        sections.append((kind, heading, tuple(lines)))
+    return tuple(sections)
+
+
+def job_terms(job_description, technical_skills=None):
+    """Terms a CV section is ranked by: the job's skill lines plus its requirement and skills sections."""
+    text = ' '.join((technical_skills or {}).keys())
+    for kind, heading, lines in split_sections(job_description):
+        if kind in ('title', 'requirements', 'skills'):
+            text += ' ' + ' '.join(lines)
+    return frozenset(tokenize(text))
+
+
+def _cut(line, token_budget):
+    """The start of `line` within `token_budget` tokens, ending on a word boundary where possible."""
+    text = line[:token_budget * 4]
+    if len(text) < len(line) and ' ' in text[len(text) // 2:]:
+        text = text[:text.rindex(' ')]
+    return text.rstrip()
+
+
+def compress(text, token_budget, priorities, terms=frozenset()):
+    """Pack the most relevant lines of a document into `token_budget` tokens.
+
+    Every line is ranked by its section's priority plus the share of `terms`
+    it mentions, lines are taken greedily while they fit and emitted in their
+    original order under their section headings. Ranking lines rather than
+    whole sections lets a long experience section keep the projects that use
+    the job's skills without crowding out short sections such as certifications.
+    The best ranked line that did not fit is then cut down to the budget left,
+    so a document written as one long paragraph keeps its start.
+    """
+    if estimate_tokens(text) <= token_budget:
+        return text
+
+    sections = split_sections(text)
+    overlaps = {}
+    for s, (_, _, lines) in enumerate(sections):
+        for i, line in enumerate(lines):
+            overlaps[s, i] = len(terms & set(tokenize(line))) if terms else 0
+    best_overlap = max(overlaps.values(), default=0) or 1
+
+    ranked = sorted(
+        overlaps,
+        key=lambda pos: (-(priorities.get(sections[pos[0]][0], 0.3) + overlaps[pos] / best_overlap), pos),
+    )
+    chosen = set()
+    opened = set()
+    remaining = token_budget
+    for s, i in ranked:
+        heading = sections[s][1]
+        cost = estimate_tokens(sections[s][2][i]) + 1
+        if heading and s not in opened:
+            cost += estimate_tokens(heading) + 1
+        if cost <= remaining:
+            chosen.add((s, i))
+            opened.add(s)
+            remaining -= cost
+
+    cut = {}
+    for s, i in ranked:
+        if (s, i) in chosen:
+            continue
+        heading = sections[s][1]
+        available = remaining - 1
+        if heading and s not in opened:
+            available -= estimate_tokens(heading) + 1
+        if available >= MIN_CUT_TOKENS:
+            cut[s, i] = _cut(sections[s][2][i], available)
+            chosen.add((s, i))
+            opened.add(s)
+            break
+
+    if not chosen:
+        # Not even a cut line fits next to its heading; the start of the text is better than nothing
+        return _cut(text, token_budget)
+
+    output = []
+    for s, (_, heading, lines) in enumerate(sections):
+        if s in opened:
+            if heading:
+                output.append(heading)
+            output.extend(cut.get((s, i), line) for i, line in enumerate(lines) if (s, i) in chosen)
+    return '\n'.join(output)
+
+
+def compress_cv(cv_text, token_budget, terms=frozenset()):
+    return compress(cv_text, token_budget, CV_SECTION_PRIORITY, terms)
+
+
+def compress_job(job_description, token_budget):
+    return compress(job_description, token_budget, JOB_SECTION_PRIORITY)
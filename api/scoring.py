@@ -0,0 +1,68 @@
+import re
+
+# Weights of the individual criteria in the total match score
+INDUSTRY_WEIGHT = 0.1
+TECH_SKILLS_WEIGHT = 0.3
+DESCRIPTION_WEIGHT = 0.6
+
+WORD_RE = re.compile(r"[a-z0-9+#.]+")
+
+
+def _words(text):
+    return {w.rstrip('.') for w in WORD_RE.findall((text or '').lower()) if w.rstrip('.')}
+
+
+def calculate_total_score(industry_score, tech_skills_score, description_match_score):
+    """Calculate the final weighted match score."""
+    return (
+        industry_score * INDUSTRY_WEIGHT +
+        tech_skills_score * TECH_SKILLS_WEIGHT +
+        description_match_score * DESCRIPTION_WEIGHT
+    )
+
+
+def score_industry(profile, job_industry):
+    """Score (0-1) how well the CV profile's industries match the job's industry."""
+    job_words = _words(job_industry)
+    if not job_words:
+        return 0.5
+
+    best_overlap = 0.0
+    for industry in profile.industries or []:
+        industry_lower = industry.lower().strip()
+        if not industry_lower:
+            continue
+        if industry_lower in job_industry.lower() or job_industry.lower() in industry_lower:
+            best_overlap = 1.0
+            break
+        words = _words(industry_lower)
+        if words:
+            best_overlap = max(best_overlap, len(words & job_words) / len(job_words))
+
+    # Deeper experience counts for more, but relevant industry exposure dominates
+    experience_factor = 0.6 + 0.4 * min(profile.years_experience or 0, 10) / 10
+    return round(best_overlap * experience_factor, 4)
+
+
+def score_tech_skills(profile, technical_skills):
+    """Score (0-1) the weighted share of the job's skill lines covered by the CV profile's skills."""
+    if not technical_skills:
+        return 0.5
+
+    cv_skills = [s.lower().strip() for s in profile.skills or [] if s and s.strip()]
+    if not cv_skills:
+        return 0.0
+
+    patterns = [re.compile(r'(?<![a-z0-9])' + re.escape(skill) + r'(?![a-z0-9+#])') for skill in cv_skills]
+    total_weight = 0.0
+    matched_weight = 0.0
+    for skill_line, weight in technical_skills.items():
+        weight = float(weight or 0)
+        total_weight += weight
+        line_lower = skill_line.lower()
+        if any(pattern.search(line_lower) for pattern in patterns):
+            matched_weight += weight
+
+    if not total_weight:
+        return 0.5
+    return round(matched_weight / total_weight, 4)
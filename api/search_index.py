@@ -0,0 +1,182 @@
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+
+from . import embeddings, near_duplicates
+from .models import CV
+from .pickled_index import PickledIndex
+
+# Keep characters that matter in tech vocabulary (c++, c#, node.js, .net)
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have',
+    'in', 'is', 'it', 'its', 'of', 'on', 'or', 'our', 'that', 'the', 'their', 'this',
+    'to', 'we', 'will', 'with', 'you', 'your', 'who', 'which', 'within', 'into',
+}
+
+
+def tokenize(text):
+    """Lowercase and split text into index terms, dropping stopwords."""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        token = token.rstrip('.')
+        if len(token) > 1 and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 inverted index mapping document ids to term postings."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> {doc_id: term frequency}
+        self.doc_lengths = {}  # doc_id -> number of terms
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_lengths
+
+    def add_document(self, doc_id, text):
+        """Index a document, replacing any previous version with the same id."""
+        if doc_id in self.doc_lengths:
+            self.remove_document(doc_id)
+
+        terms = Counter(tokenize(text or ''))
+        for term, freq in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = freq
+
+        length = sum(terms.values())
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def remove_document(self, doc_id):
+        """Drop a document from the index if present."""
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in list(self.postings):
+            docs = self.postings[term]
+            if docs.pop(doc_id, None) is not None and not docs:
+                del self.postings[term]
+
+    def rank(self, query, limit=None, candidate_ids=None):
+        """Return (doc_id, score) pairs for the query, best first.
+
+        With `candidate_ids`, candidates that share no term with the query
+        follow the scored ones with score 0, so up to `limit` are returned.
+        """
+        if not self.doc_lengths:
+            return []
+
+        doc_count = len(self.doc_lengths)
+        avg_length = self.total_length / doc_count or 1
+        scores = {}
+
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, freq in docs.items():
+                if candidate_ids is not None and doc_id not in candidate_ids:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if limit:
+            ranked = ranked[:limit]
+        if candidate_ids is not None and (not limit or len(ranked) < limit):
+            unscored = sorted(doc_id for doc_id in candidate_ids if doc_id in self.doc_lengths and doc_id not in scores)
+            ranked += [(doc_id, 0.0) for doc_id in unscored[:limit - len(ranked) if limit else None]]
+        return ranked
+
+
+def build_cv_index():
+    """Build a fresh index over every CV with extracted content."""
+    index = BM25Index()
+    for cv_id, content in CV.objects.exclude(content='').values_list('id', 'content').iterator():
+        index.add_document(cv_id, content)
+    return index
+
+
+_cv_index = PickledIndex(lambda: settings.CV_INDEX_PATH, build_cv_index, 'CV search index')
+_lock = _cv_index.lock
+
+
+def get_cv_index():
+    """Return the process-wide CV index, reloading it if another worker saved a newer copy."""
+    return _cv_index.get()
+
+
+def index_cv(cv):
+    """Add or refresh a single CV in the persisted indexes."""
+    index_cvs([cv])
+
+
+def index_cvs(cvs):
+    """Add or refresh many CVs with a single write to each CV index."""
+    with _cv_index.locked():
+        index = _cv_index.get(reload=True)
+        for cv in cvs:
+            index.add_document(cv.id, cv.content)
+        _cv_index.save()
+    near_duplicates.add_cvs(cvs)
+    embeddings.add_cvs(cvs)
+
+
+def unindex_cv(cv_id):
+    """Remove a CV from the persisted indexes."""
+    with _cv_index.locked():
+        index = _cv_index.get(reload=True)
+        if cv_id in index:
+            index.remove_document(cv_id)
+            _cv_index.save()
+    near_duplicates.remove_cv(cv_id)
+    embeddings.remove_cv(cv_id)
+
+
+def job_query_text(job):
+    """Build the retrieval query for a job from its title, industry, skills and text."""
+    skills = ' '.join((job.technical_skills or {}).keys())
+    return f"{job.title} {job.industry} {skills} {job.content}"
+
+
+def rank_cvs(job, cv_queryset, limit):
+    """Rank the CVs in cv_queryset against the job.
+
+    Returns ([(cv, bm25 score)] for the best `limit` CVs, number of candidates ranked).
+    """
+    candidate_ids = set(cv_queryset.exclude(content='').values_list('id', flat=True))
+    if not candidate_ids:
+        return [], 0
+
+    with _lock:
+        index = get_cv_index()
+        # Pick up CVs whose index write failed
+        missing_ids = [cv_id for cv_id in candidate_ids if cv_id not in index]
+        if missing_ids:
+            with _cv_index.locked():
+                index = _cv_index.get(reload=True)
+                for cv_id, content in CV.objects.filter(id__in=missing_ids).values_list('id', 'content'):
+                    index.add_document(cv_id, content)
+                _cv_index.save()
+        ranked = index.rank(job_query_text(job), limit=limit, candidate_ids=candidate_ids)
+
+    cvs_by_id = CV.objects.in_bulk([cv_id for cv_id, _ in ranked])
+    return [(cvs_by_id[cv_id], score) for cv_id, score in ranked if cv_id in cvs_by_id], len(candidate_ids)
+
+
+def shortlist_cvs(job, cv_queryset, limit):
+    """Rank the CVs in cv_queryset against the job and return the best `limit` of them."""
+    ranked, _ = rank_cvs(job, cv_queryset, limit)
+    return [cv for cv, _ in ranked]
@@ -1,21 +1,84 @@
 from rest_framework import serializers
-from .models import CV, JobDescription, MatchResult
+from .models import CV, JobDescription, MatchResult, UploadBatch, UploadBatchItem
 
-class CVSerializer(serializers.ModelSerializer):
+
+def split_field_names(value):
+    """Parse a comma separated `?fields=` / `?expand=` value; None when the parameter is absent."""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class ProjectedSerializerMixin:
+    """Serializer whose fields can be narrowed with `fields` and widened with `expand`.
+
+    Without either argument the serializer is complete. With them it starts from its
+    summary shape, every field except `Meta.expandable_fields`; `expand` adds expandable
+    fields back and `fields` keeps only the named ones. Dotted names such as
+    "job.content" apply to a nested projected serializer.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None or expand is not None:
+            self.project(fields, expand or [])
+
+    def project(self, fields, expand):
+        own_fields = None if fields is None else {name.split('.', 1)[0] for name in fields}
+        for name in getattr(self.Meta, 'expandable_fields', []):
+            if name not in expand and (own_fields is None or name not in own_fields):
+                self.fields.pop(name, None)
+        if own_fields is not None:
+            for name in list(self.fields):
+                if name not in own_fields:
+                    self.fields.pop(name)
+
+        for name, field in self.fields.items():
+            if isinstance(field, ProjectedSerializerMixin):
+                prefix = f'{name}.'
+                nested_fields = [n[len(prefix):] for n in fields or [] if n.startswith(prefix)]
+                field.project(nested_fields or None, [n[len(prefix):] for n in expand if n.startswith(prefix)])
+
+
+class CVSerializer(ProjectedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CV
-        fields = ['id', 'name', 'file', 'content', 'content','processed_at']
+        fields = ['id', 'name', 'file', 'content', 'processed_at', 'skill_tags']
+        read_only_fields = ['skill_tags']
+        # Left out of list responses unless asked for with ?expand=content
+        expandable_fields = ['content']
 
-class JobDescriptionSerializer(serializers.ModelSerializer):
+class JobDescriptionSerializer(ProjectedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = JobDescription
-        fields = ['id', 'title', 'content', 'industry', 'technical_skills', 'created_at']
+        fields = ['id', 'title', 'content', 'industry', 'technical_skills', 'created_at', 'skill_tags']
+        read_only_fields = ['skill_tags']
+        expandable_fields = ['content']
 
-class MatchResultSerializer(serializers.ModelSerializer):
+class MatchResultSerializer(ProjectedSerializerMixin, serializers.ModelSerializer):
     cv = CVSerializer(read_only=True)
     job = JobDescriptionSerializer(read_only=True)
     
     class Meta:
         model = MatchResult
         fields = ['id', 'cv', 'job', 'total_score', 'industry_score', 
-                 'tech_skills_score', 'description_match_score', 'matched_at']
\ No newline at end of file
+                 'tech_skills_score', 'description_match_score', 'matched_at']
+class UploadBatchItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadBatchItem
+        fields = ['id', 'filename', 'status', 'error', 'duplicate', 'cv', 'job']
+
+class UploadBatchSerializer(serializers.ModelSerializer):
+    items = UploadBatchItemSerializer(many=True, read_only=True)
+    counts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadBatch
+        fields = ['id', 'kind', 'status', 'error', 'created_at', 'finished_at', 'counts', 'items']
+
+    def get_counts(self, obj):
+        counts = {'total': 0, 'pending': 0, 'succeeded': 0, 'failed': 0}
+        for item in obj.items.all():
+            counts['total'] += 1
+            counts[item.status] += 1
+        return counts
@@ -0,0 +1,255 @@
+from collections import deque
+
+import numpy as np
+
+from .models import CV
+
+# Bump when SKILL_VOCABULARY changes so cached scores computed with the old tags are not reused
+VOCABULARY_VERSION = 2
+
+# Canonical skill -> aliases as they appear in CVs and job descriptions (matched case-insensitively,
+# whole words only). Aliases that are also common English words are listed in AMBIGUOUS_ALIASES.
+SKILL_VOCABULARY = {
+    'JavaScript': ['javascript', 'js', 'ecmascript', 'es6'],
+    'TypeScript': ['typescript', 'ts'],
+    'React': ['react', 'reactjs', 'react.js'],
+    'Angular': ['angular', 'angularjs', 'angular.js'],
+    'Vue.js': ['vue', 'vuejs', 'vue.js'],
+    'Node.js': ['nodejs', 'node.js'],
+    'HTML': ['html', 'html5'],
+    'CSS': ['css', 'css3', 'sass', 'scss'],
+    'Bootstrap': ['bootstrap'],
+    'Python': ['python'],
+    'Django': ['django'],
+    'Flask': ['flask'],
+    'Java': ['java'],
+    'Spring Boot': ['spring boot', 'spring framework'],
+    'Kotlin': ['kotlin'],
+    'Swift': ['swift'],
+    'C#': ['c#', 'csharp'],
+    '.NET': ['.net', 'asp.net', 'dotnet', '.net core'],
+    'C++': ['c++', 'cpp'],
+    'Go': ['golang'],
+    'Rust': ['rust'],
+    'PHP': ['php', 'laravel'],
+    'Ruby': ['ruby', 'ruby on rails', 'rails'],
+    'SQL': ['sql', 't-sql', 'pl/sql', 'oraclesql', 'oracle sql'],
+    'PostgreSQL': ['postgresql', 'postgres'],
+    'MySQL': ['mysql'],
+    'MongoDB': ['mongodb', 'mongo'],
+    'Redis': ['redis'],
+    'NoSQL': ['nosql'],
+    'REST APIs': ['rest api', 'rest apis', 'restful', 'restful apis'],
+    'GraphQL': ['graphql'],
+    'Microservices': ['microservices', 'microservice architecture'],
+    'AWS': ['aws', 'amazon web services'],
+    'AWS SageMaker': ['sagemaker', 'aws sagemaker'],
+    'Azure': ['azure', 'microsoft azure'],
+    'Google Cloud': ['google cloud', 'gcp', 'google cloud platform'],
+    'Docker': ['docker', 'containerization'],
+    'Kubernetes': ['kubernetes', 'k8s'],
+    'Terraform': ['terraform'],
+    'CI/CD': ['ci/cd', 'continuous integration', 'continuous delivery', 'continuous deployment', 'jenkins',
+              'github actions', 'gitlab ci'],
+    'DevOps': ['devops'],
+    'Git': ['git', 'github', 'gitlab', 'version control'],
+    'Linux': ['linux', 'unix', 'bash'],
+    'Machine Learning': ['machine learning', 'ml'],
+    'Deep Learning': ['deep learning', 'neural networks'],
+    'NLP': ['nlp', 'natural language processing'],
+    'TensorFlow': ['tensorflow'],
+    'PyTorch': ['pytorch'],
+    'scikit-learn': ['scikit-learn', 'sklearn'],
+    'Pandas': ['pandas'],
+    'NumPy': ['numpy'],
+    'Spark': ['spark', 'apache spark', 'pyspark'],
+    'Hadoop': ['hadoop'],
+    'Kafka': ['kafka', 'apache kafka'],
+    'Data Analysis': ['data analysis', 'data analytics'],
+    'Tableau': ['tableau'],
+    'Power BI': ['power bi', 'powerbi'],
+    'Excel': ['microsoft excel', 'ms excel', 'advanced excel'],
+    'Figma': ['figma'],
+    'Adobe XD': ['adobe xd'],
+    'Adobe Creative Suite': ['adobe creative suite', 'photoshop', 'illustrator'],
+    'Sketch': ['sketch'],
+    'InVision': ['invision'],
+    'UI/UX Design': ['ui/ux', 'ux/ui', 'user experience', 'user interface design', 'ux design', 'ui design'],
+    'Agile': ['agile', 'agile methodologies', 'agile methodology', 'agile development', 'agile environment',
+              'agile practices'],
+    'Scrum': ['scrum'],
+    'Kanban': ['kanban'],
+    'JIRA': ['jira', 'confluence'],
+    'Testing': ['unit testing', 'test automation', 'automated testing', 'selenium', 'cypress', 'jest'],
+    'Security': ['cybersecurity', 'information security', 'penetration testing'],
+    'Microsoft 365': ['m365', 'microsoft 365', 'office 365'],
+    'Mobile Development': ['mobile development', 'mobile application development', 'android', 'ios', 'react native',
+                           'flutter'],
+}
+
+# Aliases that are also everyday words ("react", "a spark of rust", "5 ml"). They only count with
+# another, unambiguous skill mentioned within CONTEXT_CHARS, as in a skills list or a stack description
+AMBIGUOUS_ALIASES = {'react', 'rust', 'spark', 'sketch', 'swift', 'agile', 'bootstrap', 'ml', 'ios', 'rails'}
+CONTEXT_CHARS = 60
+
+_WORD_CHARS = set('abcdefghijklmnopqrstuvwxyz0123456789+#')
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every pattern occurrence in one pass over the text."""
+
+    def __init__(self, patterns):
+        # patterns: {pattern string: value}
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern, value in patterns.items():
+            node = 0
+            for char in pattern:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node].append((len(pattern), value))
+
+        # Breadth-first pass wiring failure links to the longest proper suffix in the trie
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0) if node else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def iter_matches(self, text):
+        """Yield (start, end, value) for every occurrence, overlapping ones included."""
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length, value in self.output[node]:
+                yield index - length + 1, index + 1, value
+
+
+def _build_matcher():
+    patterns = {}
+    for skill, aliases in SKILL_VOCABULARY.items():
+        for alias in aliases:
+            patterns[alias] = (skill, alias in AMBIGUOUS_ALIASES)
+    return AhoCorasick(patterns)
+
+
+_matcher = _build_matcher()
+SKILLS = sorted(SKILL_VOCABULARY)
+SKILL_INDEX = {skill: i for i, skill in enumerate(SKILLS)}
+
+
+def _normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def tag_skills(text, skill_context=False):
+    """Return the sorted canonical skills mentioned in the text.
+
+    `skill_context` says the whole text is about skills (a job requirement
+    line), so ambiguous aliases count without another skill next to them.
+    """
+    text = _normalize(text)
+    found = set()
+    ambiguous = []
+    anchors = []
+    for start, end, (skill, is_ambiguous) in _matcher.iter_matches(text):
+        # Only whole words count: 'java' must not fire inside 'javascript'
+        if start > 0 and text[start - 1] in _WORD_CHARS:
+            continue
+        if end < len(text) and text[end] in _WORD_CHARS:
+            continue
+        if is_ambiguous and not skill_context:
+            ambiguous.append((start, end, skill))
+        else:
+            found.add(skill)
+            anchors.append((start, end))
+    for start, end, skill in ambiguous:
+        if any(a_start < end + CONTEXT_CHARS and a_end > start - CONTEXT_CHARS for a_start, a_end in anchors):
+            found.add(skill)
+    return sorted(found)
+
+
+def job_skill_weights(technical_skills, content=''):
+    """Map canonical skills to weights from a job's requirement lines.
+
+    Every skill named in a requirement line takes that line's weight. Jobs
+    whose requirement lines name no known skill fall back to the skills
+    mentioned anywhere in the description, with equal weight.
+    """
+    weights = {}
+    for line, weight in (technical_skills or {}).items():
+        for skill in tag_skills(line, skill_context=True):
+            weights[skill] = max(weights.get(skill, 0), float(weight or 0))
+    if not weights:
+        weights = {skill: 100.0 for skill in tag_skills(content)}
+    return weights
+
+
+def tag_cv(cv):
+    cv.skill_tags = tag_skills(cv.content)
+    return cv
+
+
+def tag_job(job):
+    job.skill_tags = job_skill_weights(job.technical_skills, job.content)
+    return job
+
+
+def ensure_skill_tags(objects):
+    """Tag CVs or jobs saved before skill tagging existed, with one bulk write."""
+    untagged = [obj for obj in objects if obj.skill_tags is None]
+    if not untagged:
+        return
+    for obj in untagged:
+        if isinstance(obj, CV):
+            tag_cv(obj)
+        else:
+            tag_job(obj)
+    type(untagged[0]).objects.bulk_update(untagged, ['skill_tags'])
+
+
+def skill_scores(cvs, jobs):
+    """Weighted skill overlap (0-1) of every CV against every job, as {(cv_id, job_id): score}.
+
+    Builds a binary CV x skill matrix and a job x skill weight matrix and
+    scores every pair with one matrix product. Jobs without tagged skills are
+    left out so callers can fall back to other scoring.
+    """
+    cvs, jobs = list(cvs), list(jobs)
+    ensure_skill_tags(cvs)
+    ensure_skill_tags(jobs)
+    jobs = [job for job in jobs if job.skill_tags]
+    if not cvs or not jobs:
+        return {}
+
+    cv_matrix = np.zeros((len(cvs), len(SKILLS)), dtype=np.float32)
+    for row, cv in enumerate(cvs):
+        columns = [SKILL_INDEX[skill] for skill in cv.skill_tags if skill in SKILL_INDEX]
+        cv_matrix[row, columns] = 1.0
+
+    job_weights = np.zeros((len(jobs), len(SKILLS)), dtype=np.float32)
+    for row, job in enumerate(jobs):
+        for skill, weight in job.skill_tags.items():
+            if skill in SKILL_INDEX:
+                job_weights[row, SKILL_INDEX[skill]] = weight
+
+    totals = job_weights.sum(axis=1)
+    totals[totals == 0] = 1.0
+    scores = (cv_matrix @ job_weights.T) / totals
+    return {
+        (cv.id, job.id): round(float(scores[i, j]), 4)
+        for i, cv in enumerate(cvs)
+        for j, job in enumerate(jobs)
+    }
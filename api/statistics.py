@@ -0,0 +1,215 @@
+"""Dashboard statistics kept current on every write.
+
+CV and job totals and the per-industry, per-score-bucket match counts and
+score sums live in StatisticsCounter rows. The write paths adjust them: model
+signals cover single saves and deletes, and the bulk writers (api.persistence,
+ingest, batch uploads) call in here directly. Recent activity is a bounded
+ActivityEvent log. Reading the dashboard touches a few dozen small rows
+whatever the size of the corpus; `manage.py rebuild_statistics` recomputes
+everything from the tables.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Sum
+from django.db.models.functions import Cast, Floor, Greatest, Least
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import CV, ActivityEvent, JobDescription, MatchResult, StatisticsCounter
+
+SCORE_BUCKETS = 10
+CACHE_KEY = 'system_statistics'
+
+
+def score_bucket(score):
+    return min(SCORE_BUCKETS - 1, max(0, int(score * SCORE_BUCKETS)))
+
+
+def _apply(deltas):
+    """Add {(kind, industry, bucket): [count, score total]} to the counters."""
+    deltas = {key: value for key, value in deltas.items() if value[0] or value[1]}
+    if not deltas:
+        return
+    with transaction.atomic():
+        StatisticsCounter.objects.bulk_create(
+            [StatisticsCounter(kind=kind, industry=industry, bucket=bucket) for kind, industry, bucket in deltas],
+            ignore_conflicts=True,
+        )
+        # A fixed order keeps concurrent writers from deadlocking on the counter rows
+        for (kind, industry, bucket), (count, score_total) in sorted(deltas.items()):
+            StatisticsCounter.objects.filter(kind=kind, industry=industry, bucket=bucket).update(
+                count=F('count') + count, score_total=F('score_total') + score_total,
+            )
+    transaction.on_commit(invalidate)
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+
+
+def _grouped_matches(queryset):
+    """(industry, bucket, count, score total) of the matches in `queryset`, in one grouped query."""
+    bucket = Least(Greatest(Cast(Floor(F('total_score') * SCORE_BUCKETS), IntegerField()), 0), SCORE_BUCKETS - 1)
+    rows = (queryset.order_by().values(industry=F('job__industry'), bucket=bucket)
+            .annotate(count=Count('id'), score_total=Sum('total_score')))
+    return [(row['industry'], row['bucket'], row['count'], row['score_total'] or 0.0) for row in rows]
+
+
+def record_activity(descriptions):
+    """Append events to the activity log and drop the ones that fell out of it."""
+    size = settings.ACTIVITY_LOG_SIZE
+    events = ActivityEvent.objects.bulk_create(
+        [ActivityEvent(description=description[:255]) for description in descriptions[-size:]]
+    )
+    if events:
+        ActivityEvent.objects.filter(id__lte=events[-1].id - size).delete()
+        transaction.on_commit(invalidate)
+
+
+def documents_added(kind, documents):
+    """Count newly created CVs (kind 'cvs') or jobs ('jobs')."""
+    if not documents:
+        return
+    _apply({(kind, '', 0): [len(documents), 0.0]})
+    if kind == 'cvs':
+        record_activity([f'New CV uploaded: {cv.name or "N/A"}' for cv in documents])
+    else:
+        record_activity([f'New job added: {job.title or "N/A"}' for job in documents])
+
+
+def matches_saved(matches, previous):
+    """Count upserted MatchResults; `previous` maps (cv_id, job_id) to the total score a row had before."""
+    deltas = defaultdict(lambda: [0, 0.0])
+    for match in matches:
+        industry = match.job.industry
+        old_score = previous.get((match.cv_id, match.job_id))
+        if old_score is not None:
+            delta = deltas[('matches', industry, score_bucket(old_score))]
+            delta[0] -= 1
+            delta[1] -= old_score
+        delta = deltas[('matches', industry, score_bucket(match.total_score))]
+        delta[0] += 1
+        delta[1] += match.total_score
+    _apply(deltas)
+    record_activity([
+        f'Matched CV {match.cv.name} with job {match.job.title} (Score: {int(match.total_score * 100)}%)'
+        for match in matches
+    ])
+
+
+def matches_deleted(queryset):
+    """Take the matches of `queryset` out of the counters; call before deleting them."""
+    _apply({
+        ('matches', industry, bucket): [-count, -score_total]
+        for industry, bucket, count, score_total in _grouped_matches(queryset)
+    })
+
+
+def job_industry_changed(job_id, old_industry, new_industry):
+    """Move a job's matches to the counters of its new industry."""
+    deltas = {}
+    for _, bucket, count, score_total in _grouped_matches(MatchResult.objects.filter(job_id=job_id)):
+        deltas[('matches', old_industry, bucket)] = [-count, -score_total]
+        deltas[('matches', new_industry, bucket)] = [count, score_total]
+    _apply(deltas)
+
+
+def rebuild():
+    """Recompute every counter from the tables; writes made meanwhile may be lost."""
+    with transaction.atomic():
+        StatisticsCounter.objects.all().delete()
+        counters = [
+            StatisticsCounter(kind='cvs', count=CV.objects.count()),
+            StatisticsCounter(kind='jobs', count=JobDescription.objects.count()),
+        ]
+        counters += [
+            StatisticsCounter(kind='matches', industry=industry, bucket=bucket, count=count, score_total=score_total)
+            for industry, bucket, count, score_total in _grouped_matches(MatchResult.objects.all())
+        ]
+        StatisticsCounter.objects.bulk_create(counters)
+    invalidate()
+    return counters
+
+
+def snapshot():
+    """Totals, score aggregates and recent activity for the dashboard."""
+    stats = cache.get(CACHE_KEY)
+    if stats is not None:
+        return stats
+
+    totals = {'cvs': 0, 'jobs': 0}
+    industries = defaultdict(lambda: [0, 0.0])
+    histogram = [0] * SCORE_BUCKETS
+    for counter in StatisticsCounter.objects.all():
+        if counter.kind != 'matches':
+            totals[counter.kind] = counter.count
+            continue
+        industries[counter.industry][0] += counter.count
+        industries[counter.industry][1] += counter.score_total
+        histogram[counter.bucket] += counter.count
+
+    total_matches = sum(count for count, _ in industries.values())
+    score_total = sum(total for _, total in industries.values())
+    stats = {
+        'totalCVs': totals['cvs'],
+        'totalJobs': totals['jobs'],
+        'totalMatches': total_matches,
+        'averageScore': score_total / total_matches if total_matches else None,
+        'averageScoreByIndustry': {
+            industry: {'matches': count, 'averageScore': total / count}
+            for industry, (count, total) in sorted(industries.items()) if count
+        },
+        'scoreHistogram': [
+            {'min': bucket / SCORE_BUCKETS, 'max': (bucket + 1) / SCORE_BUCKETS, 'count': count}
+            for bucket, count in enumerate(histogram)
+        ],
+        'recentActivity': [
+            {'time': event.time, 'description': event.description}
+            for event in ActivityEvent.objects.order_by('-id')[:10]
+        ],
+    }
+    cache.set(CACHE_KEY, stats, settings.STATISTICS_CACHE_SECONDS)
+    return stats
+
+
+@receiver(post_save, sender=CV)
+def cv_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        documents_added('cvs', [instance])
+
+
+@receiver(pre_save, sender=JobDescription)
+def job_saving(sender, instance, raw=False, **kwargs):
+    instance._saved_industry = None
+    if instance.pk and not raw:
+        instance._saved_industry = (
+            JobDescription.objects.filter(pk=instance.pk).values_list('industry', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=JobDescription)
+def job_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        documents_added('jobs', [instance])
+        return
+    saved_industry = getattr(instance, '_saved_industry', None)
+    if saved_industry is not None and saved_industry != instance.industry:
+        job_industry_changed(instance.pk, saved_industry, instance.industry)
+
+
+@receiver(pre_delete, sender=CV)
+def cv_deleting(sender, instance, **kwargs):
+    # Matches go with the CV in a cascade that sends no signals of its own
+    matches_deleted(MatchResult.objects.filter(cv=instance))
+    _apply({('cvs', '', 0): [-1, 0.0]})
+
+
+@receiver(pre_delete, sender=JobDescription)
+def job_deleting(sender, instance, **kwargs):
+    matches_deleted(MatchResult.objects.filter(job=instance))
+    _apply({('jobs', '', 0): [-1, 0.0]})
@@ -1,3 +1,170 @@
-from django.test import TestCase
+import os
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from . import embeddings
+from .batch_uploads import MemberTooLarge, _stage_member
+from .llm_client import estimate_tokens
+from .models import CV, UploadBatchItem
+from .pickled_index import PickledIndex
+from .prompt_compression import compress_cv, compress_job
+from .search_index import BM25Index
+from .skills import job_skill_weights, tag_skills
+
+
+class PromptCompressionTests(SimpleTestCase):
+    def test_short_text_is_unchanged(self):
+        text = 'Skills\nPython, Django'
+        self.assertEqual(compress_cv(text, 450), text)
+
+    def test_single_paragraph_cv_keeps_its_start(self):
+        text = 'Experienced engineer. ' * 200
+        compressed = compress_cv(text, 450)
+        self.assertTrue(compressed.startswith('Experienced engineer.'))
+        self.assertLessEqual(estimate_tokens(compressed), 450)
+        self.assertGreater(estimate_tokens(compressed), 400)
+
+    def test_long_job_paragraph_is_cut_not_dropped(self):
+        body = 'You will build and run backend services in Python and Go. ' * 60
+        compressed = compress_job(f'Senior Dev\n{body}', 350)
+        lines = compressed.splitlines()
+        self.assertEqual(lines[0], 'Senior Dev')
+        self.assertTrue(lines[1].startswith('You will build'))
+        self.assertLessEqual(estimate_tokens(compressed), 350)
+
+    def test_long_paragraph_under_a_heading_is_cut(self):
+        text = 'Jane Doe\nExperience\n' + 'Built data pipelines with Spark and Airflow. ' * 100
+        compressed = compress_cv(text, 200, frozenset({'spark'}))
+        self.assertIn('Experience\nBuilt data pipelines', compressed)
+        self.assertLessEqual(estimate_tokens(compressed), 200)
+
+    def test_relevant_lines_are_kept_in_document_order(self):
+        text = '\n'.join(
+            ['Skills'] + [f'Tool number {i} with some filler text here' for i in range(40)]
+            + ['Experience', 'Built Kubernetes operators in Go', 'Company'] + ['Unrelated line of text'] * 40
+        )
+        compressed = compress_cv(text, 120, frozenset({'kubernetes', 'go'}))
+        self.assertIn('Experience\nBuilt Kubernetes operators in Go', compressed)
+        self.assertLess(compressed.index('Skills'), compressed.index('Experience'))
+        self.assertLessEqual(estimate_tokens(compressed), 120)
+
+
+class SkillTaggingTests(SimpleTestCase):
+    def test_aliases_are_matched_as_whole_words(self):
+        self.assertEqual(tag_skills('Java and JavaScript, Node.js, C++ and C#'),
+                         ['C#', 'C++', 'Java', 'JavaScript', 'Node.js'])
+        self.assertEqual(tag_skills('Javanese cooking'), [])
+
+    def test_everyday_words_are_not_tagged(self):
+        self.assertEqual(tag_skills('I react swiftly to a spark of rust on my sketch'), [])
+        self.assertEqual(tag_skills('Add 200 ml of water, then update to the latest iOS'), [])
+        self.assertEqual(tag_skills('An agile mind, used to bootstrapping teams and laying rails'), [])
+
+    def test_ambiguous_aliases_count_next_to_other_skills(self):
+        self.assertEqual(tag_skills('Skills: Python, Spark, Kafka'), ['Kafka', 'Python', 'Spark'])
+        self.assertEqual(tag_skills('Built the front end in React and TypeScript'), ['React', 'TypeScript'])
+        self.assertEqual(tag_skills('Native apps in Swift for iOS, backend in Django'),
+                         ['Django', 'Mobile Development', 'Swift'])
+
+    def test_qualified_forms_need_no_context(self):
+        self.assertEqual(tag_skills('Built dashboards in ReactJS'), ['React'])
+        self.assertEqual(tag_skills('Ran batch jobs on Apache Spark'), ['Spark'])
+        self.assertEqual(tag_skills('Worked in an Agile environment'), ['Agile'])
+        self.assertEqual(tag_skills('Five years of Ruby on Rails'), ['Ruby'])
+
+    def test_requirement_lines_are_skill_context(self):
+        weights = job_skill_weights({'Experience with React': 80, 'Agile mindset': 40})
+        self.assertEqual(weights, {'React': 80.0, 'Agile': 40.0})
+
+
+class EmbeddingStoreTests(SimpleTestCase):
+    def test_writers_append_after_rows_saved_by_another_process(self):
+        with tempfile.TemporaryDirectory() as root, override_settings(EMBEDDING_ROOT=root), \
+                mock.patch.dict(embeddings._stores, clear=True), mock.patch.dict(embeddings._store_mtimes, clear=True):
+            backend = embeddings.get_backend()
+            directory = os.path.join(root, 'cv')
+            embeddings.EmbeddingStore(directory, backend.name, backend.dim).save()
+            embeddings.add_cvs([CV(id=1, content='Python developer')])
+            saved_at = os.stat(os.path.join(directory, 'meta.pkl')).st_mtime_ns
+
+            # Another worker appends with its own copy of the store, within the same mtime tick
+            other = embeddings.EmbeddingStore.load(directory)
+            other.add([(2, 'other-hash', 'Java developer')], backend)
+            other.save()
+            os.utime(other.meta_path, ns=(saved_at, saved_at))
+
+            embeddings.add_cvs([CV(id=3, content='Go developer')])
+            store = embeddings.EmbeddingStore.load(directory)
+            self.assertEqual(store.doc_rows, {1: 0, 2: 1, 3: 2})
+            self.assertEqual(os.path.getsize(store.vectors_path), 3 * backend.dim * 2)
+
+
+class BM25IndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = BM25Index()
+        self.index.add_document(1, 'Python developer with Django')
+        self.index.add_document(2, 'Accountant')
+        self.index.add_document(3, 'Nurse')
+        self.index.add_document(4, 'Django and Python, Python everywhere')
+
+    def test_candidates_without_query_terms_follow_with_zero_score(self):
+        ranked = self.index.rank('python django', limit=3, candidate_ids={1, 2, 3})
+        self.assertEqual(ranked[0][0], 1)
+        self.assertEqual(ranked[1:], [(2, 0.0), (3, 0.0)])
+
+    def test_zero_score_candidates_stop_at_the_limit(self):
+        self.assertEqual(self.index.rank('kubernetes', limit=2, candidate_ids={1, 2, 3, 4}), [(1, 0.0), (2, 0.0)])
+
+    def test_without_candidates_only_matching_documents_are_ranked(self):
+        self.assertEqual([doc_id for doc_id, _ in self.index.rank('python')], [4, 1])
+
+
+class PickledIndexTests(SimpleTestCase):
+    def test_writers_reload_changes_saved_by_another_process(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'index.pkl')
+            # Two copies stand for two worker processes sharing the file
+            first, second = (PickledIndex(lambda: path, dict, 'test index') for _ in range(2))
+            with first.locked():
+                first.get(reload=True)['a'] = 1
+                first.save()
+            saved_at = os.stat(path).st_mtime_ns
+            second.get()
+
+            with first.locked():
+                first.get(reload=True)['b'] = 2
+                first.save()
+            # The second save lands within the same mtime tick
+            os.utime(path, ns=(saved_at, saved_at))
+
+            with second.locked():
+                second.get(reload=True)['c'] = 3
+                second.save()
+            self.assertEqual(PickledIndex(lambda: path, dict, 'test index').get(), {'a': 1, 'b': 2, 'c': 3})
+
+
+class StageMemberTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        self.archives = {}
+        self.addCleanup(lambda: [archive.close() for archive in self.archives.values()])
+
+    def item(self, size):
+        archive_path = os.path.join(self.root.name, 'upload.zip')
+        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('cv.docx', b'\0' * size)
+        return UploadBatchItem(id=1, filename='cv.docx', archive_path=archive_path)
+
+    @override_settings(UPLOAD_BATCH_MAX_MEMBER_BYTES=1000)
+    def test_member_within_the_limit_is_copied(self):
+        self.assertEqual(os.path.getsize(_stage_member(self.item(1000), self.archives)), 1000)
+
+    @override_settings(UPLOAD_BATCH_MAX_MEMBER_BYTES=1000)
+    def test_copy_stops_past_the_limit(self):
+        with self.assertRaises(MemberTooLarge):
+            _stage_member(self.item(5000), self.archives)
+        self.assertEqual(os.listdir(self.root.name), ['upload.zip'])
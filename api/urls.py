@@ -1,13 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CVViewSet, JobDescriptionViewSet, MatchResultViewSet, get_statistics
+from .views import CVViewSet, JobDescriptionViewSet, MatchResultViewSet, UploadBatchViewSet, get_statistics, metrics_view
 
 router = DefaultRouter()
 router.register(r'cvs', CVViewSet)
 router.register(r'jobs', JobDescriptionViewSet)
 router.register(r'matches', MatchResultViewSet) 
+router.register(r'upload-batches', UploadBatchViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('statistics/', get_statistics, name='statistics'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
\ No newline at end of file
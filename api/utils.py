@@ -1,20 +1,20 @@
-import docx
+import hashlib
 import re
-from google import generativeai as genai
-from django.conf import settings
+
+from .docx_text import extract_docx_text
+from .llm_backends import create_model
 
 def extract_text_from_docx(file_path):
     """Extract text content from a DOCX file."""
-    doc = docx.Document(file_path)
-    full_text = []
-    for para in doc.paragraphs:
-        full_text.append(para.text)
-    return '\n'.join(full_text)
+    return extract_docx_text(file_path)
+
+def content_hash(text):
+    """Stable hash of document text, used to detect edited content."""
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
 
 def setup_gemini():
-    """Configure the Gemini API client."""
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    return genai.GenerativeModel('gemini-1.5-flash-latest')
+    """Return a model for the configured LLM backend."""
+    return create_model()
 
 def get_industry_score(cv_text, job_industry):
     """Calculate industry match score (10%)."""
@@ -1,32 +1,138 @@
-from rest_framework import viewsets, status, filters, pagination
+from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
 from django.core.files.uploadedfile import UploadedFile
-from .models import CV, JobDescription, MatchResult
-from .serializers import CVSerializer, JobDescriptionSerializer, MatchResultSerializer
+from .models import CV, JobDescription, MatchResult, UploadBatch
+from .serializers import (
+    CVSerializer, JobDescriptionSerializer, MatchResultSerializer, UploadBatchSerializer, split_field_names,
+)
 from .gemini_utils import GeminiAI
+from .search_index import index_cv, unindex_cv, rank_cvs
+from .cascade import MatchCascade
+from .profiles import ensure_cv_profiles
+from .persistence import MatchResultWriter, build_match_result, delete_match_results
+from .filters import FullTextSearchFilter
+from .pagination import KeysetPagination, StandardResultsSetPagination
+from .docx_text import extract_docx_text
+from .batch_uploads import create_batch, submit_batch
+from .dedup import file_hash, find_duplicate, lock_text_hash, text_hash
+from .near_duplicates import duplicate_clusters, near_duplicates_of
+from .skills import job_skill_weights, skill_scores, tag_skills
+from . import metrics, statistics
+from .embeddings import add_jobs as add_job_embeddings, nearest_cvs, nearest_jobs, remove_job as remove_job_embedding
+from django.conf import settings
 from django.db import transaction
-from django.utils import timezone
+from django.http import HttpResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+import json
 import os
 import re
-import docx
 import logging
-from datetime import datetime
-from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
-class StandardResultsSetPagination(pagination.PageNumberPagination):
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+# Number of ranked results returned by the matching endpoints
+TOP_K = 5
 
-class CVViewSet(viewsets.ModelViewSet):
+# CV and job columns left unread unless the response includes them
+DOCUMENT_DEFERRED_FIELDS = {'content': 'content', 'search_vector': None}
+
+def unneeded_columns(deferred_fields, projection, prefix=''):
+    """Columns of `deferred_fields` whose response field the projection leaves out."""
+    complete = projection['fields'] is None and projection['expand'] is None
+    requested = set((projection['fields'] or []) + (projection['expand'] or []))
+    return [
+        prefix + column for column, field in deferred_fields.items()
+        if field is None or not (complete or field in requested)
+    ]
+
+class ProjectionMixin:
+    """`?fields=` and `?expand=` projection for viewsets with a projected serializer.
+
+    Lists use the serializer's summary shape; a retrieved object is complete
+    unless the request narrows it. `deferred_fields` maps model columns to the
+    response field that needs them (None for columns never serialized), and
+    columns the response does not need are not read from the database.
+    """
+    deferred_fields = {}
+    projected_actions = ('list', 'retrieve')
+
+    def get_projection(self, summary=True):
+        fields = split_field_names(self.request.query_params.get('fields'))
+        expand = split_field_names(self.request.query_params.get('expand'))
+        if summary and expand is None:
+            expand = []
+        return {'fields': fields, 'expand': expand}
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.projected_actions:
+            kwargs = {**self.get_projection(summary=self.action == 'list'), **kwargs}
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        return self.project_queryset(super().get_queryset())
+
+    def project_queryset(self, queryset):
+        if self.action not in self.projected_actions:
+            return queryset
+        projection = self.get_projection(summary=self.action == 'list')
+        deferred = unneeded_columns(self.deferred_fields, projection)
+        return queryset.defer(*deferred) if deferred else queryset
+
+    def deferred_related_columns(self, relation):
+        """Columns of a related CV or job, serialized with the summary projection, not worth reading."""
+        return unneeded_columns(DOCUMENT_DEFERRED_FIELDS, self.get_projection(), prefix=f'{relation}__')
+
+def consume_match_events(events):
+    """Drain a match event generator and return the rows of its final ranked event."""
+    final_rows = []
+    for event, data in events:
+        if event == 'final':
+            final_rows = data
+    return final_rows
+
+def stream_match_events(events, stream_format):
+    """Stream match events as NDJSON lines or Server-Sent Events while they are produced."""
+    if stream_format == 'sse':
+        content_type = 'text/event-stream'
+        def render():
+            for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+    else:
+        content_type = 'application/x-ndjson'
+        def render():
+            for event, data in events:
+                yield json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder) + "\n"
+
+    response = StreamingHttpResponse(render(), content_type=content_type)
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let a reverse proxy buffer the stream
+    return response
+
+def start_upload_batch(request, kind):
+    """Stage the uploaded files or zip archives and hand them to a background worker."""
+    files = request.FILES.getlist('files') or request.FILES.getlist('file')
+    if not files:
+        return Response({'detail': 'No files provided.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        batch = create_batch(kind, files)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    submit_batch(batch.id)
+    print(f"Queued upload batch {batch.id} with {batch.items.count()} files")
+
+    serializer = UploadBatchSerializer(batch, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+class CVViewSet(ProjectionMixin, viewsets.ModelViewSet):
     queryset = CV.objects.all()
     serializer_class = CVSerializer
-    pagination_class = StandardResultsSetPagination
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'content']
+    pagination_class = KeysetPagination
+    deferred_fields = DOCUMENT_DEFERRED_FIELDS
+    # Content is searched through the full text index, names by substring
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
+    search_fields = ['name']
     ordering_fields = ['name', 'processed_at']
     ordering = ['-processed_at']
 
@@ -45,23 +151,49 @@ class CVViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Invalid file type. Only .docx allowed.'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
+            # A byte-identical re-upload resolves to the existing CV before any extraction
+            raw_hash = file_hash(file)
+            duplicate = find_duplicate(CV, file_hash=raw_hash)
+            if duplicate:
+                print(f"CV {name} is a re-upload of CV {duplicate.id}, reusing it.")
+                return Response(self.get_serializer(duplicate).data, status=status.HTTP_200_OK)
+
             file.seek(0)
             print(f"Attempting to read docx content for {name}...")
-            document = docx.Document(file)
-            paras = [p.text for p in document.paragraphs if p.text.strip()]
-            content = "\n".join(paras)
+            content = extract_docx_text(file)
             print(f"Extracted content length for {name}: {len(content)}")
             if not content:
                 print(f"!!! CV Upload Error: Could not extract text from {name}.")
                 return Response({'detail': 'Could not extract text content from the file.'}, status=status.HTTP_400_BAD_REQUEST)
 
+            normalized_hash = text_hash(content)
+            duplicate = find_duplicate(CV, text_hash=normalized_hash)
+            if duplicate:
+                print(f"CV {name} has the same text as CV {duplicate.id}, reusing it.")
+                return Response(self.get_serializer(duplicate).data, status=status.HTTP_200_OK)
+
         # Use transaction to ensure database consistency
             with transaction.atomic():
+                # Another upload of the same text may have been stored since the check above
+                lock_text_hash(CV, normalized_hash)
+                duplicate = find_duplicate(CV, file_hash=raw_hash, text_hash=normalized_hash)
+                if duplicate:
+                    print(f"CV {name} was stored meanwhile as CV {duplicate.id}, reusing it.")
+                    return Response(self.get_serializer(duplicate).data, status=status.HTTP_200_OK)
+
                 file.seek(0)
                 print(f"Attempting to create CV object for {name}...")
-                cv = CV.objects.create(name=name, file=file, content=content)
+                cv = CV.objects.create(name=name, file=file, content=content,
+                                       file_hash=raw_hash, text_hash=normalized_hash,
+                                       skill_tags=tag_skills(content))
                 print(f"CV object created with ID: {cv.id}")
 
+            # Keep the retrieval index in sync so the new CV is immediately matchable
+            try:
+                index_cv(cv)
+            except Exception as e:
+                print(f"!!! Could not add CV {cv.id} to search index: {e}")
+
             serializer = self.get_serializer(cv)
             print(f"Successfully processed CV {name}.")
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -72,6 +204,72 @@ class CVViewSet(viewsets.ModelViewSet):
             # traceback.print_exc()
             return Response({'detail': f'Error processing CV file: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Upload many .docx files or zip archives; extraction runs in the background."""
+        return start_upload_batch(request, 'cv')
+
+    @action(detail=False, methods=['get'])
+    def near_duplicate_clusters(self, request):
+        """Groups of CVs that are lightly edited versions of one another."""
+        try:
+            threshold = float(request.query_params.get('threshold', settings.NEAR_DUPLICATE_THRESHOLD))
+        except ValueError:
+            return Response({'detail': 'threshold must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        clusters = duplicate_clusters(threshold)
+        names = dict(CV.objects.filter(id__in=[cv_id for cluster in clusters for cv_id in cluster]).values_list('id', 'name'))
+        return Response([
+            {
+                'size': len(cluster),
+                'cvs': [{'id': cv_id, 'name': names[cv_id]} for cv_id in cluster if cv_id in names],
+            }
+            for cluster in clusters
+        ])
+
+    @action(detail=True, methods=['get'])
+    def near_duplicates(self, request, pk=None):
+        """CVs that are near-identical to this one, most similar first."""
+        cv = self.get_object()
+        try:
+            threshold = float(request.query_params.get('threshold', settings.NEAR_DUPLICATE_THRESHOLD))
+        except ValueError:
+            return Response({'detail': 'threshold must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        similar = near_duplicates_of(cv.id, threshold)
+        names = dict(CV.objects.filter(id__in=[cv_id for cv_id, _ in similar]).values_list('id', 'name'))
+        return Response([
+            {'cv': {'id': cv_id, 'name': names[cv_id]}, 'similarity': round(similarity, 3)}
+            for cv_id, similarity in similar if cv_id in names
+        ])
+
+    @action(detail=True, methods=['get'])
+    def nearest_jobs(self, request, pk=None):
+        """Jobs whose embeddings are closest to this CV's, most similar first."""
+        cv = self.get_object()
+        try:
+            k = int(request.query_params.get('k', 10))
+        except ValueError:
+            return Response({'detail': 'k must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        nearest = nearest_jobs(cv, max(1, k))
+        jobs = JobDescription.objects.in_bulk([job_id for job_id, _ in nearest])
+        return Response([
+            {'job': {'id': job_id, 'title': jobs[job_id].title, 'industry': jobs[job_id].industry},
+             'similarity': round(similarity, 3)}
+            for job_id, similarity in nearest if job_id in jobs
+        ])
+
+    def perform_update(self, serializer):
+        # Edited content is retagged the next time the CV is scored
+        cv = serializer.save(skill_tags=None)
+        # Refreshes the search, near-duplicate and embedding indexes
+        index_cv(cv)
+
+    def perform_destroy(self, instance):
+        cv_id = instance.id
+        super().perform_destroy(instance)
+        unindex_cv(cv_id)
 
     @action(detail=True, methods=['get'])
     def find_best_job(self, request, pk=None):
@@ -86,10 +284,26 @@ class CVViewSet(viewsets.ModelViewSet):
         if industry_filter:
             jobs_queryset = jobs_queryset.filter(industry__icontains=industry_filter)
             
-        jobs = jobs_queryset
-        
-        if not jobs: 
-            return Response({'message': 'No jobs found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            max_jobs = int(request.query_params.get('max_jobs', 20))
+        except ValueError:
+            return Response({'detail': 'max_jobs must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Check if we already have matches in the database to avoid reprocessing;
+        # the (cv, -total_score) index serves the best ones without a sort
+        existing_matches = list(
+            MatchResult.objects.filter(cv=cv).select_related('job')
+            .defer(*self.deferred_related_columns('job')).order_by('-total_score')[:TOP_K]
+        )
+        jobs = []
+        if not existing_matches:
+            # Only the `max_jobs` jobs nearest to the CV in embedding space are scored by Gemini
+            nearest = nearest_jobs(cv, max(1, max_jobs), queryset=jobs_queryset)
+            jobs_by_id = JobDescription.objects.in_bulk([job_id for job_id, _ in nearest])
+            jobs = [jobs_by_id[job_id] for job_id, _ in nearest if job_id in jobs_by_id]
+
+            if not jobs:
+                return Response({'message': 'No jobs found'}, status=status.HTTP_404_NOT_FOUND)
             
         try: 
             gemini = GeminiAI()
@@ -97,91 +311,93 @@ class CVViewSet(viewsets.ModelViewSet):
              print(f"Error initializing GeminiAI: {e}")
              return Response({'message': 'AI service configuration error.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
              
-        # Check if we already have matches in the database to avoid reprocessing
-        existing_matches = MatchResult.objects.filter(cv=cv).order_by('-total_score')
+        stream_format = request.query_params.get('stream')
+        events = self._best_job_events(cv, jobs, gemini, existing_matches)
+        if stream_format:
+            return stream_match_events(events, stream_format)
+
+        results = consume_match_events(events)
+        return Response(results[0] if results else {'message': 'No suitable match found.'}, 
+                       status=status.HTTP_200_OK if results else status.HTTP_404_NOT_FOUND)
+
+    def _best_job_events(self, cv, jobs, gemini, existing_matches):
+        """Yield ('cached' | 'match', row) events for a CV followed by a final ranked ('final', rows) event.
+
+        The CV's stored best matches are served as they are when there are any.
+        """
+        projection = self.get_projection()
         
-        if existing_matches.exists():
-            # Use existing top match
-            top_match = existing_matches.first()
-            
-            # Return the top match data
-            return Response({
-                'job': JobDescriptionSerializer(top_match.job).data,
-                'total_score': top_match.total_score,
-                'industry_score': top_match.industry_score,
-                'tech_skills_score': top_match.tech_skills_score,
-                'description_match_score': top_match.description_match_score,
-                'explanation': getattr(top_match, 'explanation', "Match retrieved from database")
-            }, status=status.HTTP_200_OK)
+        if existing_matches:
+            # Use existing top matches
+            results = []
+            for match in existing_matches:
+                row = {
+                    'job': JobDescriptionSerializer(match.job, **projection).data,
+                    'total_score': match.total_score,
+                    'industry_score': match.industry_score,
+                    'tech_skills_score': match.tech_skills_score,
+                    'description_match_score': match.description_match_score,
+                    'explanation': getattr(match, 'explanation', "Match retrieved from database")
+                }
+                results.append(row)
+                yield 'cached', row
+            yield 'final', results
+            return
         
-        # If no existing matches, process all jobs
-        # This is inefficient for many jobs - in a real-world scenario, 
-        # you might want to limit the number of jobs to process
+        # If no existing matches, score the shortlisted jobs
         results = []
         # Prepare batch processing
         batch_matches = []
+        jobs_by_id = {}
+        
+        # Extract the CV profile once so industry and skills are scored locally for every job
+        cv_profile = ensure_cv_profiles([cv], gemini).get(cv.id)
+        jobs = list(jobs)
+        skill_matrix_scores = skill_scores([cv], jobs)
         
         for job in jobs:
+            jobs_by_id[job.id] = job
             batch_matches.append({
                 'cv_id': cv.id,
                 'job_id': job.id,
                 'cv_text': cv.content,
                 'job_description': job.content,
                 'job_industry': job.industry,
-                'technical_skills': job.technical_skills or {}
+                'technical_skills': job.technical_skills or {},
+                'cv_profile': cv_profile,
+                'tech_skills_score': skill_matrix_scores.get((cv.id, job.id))
             })
         
-        # Process in batch (more efficient)
-        if batch_matches:
-            batch_results = gemini.process_matches_parallel(batch_matches)
-            
-            # Process all results and save to database
-            for match_data in batch_results:
-                job_id = match_data['job_id']
-                match_result = match_data['result']
-                job = JobDescription.objects.get(id=job_id)
+        # Results arrive in completion order, so each one can be emitted right away;
+        # the database writes are batched into bulk upserts
+        with MatchResultWriter() as writer:
+            for match_data in gemini.iter_matches(batch_matches):
+                job = jobs_by_id[match_data['job_id']]
+                match = writer.add(build_match_result(cv, job, match_data['result']))
                 
-                # Calculate total score
-                total_score = (
-                    match_result.get('industry_score', 0) * 0.1 +
-                    match_result.get('tech_skills_score', 0) * 0.3 +
-                    match_result.get('description_match_score', 0) * 0.6
-                )
-                
-                # Create/update match in database
-                match, _ = MatchResult.objects.update_or_create(
-                    cv=cv, job=job,
-                    defaults={
-                        'industry_score': match_result.get('industry_score', 0),
-                        'tech_skills_score': match_result.get('tech_skills_score', 0),
-                        'description_match_score': match_result.get('description_match_score', 0),
-                        'total_score': total_score, 
-                        'matched_at': timezone.now(),
-                        'explanation': match_result.get('explanation', '')
-                    }
-                )
-                
-                # Add to results list
-                results.append({
-                    'job': JobDescriptionSerializer(job).data,
-                    'total_score': total_score,
-                    'industry_score': match_result.get('industry_score', 0),
-                    'tech_skills_score': match_result.get('tech_skills_score', 0),
-                    'description_match_score': match_result.get('description_match_score', 0),
-                    'explanation': match_result.get('explanation', '')
-                })
+                row = {
+                    'job': JobDescriptionSerializer(job, **projection).data,
+                    'total_score': match.total_score,
+                    'industry_score': match.industry_score,
+                    'tech_skills_score': match.tech_skills_score,
+                    'description_match_score': match.description_match_score,
+                    'explanation': match.explanation
+                }
+                results.append(row)
+                yield 'match', row
         
         # Sort results by total score
         results.sort(key=lambda x: x['total_score'], reverse=True)
-        return Response(results[0] if results else {'message': 'No suitable match found.'}, 
-                       status=status.HTTP_200_OK if results else status.HTTP_404_NOT_FOUND)
+        yield 'final', results[:TOP_K]
 
-class JobDescriptionViewSet(viewsets.ModelViewSet):
+class JobDescriptionViewSet(ProjectionMixin, viewsets.ModelViewSet):
     queryset = JobDescription.objects.all()
     serializer_class = JobDescriptionSerializer
-    pagination_class = StandardResultsSetPagination
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'content', 'industry']
+    pagination_class = KeysetPagination
+    deferred_fields = DOCUMENT_DEFERRED_FIELDS
+    # Content and industry are searched through the full text index, titles by substring
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
+    search_fields = ['title']
     ordering_fields = ['title', 'industry', 'created_at']
     ordering = ['-created_at']
 
@@ -199,13 +415,18 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Invalid file type. Only .docx allowed.'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
+            # A byte-identical re-upload resolves to the existing job before any extraction
+            raw_hash = file_hash(file)
+            duplicate = find_duplicate(JobDescription, file_hash=raw_hash)
+            if duplicate:
+                print(f"Job file {file.name} is a re-upload of job {duplicate.id}, reusing it.")
+                return Response(self.get_serializer(duplicate).data, status=status.HTTP_200_OK)
+
             # 1. Extract text
             try:
                 file.seek(0)
                 print(f"Attempting to read docx content for {file.name}...")
-                document = docx.Document(file)
-                paras = [p.text for p in document.paragraphs if p.text.strip()]
-                full_text = "\n".join(paras)
+                full_text = extract_docx_text(file)
                 print(f"Extracted job content length: {len(full_text)}")
                 if not full_text:
                     print(f"!!! Job Upload Error: Could not extract text from {file.name}.")
@@ -214,6 +435,12 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
                 print(f"!!! Job Upload Error: Failed reading docx {file.name}: {e}")
                 return Response({'detail': f'Failed to read docx file content: {e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+            normalized_hash = text_hash(full_text)
+            duplicate = find_duplicate(JobDescription, text_hash=normalized_hash)
+            if duplicate:
+                print(f"Job file {file.name} has the same text as job {duplicate.id}, reusing it.")
+                return Response(self.get_serializer(duplicate).data, status=status.HTTP_200_OK)
+
             # 2. Parse the extracted text
             print(f"Attempting to parse text for {file.name}...")
             parsed_data = self._parse_job_description_text(full_text)
@@ -228,16 +455,31 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
             # 4. Create or update JobDescription object with transaction
             print(f"Attempting to update or create JobDescription for '{parsed_data['title']}'...")
             with transaction.atomic():
+                # Another upload of the same text may have been stored since the check above
+                lock_text_hash(JobDescription, normalized_hash)
+                duplicate = find_duplicate(JobDescription, file_hash=raw_hash, text_hash=normalized_hash)
+                if duplicate:
+                    print(f"Job file {file.name} was stored meanwhile as job {duplicate.id}, reusing it.")
+                    return Response(self.get_serializer(duplicate).data, status=status.HTTP_200_OK)
+
                 job, created = JobDescription.objects.update_or_create(
                     title=parsed_data['title'],
                     defaults={
                     'content': parsed_data['content'],
                     'industry': parsed_data['industry'],
-                    'technical_skills': parsed_data['technical_skills']
+                    'technical_skills': parsed_data['technical_skills'],
+                    'file_hash': raw_hash,
+                    'text_hash': normalized_hash,
+                    'skill_tags': job_skill_weights(parsed_data['technical_skills'], parsed_data['content']),
                 }
             )
             print(f"JobDescription {'created' if created else 'updated'} with ID: {job.id}")
 
+            try:
+                add_job_embeddings([job])
+            except Exception as e:
+                print(f"!!! Could not add job {job.id} to embedding index: {e}")
+
             # 5. Serialize and return response
             serializer = self.get_serializer(job)
             status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
@@ -248,6 +490,37 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
             print(f"!!! Job Upload Error: General exception during processing {file.name}: {e}")
             return Response({'detail': f'Error processing job description file: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Upload many .docx files or zip archives; extraction runs in the background."""
+        return start_upload_batch(request, 'job')
+
+    def perform_update(self, serializer):
+        # Edited requirements are retagged the next time the job is scored
+        job = serializer.save(skill_tags=None)
+        add_job_embeddings([job])
+
+    def perform_destroy(self, instance):
+        job_id = instance.id
+        super().perform_destroy(instance)
+        remove_job_embedding(job_id)
+
+    @action(detail=True, methods=['get'])
+    def nearest_cvs(self, request, pk=None):
+        """CVs whose embeddings are closest to this job's, most similar first."""
+        job = self.get_object()
+        try:
+            k = int(request.query_params.get('k', 10))
+        except ValueError:
+            return Response({'detail': 'k must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        nearest = nearest_cvs(job, max(1, k))
+        names = dict(CV.objects.filter(id__in=[cv_id for cv_id, _ in nearest]).values_list('id', 'name'))
+        return Response([
+            {'cv': {'id': cv_id, 'name': names[cv_id]}, 'similarity': round(similarity, 3)}
+            for cv_id, similarity in nearest if cv_id in names
+        ])
+
     @action(detail=True, methods=['get'])
     def top_candidates(self, request, pk=None):
         """Get top 5 candidates for a specific job with optimized response time"""
@@ -256,20 +529,15 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
         except JobDescription.DoesNotExist: 
             return Response({'message': 'Job not found.'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Get the top 5 matches for this job
-        # Use database-level filtering for efficiency
-        top_matches = MatchResult.objects.filter(job=job).order_by('-total_score')[:5]
-    
-        if not top_matches:
-            return Response([], status=status.HTTP_200_OK)
-        
-        # We can optimize by using select_related to reduce database queries
-        top_matches = MatchResult.objects.filter(job=job).select_related('cv').order_by('-total_score')[:5]
+        # Get the top 5 matches for this job in one query off the (job, -total_score) index
+        top_matches = (MatchResult.objects.filter(job=job).select_related('cv')
+                       .defer(*self.deferred_related_columns('cv')).order_by('-total_score')[:5])
         
+        projection = self.get_projection()
         results = []
         for match in top_matches:
             results.append({
-                'cv': CVSerializer(match.cv).data,
+                'cv': CVSerializer(match.cv, **projection).data,
                 'total_score': match.total_score,
                 'industry_score': match.industry_score,
                 'tech_skills_score': match.tech_skills_score,
@@ -418,11 +686,12 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
         # Check if we should use cached results
         use_cache = request.query_params.get('use_cache', 'true').lower() == 'true'
         
-        # Get max number of CVs to process
+        # Get max number of CVs to process. The whole corpus is ranked locally
+        # and only the best `max_cvs` candidates are considered for Gemini.
         max_cvs = int(request.query_params.get('max_cvs', 10))
-        cvs = cv_queryset[:max_cvs]
+        ranked, candidate_count = rank_cvs(job, cv_queryset, max_cvs)
         
-        if not cvs: 
+        if not ranked: 
             return Response({'message': 'No CVs found matching criteria'}, status=status.HTTP_404_NOT_FOUND)
             
         try: 
@@ -430,21 +699,49 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
         except Exception as e:
              print(f"Error initializing GeminiAI: {e}")
              return Response({'message': 'AI service configuration error.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        # At most `llm_budget` CV-job pairs are sent to Gemini for this request
+        try:
+            llm_budget = int(request.query_params.get('llm_budget', settings.MATCH_LLM_BUDGET))
+        except ValueError:
+            llm_budget = settings.MATCH_LLM_BUDGET
+        cascade = MatchCascade(min_score=min_score, top_k=TOP_K, budget=max(0, llm_budget))
+        cascade.candidates = candidate_count
+        cascade.avoided['retrieval'] = candidate_count - len(ranked)
+        
+        # BM25 scores relative to the best shortlisted CV bound the description score
+        best_lexical = ranked[0][1] or 1.0
+        lexical = {cv.id: score / best_lexical for cv, score in ranked}
+        cvs = [cv for cv, _ in ranked]
              
+        stream_format = request.query_params.get('stream')
+        events = self._matching_cv_events(job, cvs, gemini, use_cache, cascade, lexical)
+        if stream_format:
+            return stream_match_events(events, stream_format)
+
+        # Return top 5 results with explanations; the cascade report goes in a header
+        results = consume_match_events(events)
+        return Response(results, headers={'X-Match-Cascade': json.dumps(cascade.report)})
+
+    def _matching_cv_events(self, job, cvs, gemini, use_cache, cascade, lexical=None):
+        """Yield ('cached' | 'match', row) events for a job, a ('report', cascade report) event
+        and a final ranked ('final', rows) event."""
         # Prepare for batch processing
         batch_matches = []
+        cvs_by_id = {}
+        projection = self.get_projection()
+        
+        if not use_cache:
+            # If not using cache, drop the existing matches for these CVs in one query
+            delete_match_results(MatchResult.objects.filter(job=job, cv__in=cvs))
+        
         for cv in cvs:
             if not cv.content:
                 print(f"Skipping CV {cv.id} due to missing content.")
                 continue
-                
-            if not use_cache:
-                # If not using cache, we need to check if there's an existing match and delete it
-                existing_match = MatchResult.objects.filter(job=job, cv=cv).first()
-                if existing_match:
-                    existing_match.delete()
                     
             # Add to batch for processing
+            cvs_by_id[cv.id] = cv
             batch_matches.append({
                 'cv_id': cv.id,
                 'job_id': job.id,
@@ -461,94 +758,104 @@ class JobDescriptionViewSet(viewsets.ModelViewSet):
             existing_matches = MatchResult.objects.filter(
                 job=job, 
                 cv__in=cvs
-            ).select_related('cv')
+            ).select_related('cv').defer(*self.deferred_related_columns('cv'))
             
-            # Add existing matches to results
+            # Add existing matches to results; these are sent before any Gemini call
             for match in existing_matches:
-                results.append({
-                    'cv': CVSerializer(match.cv).data, 
+                row = {
+                    'cv': CVSerializer(match.cv, **projection).data,
                     'total_score': match.total_score,
                     'industry_score': match.industry_score,
                     'tech_skills_score': match.tech_skills_score,
                     'description_match_score': match.description_match_score,
                     'explanation': getattr(match, 'explanation', "Previously analyzed match")
-                })
+                }
+                results.append(row)
+                cascade.record(match.total_score, stored=True)
+                yield 'cached', row
             
             # Filter out CVs that already have matches
-            processed_cv_ids = [match.cv.id for match in existing_matches]
+            processed_cv_ids = {match.cv_id for match in existing_matches}
             batch_matches = [m for m in batch_matches if m['cv_id'] not in processed_cv_ids]
         
-        # Process remaining CVs in parallel
+        # Process remaining CVs cheapest signal first: only pairs whose upper bound
+        # can still reach min_score or the current top-k are sent to Gemini
         if batch_matches:
-            # Use improved parallel processing
-            batch_results = gemini.process_matches_parallel(batch_matches)
+            pending_cvs = [cv for cv in cvs if cv.id in {m['cv_id'] for m in batch_matches}]
+            # Skill overlap for every pending CV in one vectorized pass
+            skill_matrix_scores = skill_scores(pending_cvs, [job])
+            candidates = []
+            for match_data in batch_matches:
+                match_data['tech_skills_score'] = skill_matrix_scores.get((match_data['cv_id'], job.id))
+                exact, estimate = cascade.upper_bounds(match_data['tech_skills_score'],
+                                                       (lexical or {}).get(match_data['cv_id']))
+                candidates.append((match_data, exact, estimate))
             
-            for match_data in batch_results:
-                cv_id = match_data['cv_id']
-                match_result = match_data['result']
-                
-                # Get the CV
-                try:
-                    cv = CV.objects.get(id=cv_id)
-                    
-                    # Calculate total score
-                    total_score = (
-                        match_result.get('industry_score', 0) * 0.1 +
-                        match_result.get('tech_skills_score', 0) * 0.3 +
-                        match_result.get('description_match_score', 0) * 0.6
-                    )
-                    
-                    # Skip if below minimum score threshold
-                    if total_score < min_score:
-                        continue
-                    
-                    # Get the explanation
-                    explanation = match_result.get('explanation', '')
+            # Results arrive in completion order, so each one can be emitted right away;
+            # the database writes are batched into bulk upserts
+            with MatchResultWriter() as writer:
+                for wave in cascade.waves(candidates):
+                    # Profiles are extracted once per CV and reused for every job afterwards
+                    profiles = ensure_cv_profiles([cvs_by_id[m['cv_id']] for m in wave], gemini)
+                    for match_data in wave:
+                        match_data['cv_profile'] = profiles.get(match_data['cv_id'])
                     
-                    # Save the match to database with explanation
-                    match, _ = MatchResult.objects.update_or_create(
-                        cv=cv, job=job,
-                        defaults={
-                            'industry_score': match_result.get('industry_score', 0),
-                            'tech_skills_score': match_result.get('tech_skills_score', 0),
-                            'description_match_score': match_result.get('description_match_score', 0),
-                            'total_score': total_score, 
-                            'matched_at': timezone.now(),
-                            'explanation': explanation
+                    for match_data in gemini.iter_matches(wave):
+                        cv = cvs_by_id[match_data['cv_id']]
+                        match = build_match_result(cv, job, match_data['result'])
+                        cascade.record(match.total_score)
+                        
+                        # Skip if below minimum score threshold
+                        if match.total_score < cascade.min_score:
+                            continue
+                        
+                        # Save the match to database with explanation
+                        writer.add(match)
+                        
+                        row = {
+                            'cv': CVSerializer(cv, **projection).data,
+                            'total_score': match.total_score,
+                            'industry_score': match.industry_score,
+                            'tech_skills_score': match.tech_skills_score,
+                            'description_match_score': match.description_match_score,
+                            'explanation': match.explanation
                         }
-                    )
-                    
-                    # Add to results
-                    results.append({
-                        'cv': CVSerializer(match.cv).data,
-                        'total_score': total_score,
-                        'industry_score': match_result.get('industry_score', 0),
-                        'tech_skills_score': match_result.get('tech_skills_score', 0),
-                        'description_match_score': match_result.get('description_match_score', 0),
-                        'explanation': explanation
-                    })
-                except CV.DoesNotExist:
-                    continue
+                        results.append(row)
+                        yield 'match', row
+        
+        report = cascade.report
+        print(f"Match cascade for job {job.id}: {report['escalated']} pairs sent to Gemini, "
+              f"{report['llm_calls_avoided']} avoided {report['avoided']}")
+        yield 'report', report
         
         # Sort results by total score
         results.sort(key=lambda x: x['total_score'], reverse=True)
-        
-        # Return top 5 results with explanations
-        top_5 = results[:5]
-        return Response(top_5)
+        yield 'final', results[:TOP_K]
+
+class UploadBatchViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Status of batch uploads, with the outcome of every file.
+    """
+    queryset = UploadBatch.objects.all().prefetch_related('items').order_by('-created_at')
+    serializer_class = UploadBatchSerializer
+    pagination_class = StandardResultsSetPagination
 
-class MatchResultViewSet(viewsets.ReadOnlyModelViewSet):
+class MatchResultViewSet(ProjectionMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing match results between CVs and job descriptions.
     """
     # Use select_related to optimize database queries
     queryset = MatchResult.objects.all().select_related('cv', 'job').order_by('-total_score')
     serializer_class = MatchResultSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['cv__name', 'job__title']
     ordering_fields = ['total_score', 'industry_score', 'tech_skills_score', 'description_match_score', 'matched_at']
     ordering = ['-total_score']
+    deferred_fields = {
+        'cv__content': 'cv.content', 'cv__search_vector': None,
+        'job__content': 'job.content', 'job__search_vector': None,
+    }
     
     def get_queryset(self):
         """
@@ -590,89 +897,15 @@ class MatchResultViewSet(viewsets.ReadOnlyModelViewSet):
         
         # Apply custom ordering with fallback to default
         ordering = self.request.query_params.get('ordering', '-total_score')
-        return queryset.order_by(ordering)
+        return self.project_queryset(queryset.order_by(ordering))
+
+def metrics_view(request):
+    """Process-wide request, SQL, LLM, cache and extraction metrics in the Prometheus text format."""
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @api_view(['GET'])
 def get_statistics(request):
     """
-    Get system statistics with optimized database queries and caching.
+    Get system statistics from the counters api.statistics maintains on every write.
     """
-    cache.clear()
-    # Try to get statistics from cache
-    stats_cache_key = 'system_statistics'
-    cached_stats = cache.get(stats_cache_key)
-    
-    if cached_stats:
-        # Add recent activities since they change more frequently
-        recent_activities = get_recent_activities()
-        cached_stats['recentActivity'] = recent_activities
-        return Response(cached_stats)
-    
-    # If not in cache, calculate statistics using efficient database queries
-    stats = {
-        'totalCVs': CV.objects.count(),
-        'totalJobs': JobDescription.objects.count(),
-        'totalMatches': MatchResult.objects.count(),
-        'recentActivity': []
-    }
-    
-    # Add more useful statistics
-    try:
-        # Get recent activities
-        stats['recentActivity'] = get_recent_activities()
-        
-        # Cache the basic statistics for 10 minutes
-        # We exclude recentActivity since that changes frequently
-        stats_to_cache = {k: v for k, v in stats.items() if k != 'recentActivity'}
-        cache.set(stats_cache_key, stats_to_cache, 600)  # 10 minutes
-        
-    except Exception as e:
-        print(f"Error calculating additional statistics: {e}")
-    
-    return Response(stats)
-
-def get_recent_activities():
-    """Helper function to get recent activities for the statistics endpoint."""
-    recent_activities = []
-    now = datetime.now()
-    
-    try:
-        # Get recent CVs with optimized query
-        recent_cvs = CV.objects.order_by('-processed_at')[:5]
-        for cv in recent_cvs:
-            recent_activities.append({
-                'time': cv.processed_at or now,
-                'description': f'New CV uploaded: {cv.name or "N/A"}'
-            })
-    except Exception as e:
-        print(f"Error fetching recent CVs: {e}")
-        
-    try:
-        # Get recent jobs with optimized query
-        recent_jobs = JobDescription.objects.order_by('-created_at')[:5]
-        for job in recent_jobs:
-            recent_activities.append({
-                'time': job.created_at or now,
-                'description': f'New job added: {job.title or "N/A"}'
-            })
-    except Exception as e:
-        print(f"Error fetching recent jobs: {e}")
-        
-    try:
-        # Get recent matches with optimized query using select_related
-        recent_matches = MatchResult.objects.select_related('cv', 'job').order_by('-matched_at')[:5]
-        for match in recent_matches:
-            cv_name = match.cv.name if match.cv else "N/A"
-            job_title = match.job.title if match.job else "N/A"
-            recent_activities.append({
-                'time': match.matched_at or now,
-                'description': f'Matched CV {cv_name} with job {job_title} (Score: {int(match.total_score * 100)}%)'
-            })
-    except Exception as e:
-        print(f"Error fetching recent matches: {e}")
-        
-    # Sort activities by time
-    recent_activities.sort(key=lambda x: x.get('time', datetime.min), reverse=True)
-    
-    # Limit to 10 most recent
-    return recent_activities[:10]
\ No newline at end of file
+    return Response(statistics.snapshot())
@@ -0,0 +1,92 @@
+"""Entry points for process-pool workers used by the bulk management commands.
+
+Spawned workers unpickle these functions before Django is configured, so
+this module must not import models at import time.
+"""
+from django.conf import settings
+
+
+def init_worker(requests_per_minute=None, tokens_per_minute=None):
+    """Set up Django in a spawned worker, optionally with its share of the Gemini budget."""
+    import django
+    django.setup()
+    if requests_per_minute:
+        settings.GEMINI_REQUESTS_PER_MINUTE = requests_per_minute
+    if tokens_per_minute:
+        settings.GEMINI_TOKENS_PER_MINUTE = tokens_per_minute
+
+
+def score_job_chunk(job_id, cv_ids):
+    """Score one job against a chunk of CVs and store the results."""
+    from .gemini_utils import GeminiAI
+    from .models import CV, JobDescription
+    from .persistence import MatchResultWriter, build_match_result
+    from .profiles import ensure_cv_profiles
+    from .skills import skill_scores
+
+    job = JobDescription.objects.get(id=job_id)
+    cvs = list(CV.objects.filter(id__in=cv_ids))
+    cvs_by_id = {cv.id: cv for cv in cvs}
+    gemini = GeminiAI()
+    profiles = ensure_cv_profiles(cvs, gemini)
+    skill_matrix_scores = skill_scores(cvs, [job])
+
+    batch_matches = [{
+        'cv_id': cv.id,
+        'job_id': job.id,
+        'cv_text': cv.content,
+        'job_description': job.content,
+        'job_industry': job.industry,
+        'technical_skills': job.technical_skills or {},
+        'cv_profile': profiles.get(cv.id),
+        'tech_skills_score': skill_matrix_scores.get((cv.id, job.id))
+    } for cv in cvs if cv.content]
+
+    scored, failed = 0, []
+    with MatchResultWriter() as writer:
+        for match_data in gemini.iter_matches(batch_matches):
+            match_result = match_data['result']
+            if not match_result.get('cv_hash'):
+                # Errors and unparseable answers are left for the next run
+                failed.append(match_data['cv_id'])
+                continue
+            writer.add(build_match_result(cvs_by_id[match_data['cv_id']], job, match_result))
+            scored += 1
+
+    return {'job_id': job_id, 'pairs': len(cv_ids), 'scored': scored, 'failed': failed}
+
+
+def extract_document(path, kind):
+    """Extract one .docx for bulk ingest; jobs are also parsed into title, industry and skills."""
+    import contextlib
+    import io
+    import os
+    import time
+
+    from .dedup import file_hash, text_hash
+    from .docx_text import extract_docx_text
+    from .skills import job_skill_weights, tag_skills
+
+    document = {'path': path, 'name': os.path.basename(path), 'extract_time': 0.0, 'parse_time': 0.0}
+    started = time.perf_counter()
+    try:
+        document['file_hash'] = file_hash(path)
+        document['content'] = extract_docx_text(path)
+    except Exception as e:
+        document['error'] = f'could not read docx: {e}'
+        return document
+    document['text_hash'] = text_hash(document['content'])
+    document['extract_time'] = time.perf_counter() - started
+    if kind == 'cv':
+        document['skill_tags'] = tag_skills(document['content'])
+
+    if kind == 'job' and document['content']:
+        from .views import JobDescriptionViewSet
+
+        started = time.perf_counter()
+        # The parser narrates every line it looks at; keep worker output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            document['parsed'] = JobDescriptionViewSet()._parse_job_description_text(document['content'])
+        document['skill_tags'] = job_skill_weights(document['parsed']['technical_skills'], document['content'])
+        document['parse_time'] = time.perf_counter() - started
+    return document
@@ -82,7 +82,8 @@ export class JobListComponent implements OnInit {
     
     // Build request parameters
     let params = new HttpParams()
-      .set('page', page.toString());
+      .set('page', page.toString())
+      .set('expand', 'content'); // List rows show the start of each description
     
     // Add ordering
     const ordering = this.sortDirection === 'desc' ? `-${this.sortField}` : this.sortField;
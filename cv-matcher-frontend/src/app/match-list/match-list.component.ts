@@ -153,6 +153,13 @@ export class MatchListComponent implements OnInit {
     this.selectedJob = job;
     this.showJobDetailModal = true;
     
+    // Match lists leave job descriptions out, so the full job is loaded on demand
+    if (!job.content) {
+      this.http.get<any>(`${this.apiUrl}/api/jobs/${job.id}/`).subscribe({
+        next: (fullJob) => { job.content = fullJob.content; }
+      });
+    }
+    
     // Calculate job match statistics
     this.calculateJobMatchStats(job.id);
   }
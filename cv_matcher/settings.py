@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'api',
     'corsheaders',
@@ -50,6 +51,8 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 MIDDLEWARE = [
+    # First, so Server-Timing headers and /api/metrics/ cover the whole stack
+    'api.metrics.PerformanceMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,6 +68,80 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash-latest')
+
+# Process-wide Gemini budget and concurrency (see api/llm_client.py)
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 60))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv('GEMINI_TOKENS_PER_MINUTE', 1000000))
+GEMINI_INITIAL_CONCURRENCY = int(os.getenv('GEMINI_INITIAL_CONCURRENCY', 3))
+GEMINI_MIN_CONCURRENCY = int(os.getenv('GEMINI_MIN_CONCURRENCY', 1))
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', 10))
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', 5))
+
+# Several CVs are scored against one job per call, up to this many input tokens / CVs
+GEMINI_BATCH_TOKEN_BUDGET = int(os.getenv('GEMINI_BATCH_TOKEN_BUDGET', 8000))
+GEMINI_BATCH_MAX_SIZE = int(os.getenv('GEMINI_BATCH_MAX_SIZE', 8))
+
+# Token budgets for the CV and job text in prompts; sections are ranked and packed to fit
+PROMPT_CV_TOKEN_BUDGET = int(os.getenv('PROMPT_CV_TOKEN_BUDGET', 450))
+PROMPT_JOB_TOKEN_BUDGET = int(os.getenv('PROMPT_JOB_TOKEN_BUDGET', 350))
+PROMPT_PROFILE_TOKEN_BUDGET = int(os.getenv('PROMPT_PROFILE_TOKEN_BUDGET', 1200))
+
+# Model behind the LLM client: 'api.llm_backends.GeminiModel', the offline
+# 'api.llm_backends.SimulatedModel' or 'api.llm_backends.ReplayModel'
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'api.llm_backends.GeminiModel')
+# Append every answer to this JSONL file so a run can be replayed with ReplayModel
+LLM_RECORD_PATH = os.getenv('LLM_RECORD_PATH', '')
+LLM_REPLAY_PATH = os.getenv('LLM_REPLAY_PATH', '')
+LLM_SIMULATOR_SEED = int(os.getenv('LLM_SIMULATOR_SEED', 0))
+LLM_SIMULATOR_LATENCY_MS = float(os.getenv('LLM_SIMULATOR_LATENCY_MS', 800))
+LLM_SIMULATOR_LATENCY_SIGMA = float(os.getenv('LLM_SIMULATOR_LATENCY_SIGMA', 0.5))
+LLM_SIMULATOR_RATE_LIMIT_RATE = float(os.getenv('LLM_SIMULATOR_RATE_LIMIT_RATE', 0))
+LLM_SIMULATOR_MALFORMED_RATE = float(os.getenv('LLM_SIMULATOR_MALFORMED_RATE', 0))
+
+# Entries kept in the per-process LRU in front of the CachedMatch table
+MATCH_CACHE_LRU_SIZE = int(os.getenv('MATCH_CACHE_LRU_SIZE', 10000))
+
+# Local search indexes persisted between worker restarts
+INDEX_ROOT = os.getenv('INDEX_ROOT', os.path.join(BASE_DIR, 'indexes'))
+CV_INDEX_PATH = os.path.join(INDEX_ROOT, 'cv_bm25.pkl')
+CV_MINHASH_PATH = os.path.join(INDEX_ROOT, 'cv_minhash.pkl')
+# CV and job embeddings, stored as memory-mapped float16 matrices
+EMBEDDING_ROOT = os.path.join(INDEX_ROOT, 'embeddings')
+# 'api.embeddings.HashingEmbedder' runs locally; 'api.embeddings.GeminiEmbedder' calls the Gemini API
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'api.embeddings.HashingEmbedder')
+EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', 512))
+GEMINI_EMBEDDING_MODEL = os.getenv('GEMINI_EMBEDDING_MODEL', 'models/text-embedding-004')
+
+# Estimated Jaccard similarity (word 3-grams) above which two CVs count as near-duplicates
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.8))
+# Reuse an already scored near-duplicate's match instead of calling Gemini (opt-in)
+NEAR_DUPLICATE_SCORE_REUSE = os.getenv('NEAR_DUPLICATE_SCORE_REUSE', 'False') == 'True'
+NEAR_DUPLICATE_REUSE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_REUSE_THRESHOLD', 0.9))
+
+# Batch uploads are staged here until a background worker has extracted them
+UPLOAD_STAGING_ROOT = os.getenv('UPLOAD_STAGING_ROOT', os.path.join(BASE_DIR, 'uploads'))
+UPLOAD_BATCH_WORKERS = int(os.getenv('UPLOAD_BATCH_WORKERS', 2))
+UPLOAD_BATCH_MAX_FILES = int(os.getenv('UPLOAD_BATCH_MAX_FILES', 2000))
+# Zip members that unpack to more than this many bytes are rejected
+UPLOAD_BATCH_MAX_MEMBER_BYTES = int(os.getenv('UPLOAD_BATCH_MAX_MEMBER_BYTES', 20 * 1024 * 1024))
+
+# Match cascade: at most this many CV-job pairs are sent to Gemini per matching request
+MATCH_LLM_BUDGET = int(os.getenv('MATCH_LLM_BUDGET', 50))
+# Candidates are escalated to Gemini in waves of this size, best upper bound first
+MATCH_CASCADE_WAVE_SIZE = int(os.getenv('MATCH_CASCADE_WAVE_SIZE', 16))
+# Optimistic margin added to a CV's relative BM25 score to bound its description score;
+# 1.0 or more turns the lexical estimate off and only exact bounds are used for pruning
+MATCH_LEXICAL_MARGIN = float(os.getenv('MATCH_LEXICAL_MARGIN', 0.5))
+
+# The dashboard statistics are kept current on every write; a cached copy is served for at most this many
+# seconds (writes in the same process, or with a shared cache backend any process, refresh it at once)
+STATISTICS_CACHE_SECONDS = int(os.getenv('STATISTICS_CACHE_SECONDS', 60))
+# Events kept in the recent activity log
+ACTIVITY_LOG_SIZE = int(os.getenv('ACTIVITY_LOG_SIZE', 50))
+
+# CV and job searches rank and return at most this many of the newest matching documents
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 200))
 
 ROOT_URLCONF = 'cv_matcher.urls'
 